@@ -1,23 +1,72 @@
 """
 Main entry point for the CrewAI Notion Chatbot
 """
+import time
+
+STARTED_AT = time.perf_counter()
+
+import argparse
+import json
 import os
 import sys
+import threading
+from concurrent.futures import Future
 from pathlib import Path
 
-# Add the src directory to the Python path
-sys.path.append(str(Path(__file__).parent / "src"))
+# Make the src package importable wherever the script is run from
+sys.path.insert(0, str(Path(__file__).parent))
 
 from dotenv import load_dotenv
-from crews import NotionChatbot
 
-def main():
-    """Main function to run the chatbot"""
-    # Load environment variables
-    load_dotenv()
+# crewai, langchain, notion_client and requests are only imported by
+# load_chatbot, which runs in the background while the prompt is shown
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="CrewAI Notion Chatbot")
+    parser.add_argument(
+        "--benchmark-startup",
+        action="store_true",
+        help="Report import time and time to first prompt, then exit"
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="QUESTIONS_JSONL",
+        help="Answer the questions in a JSONL file instead of chatting"
+    )
+    parser.add_argument(
+        "--output",
+        metavar="ANSWERS_JSONL",
+        help="Where --batch writes answers (default: <input>.answers.jsonl)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Questions answered at a time with --batch (default: BATCH_CONCURRENCY or 4)"
+    )
+    subparsers = parser.add_subparsers(dest="command")
     
-    # Check if required environment variables are set
-    required_vars = ["OPENAI_API_KEY", "NOTION_TOKEN"]
+    sync_parser = subparsers.add_parser(
+        "sync",
+        help="Mirror pages edited since the last sync into the local cache and search index"
+    )
+    sync_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep syncing until interrupted instead of running once"
+    )
+    sync_parser.add_argument(
+        "--interval",
+        type=float,
+        default=float(os.getenv("NOTION_SYNC_INTERVAL") or 300),
+        help="Seconds between syncs with --watch (default: NOTION_SYNC_INTERVAL or 300)"
+    )
+    
+    return parser.parse_args(argv)
+
+
+def check_required_vars(required_vars):
+    """Report missing environment variables and return whether all are set"""
     missing_vars = []
     
     for var in required_vars:
@@ -29,14 +78,160 @@ def main():
         for var in missing_vars:
             print(f"  - {var}")
         print("\nPlease configure these in your .env file (see .env.example)")
+        return False
+    
+    return True
+
+
+def run_sync(args):
+    """Sync the Notion workspace into the local cache and search index"""
+    if not check_required_vars(["NOTION_TOKEN"]):
         return
     
-    # Initialize chatbot
-    print("🤖 Initializing CrewAI Notion Chatbot...")
+    from src.notion_sync import create_workspace_sync
+    
+    workspace_sync = create_workspace_sync()
+    print(f"🔄 Syncing Notion workspace (checkpoint: {workspace_sync.checkpoint or 'none, full crawl'})")
+    
+    if args.watch:
+        try:
+            workspace_sync.run_forever(args.interval)
+        except KeyboardInterrupt:
+            print("\n👋 Sync stopped")
+        return
+    
+    summary = workspace_sync.run_once()
+    print(f"✅ {summary['synced']} pages updated, {summary['removed']} removed in {summary['duration']:.1f}s")
+    for error in summary["errors"]:
+        print(f"  ❌ {error}")
+    print(f"Checkpoint: {summary['checkpoint']}")
+
+
+def read_questions(path):
+    """Read batch questions: one JSON object with a "question" (and optional "id") or a JSON string per line"""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            questions.append({"id": item.get("id", line_number), "question": item["question"]})
+    return questions
+
+
+def run_batch(args):
+    """Answer a file of questions and write the answers as JSONL"""
+    if not check_required_vars(["OPENAI_API_KEY", "NOTION_TOKEN"]):
+        return
+    
+    try:
+        questions = read_questions(args.batch)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Could not read questions from {args.batch}: {str(e)}")
+        return
+    
+    output_path = args.output or str(Path(args.batch).with_suffix("")) + ".answers.jsonl"
+    print(f"🤖 Answering {len(questions)} questions from {args.batch}...")
+    try:
+        chatbot, mcp_status, _ = load_chatbot()
+    except Exception as e:
+        print(f"❌ Could not start the chatbot: {str(e)}")
+        return
+    print_mcp_status(mcp_status)
+    
+    started = time.perf_counter()
+    answered = 0
+    failed = 0
+    lock = threading.Lock()
+    
+    with open(output_path, "w", encoding="utf-8") as output:
+        # Answers are written as they complete, so the file order may differ from the input
+        def write_answer(index, response):
+            nonlocal answered, failed
+            record = {
+                "id": questions[index]["id"],
+                "question": questions[index]["question"],
+                "answer": response.get("answer"),
+                "success": response.get("success", False),
+                "source": response.get("source"),
+                "route": response.get("route"),
+                "error": response.get("error")
+            }
+            with lock:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                answered += 1
+                failed += 0 if record["success"] else 1
+                status = "✅" if record["success"] else "❌"
+                print(f"  {status} [{answered}/{len(questions)}] {record['question'][:80]}")
+        
+        chatbot.answer_many(
+            [item["question"] for item in questions],
+            concurrency=args.concurrency,
+            use_mcp=mcp_status["connected"],
+            on_result=write_answer
+        )
+    
+    print(f"✅ {answered - failed} answered, {failed} failed in {time.perf_counter() - started:.1f}s")
+    print(f"Answers written to {output_path}")
+
+
+def load_chatbot():
+    """Import the crew modules and build the chatbot; runs in a background thread"""
+    timings = {}
+    
+    started = time.perf_counter()
+    from src.crews import NotionChatbot
+    timings["import"] = time.perf_counter() - started
+    
+    # Keep the local index fresh while chatting if a sync interval is configured
+    if float(os.getenv("NOTION_SYNC_INTERVAL") or 0) > 0:
+        from src.notion_sync import start_background_sync
+        start_background_sync()
+    
+    started = time.perf_counter()
     chatbot = NotionChatbot()
+    timings["build"] = time.perf_counter() - started
     
-    # Check MCP status
+    started = time.perf_counter()
     mcp_status = chatbot.get_mcp_status()
+    timings["mcp_status"] = time.perf_counter() - started
+    
+    return chatbot, mcp_status, timings
+
+
+def start_loading_chatbot() -> Future:
+    """Start building the chatbot in a daemon thread, so quitting never waits for it"""
+    future = Future()
+    
+    def run():
+        try:
+            future.set_result(load_chatbot())
+        except Exception as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=run, name="chatbot-loader", daemon=True).start()
+    return future
+
+
+def wait_for_chatbot(loader: Future):
+    """Wait for the background loader; returns its result, or None if loading failed"""
+    if not loader.done():
+        print("⏳ Finishing startup...")
+    try:
+        loaded = loader.result()
+    except Exception as e:
+        print(f"❌ Could not start the chatbot: {str(e)}")
+        return None
+    print("✅ CrewAI Notion Chatbot is ready!")
+    return loaded
+
+
+def print_mcp_status(mcp_status):
+    """Report whether answers will come from MCP or local crews"""
     if mcp_status['connected']:
         print("✅ MCP Connected")
         crews = mcp_status.get('available_crews', [])
@@ -47,12 +242,78 @@ def main():
     else:
         print(f"⚠️ MCP not available: {mcp_status.get('error', 'Unknown error')}")
         print("Using local CrewAI crews instead")
+
+
+def print_answer_stream(events):
+    """Print steps and answer tokens as they arrive and return the final response"""
+    answering = False
+    response = {"success": False, "error": "No response"}
+    
+    for event in events:
+        if event["type"] == "step":
+            print(f"  {event['content']}")
+        elif event["type"] == "token":
+            if not answering:
+                print("\n🤖 Assistant: ", end="")
+                answering = True
+            print(event["content"], end="", flush=True)
+        elif event["type"] == "done":
+            response = event["response"]
+    
+    if answering:
+        print()
+    return response
+
+
+def report_startup(first_prompt_at: float, loader: Future):
+    """Print the startup benchmark"""
+    loaded = wait_for_chatbot(loader)
+    if loaded is None:
+        return
+    _, _, timings = loaded
+    ready_at = time.perf_counter()
+    
+    print("\n⏱️ Startup benchmark")
+    print(f"  Time to first prompt:      {(first_prompt_at - STARTED_AT) * 1000:8.1f} ms")
+    print(f"  Crew module imports:       {timings['import'] * 1000:8.1f} ms (background)")
+    print(f"  Chatbot construction:      {timings['build'] * 1000:8.1f} ms (background)")
+    print(f"  MCP status check:          {timings['mcp_status'] * 1000:8.1f} ms (background)")
+    print(f"  Time to chatbot ready:     {(ready_at - STARTED_AT) * 1000:8.1f} ms")
+
+
+def main(argv=None):
+    """Main function to run the chatbot"""
+    # Load environment variables
+    load_dotenv()
+    args = parse_args(argv)
+    
+    if args.command == "sync":
+        run_sync(args)
+        return
+    
+    if args.batch:
+        run_batch(args)
+        return
+    
+    # Check if required environment variables are set
+    if not check_required_vars(["OPENAI_API_KEY", "NOTION_TOKEN"]):
+        return
+    
+    # Build the chatbot in the background so the prompt appears right away
+    print("🤖 Initializing CrewAI Notion Chatbot...")
+    loader = start_loading_chatbot()
+    chatbot = None
     
     print("\n" + "="*50)
-    print("CrewAI Notion Chatbot is ready!")
+    print("CrewAI Notion Chatbot")
+    print("Ask a question while it finishes loading")
     print("Type 'quit' or 'exit' to stop the chatbot")
     print("="*50 + "\n")
     
+    if args.benchmark_startup:
+        report_startup(time.perf_counter(), loader)
+        return
+    
     # Chat loop
     while True:
         try:
@@ -65,18 +326,25 @@ def main():
             if not user_input:
                 continue
             
+            if chatbot is None:
+                loaded = wait_for_chatbot(loader)
+                if loaded is None:
+                    break
+                chatbot, mcp_status, _ = loaded
+                print_mcp_status(mcp_status)
+            
             print("🤔 Thinking...")
             
-            # Get response from chatbot
-            response = chatbot.answer_question(user_input, use_mcp=mcp_status['connected'])
+            # Stream the answer from the chatbot as it is produced
+            response = print_answer_stream(chatbot.stream_answer(user_input, use_mcp=mcp_status['connected']))
             
             if response['success']:
-                print(f"\n🤖 Assistant: {response['answer']}")
-                
                 # Show source information
                 source = response['source']
                 if source == "mcp_crew":
                     print(f"✅ (Response from MCP Crew - ID: {response.get('execution_id', 'unknown')})")
+                elif source == "local_fast_path":
+                    print(f"⚡ (Fast path for a {response.get('route', 'lookup')} question - MCP unavailable)")
                 else:
                     print("⚠️ (Response from Local Crew - MCP unavailable)")
             else:
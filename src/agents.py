@@ -2,28 +2,129 @@
 CrewAI agents for the Notion-connected chatbot
 """
 import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 from crewai import Agent
+from langchain_core.caches import BaseCache
+from langchain_core.rate_limiters import InMemoryRateLimiter
 from langchain_openai import ChatOpenAI
-from .notion_tools import NotionSearchTool, NotionPageRetrieverTool, NotionDatabaseQueryTool
+from .llm_cache import CachedOpenAICompletion, get_llm_cache, llm_cache_deterministic
+from .streaming import get_stream_handler
+from .notion_tools import (
+    NotionSearchTool,
+    NotionPageRetrieverTool,
+    NotionDatabaseQueryTool,
+    NotionDatabaseAggregateTool,
+    NotionSemanticSearchTool
+)
 
 
-def get_llm():
-    """Get the configured LLM"""
-    return ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0.7,
-        openai_api_key=os.getenv("OPENAI_API_KEY")
-    )
+_llms: Dict[Tuple[str, float, Optional[BaseCache]], ChatOpenAI] = {}
+_agent_llms: Dict[Tuple[str, float], CachedOpenAICompletion] = {}
+_llms_lock = threading.Lock()
+_openai_rate_limiter: Optional[InMemoryRateLimiter] = None
+_openai_rate_limiter_lock = threading.Lock()
 
+# LLM requests per second while questions are answered concurrently and OPENAI_RATE_LIMIT is unset
+DEFAULT_CONCURRENT_RATE_LIMIT = 5.0
 
-def create_notion_researcher_agent():
-    """Create an agent specialized in researching Notion content"""
+
+def get_openai_rate_limiter(default_rate: float = 0.0) -> Optional[InMemoryRateLimiter]:
+    """
+    Get the limiter shared by all LLM calls
+
+    Returns None unless OPENAI_RATE_LIMIT or default_rate is positive, or a
+    limiter was already created; OPENAI_RATE_LIMIT=0 disables it.
+    """
+    global _openai_rate_limiter
+    with _openai_rate_limiter_lock:
+        if _openai_rate_limiter is None:
+            requests_per_second = float(os.getenv("OPENAI_RATE_LIMIT") or default_rate)
+            if requests_per_second <= 0:
+                return None
+            _openai_rate_limiter = InMemoryRateLimiter(
+                requests_per_second=requests_per_second,
+                max_bucket_size=max(1, requests_per_second)
+            )
+        return _openai_rate_limiter
+
+
+def ensure_openai_rate_limiter(default_rate: float = DEFAULT_CONCURRENT_RATE_LIMIT) -> Optional[InMemoryRateLimiter]:
+    """Put every LLM behind the shared limiter, at default_rate unless OPENAI_RATE_LIMIT is set"""
+    limiter = get_openai_rate_limiter(default_rate)
+    with _llms_lock:
+        for llm in list(_llms.values()) + list(_agent_llms.values()):
+            if llm.rate_limiter is None:
+                llm.rate_limiter = limiter
+    return limiter
+
+
+def get_llm(model: str = "gpt-4o-mini", temperature: float = 0.7, cache: Optional[BaseCache] = None):
+    """Get the LangChain chat model for LLM calls made outside crews (fast path, history summaries)"""
+    # Sampled responses vary between calls, so only temperature 0 calls are cached;
+    # deterministic mode runs every LLM at temperature 0
+    if llm_cache_deterministic():
+        temperature = 0.0
+    if cache is None and temperature == 0:
+        cache = get_llm_cache()
+    
+    key = (model, temperature, cache)
+    with _llms_lock:
+        if key not in _llms:
+            _llms[key] = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                cache=cache,
+                # Concurrent questions, e.g. from answer_many, share one request budget
+                rate_limiter=get_openai_rate_limiter(),
+                # Tokens only reach a stream while a question is answered with stream_answer
+                streaming=True,
+                callbacks=[get_stream_handler()]
+            )
+        return _llms[key]
+
+
+def get_agent_llm(model: str = "gpt-4o-mini", temperature: float = 0.7) -> CachedOpenAICompletion:
+    """
+    Get the crewai LLM the agents run on, shared by every agent in the process
+
+    crewai only runs agents on its own LLM classes, so the response cache and
+    the rate limiter of get_llm are attached to a crewai OpenAI LLM here.
+    """
+    if llm_cache_deterministic():
+        temperature = 0.0
     
-    notion_tools = [
+    key = (model, temperature)
+    with _llms_lock:
+        if key not in _agent_llms:
+            _agent_llms[key] = CachedOpenAICompletion(
+                model=model,
+                temperature=temperature,
+                api_key=os.getenv("OPENAI_API_KEY"),
+                response_cache=get_llm_cache(),
+                rate_limiter=get_openai_rate_limiter(),
+                # Streamed chunks reach the answer stream through crewai's LLM stream events
+                stream=True
+            )
+        return _agent_llms[key]
+
+
+def create_notion_tools():
+    """Create the Notion tools used by the researcher"""
+    return [
+        NotionSemanticSearchTool(),
         NotionSearchTool(),
         NotionPageRetrieverTool(),
-        NotionDatabaseQueryTool()
+        NotionDatabaseQueryTool(),
+        NotionDatabaseAggregateTool()
     ]
+
+
+def create_notion_researcher_agent(notion_tools=None):
+    """Create an agent specialized in researching Notion content"""
+    
+    notion_tools = notion_tools or create_notion_tools()
     
     return Agent(
         role="Notion Content Researcher",
@@ -33,7 +134,7 @@ def create_notion_researcher_agent():
         for answering user questions. You understand how to interpret Notion's structure and 
         present information in a clear, organized manner.""",
         tools=notion_tools,
-        llm=get_llm(),
+        llm=get_agent_llm(),
         verbose=True,
         allow_delegation=False,
         max_iter=3
@@ -51,7 +152,7 @@ def create_qa_specialist_agent():
         and present it in a coherent, well-structured response. You always cite your sources 
         and provide context for your answers.""",
         tools=[],
-        llm=get_llm(),
+        llm=get_agent_llm(),
         verbose=True,
         allow_delegation=False,
         max_iter=2
@@ -69,7 +170,7 @@ def create_conversation_manager_agent():
         other agents to provide the best possible response. You maintain context throughout 
         the conversation and can handle follow-up questions effectively.""",
         tools=[],
-        llm=get_llm(),
+        llm=get_agent_llm(),
         verbose=True,
         allow_delegation=True,
         max_iter=2
@@ -87,8 +188,30 @@ def create_mcp_coordinator_agent():
         and integrate their results into the conversation. You understand how to work with 
         both local and remote crew deployments.""",
         tools=[],
-        llm=get_llm(),
+        llm=get_agent_llm(),
         verbose=True,
         allow_delegation=False,
         max_iter=2
     )
+
+
+class AgentPool:
+    """
+    The chatbot's agents, built once and reused for every question
+
+    Building an agent creates its tools and wires up its LLM, so doing it
+    per question dominated setup time. Tasks are still created per
+    question, but they are assigned these prebuilt agents. Pools can share
+    tools, which only hold process-wide clients and caches.
+    """
+    
+    def __init__(self, tools: Optional[Dict[str, Any]] = None):
+        self.tools = tools if tools is not None else {tool.name: tool for tool in create_notion_tools()}
+        self.conversation_manager = create_conversation_manager_agent()
+        self.researcher = create_notion_researcher_agent(list(self.tools.values()))
+        self.qa_specialist = create_qa_specialist_agent()
+    
+    @property
+    def agents(self) -> List[Agent]:
+        """Agents in the order the crew runs them"""
+        return [self.conversation_manager, self.researcher, self.qa_specialist]
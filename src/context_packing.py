@@ -0,0 +1,183 @@
+"""
+Relevance-ranked packing of page blocks into a token budget
+"""
+import math
+import os
+import re
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional
+
+from .search_index import STOPWORDS
+from .tool_output import count_tokens, format_block
+
+
+DEFAULT_PAGE_TOKEN_BUDGET = 1500
+
+# The question the crew is currently answering, so tools can rank content
+# against it without the agent having to pass it along
+_active_question: ContextVar[str] = ContextVar("active_question", default="")
+
+
+def set_active_question(question: str) -> Token:
+    """Set the question being answered; returns a token for reset_active_question"""
+    return _active_question.set(question or "")
+
+
+def reset_active_question(token: Token) -> None:
+    """Restore the active question from before set_active_question"""
+    _active_question.reset(token)
+
+
+def get_active_question() -> str:
+    """Get the question being answered in this context"""
+    return _active_question.get()
+
+
+def get_page_token_budget() -> int:
+    """Get the token budget for one page of retrieved content"""
+    return int(os.getenv("NOTION_PAGE_TOKEN_BUDGET", str(DEFAULT_PAGE_TOKEN_BUDGET)))
+
+
+def _terms(text: str) -> List[str]:
+    return [term for term in re.findall(r"\w+", text.lower()) if term not in STOPWORDS]
+
+
+def _is_heading(block: Dict[str, Any]) -> bool:
+    return block.get("type", "").startswith("heading_")
+
+
+def score_blocks(blocks: List[Dict[str, Any]], question: str, k1: float = 1.2, b: float = 0.75) -> List[float]:
+    """
+    Score each block against a question with BM25 over the page's blocks
+
+    Blocks also inherit half the score of the headings above them, so a
+    section whose heading matches the question ranks as a whole.
+    """
+    query_terms = set(_terms(question))
+    if not blocks or not query_terms:
+        return [0.0] * len(blocks)
+
+    block_terms = [Counter(_terms(block.get("text", ""))) for block in blocks]
+    average_length = sum(sum(terms.values()) for terms in block_terms) / len(blocks) or 1.0
+    idf = {}
+    for term in query_terms:
+        frequency = sum(1 for terms in block_terms if term in terms)
+        idf[term] = math.log(1 + (len(blocks) - frequency + 0.5) / (frequency + 0.5))
+
+    scores = []
+    for terms in block_terms:
+        length = sum(terms.values())
+        score = 0.0
+        for term in query_terms:
+            tf = terms.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+
+    headings: Dict[int, float] = {}
+    section_scores = []
+    for block, score in zip(blocks, scores):
+        if _is_heading(block):
+            level = int(block["type"][-1])
+            headings = {lvl: heading for lvl, heading in headings.items() if lvl < level}
+            section_scores.append(max(headings.values(), default=0.0))
+            headings[level] = score
+        else:
+            section_scores.append(max(headings.values(), default=0.0))
+
+    return [score + 0.5 * section for score, section in zip(scores, section_scores)]
+
+
+def block_ancestors(blocks: List[Dict[str, Any]]) -> List[List[int]]:
+    """For each block, the indices of the headings and parent blocks it sits under"""
+    ancestors: List[List[int]] = []
+    headings: Dict[int, int] = {}
+    parents: List[int] = []
+
+    for index, block in enumerate(blocks):
+        depth = block.get("depth", 0)
+        parents = parents[:depth]
+        if _is_heading(block) and depth == 0:
+            level = int(block["type"][-1])
+            headings = {lvl: i for lvl, i in headings.items() if lvl < level}
+            ancestors.append(sorted(headings.values()))
+            headings[level] = index
+        else:
+            ancestors.append(sorted(set(headings.values()) | set(parents)))
+        parents.append(index)
+
+    return ancestors
+
+
+def pack_blocks(
+    blocks: List[Dict[str, Any]],
+    question: str = "",
+    budget: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Split a page's blocks into parts that each fit the token budget
+
+    The first part holds the blocks most relevant to the question together
+    with the headings and parent blocks they sit under; later parts hold the
+    remaining blocks in document order. Without a question, or when the
+    whole page fits, parts simply follow document order.
+
+    Returns:
+        Block indices of each part, in document order
+    """
+    budget = budget if budget is not None else get_page_token_budget()
+    costs = [count_tokens(format_block(block)) + 1 for block in blocks]
+    if sum(costs) <= budget:
+        return [list(range(len(blocks)))]
+
+    ancestors = block_ancestors(blocks)
+    scores = score_blocks(blocks, question)
+    first: set = set()
+    remaining_budget = budget
+
+    if any(scores):
+        candidates = sorted(
+            (index for index, block in enumerate(blocks) if not _is_heading(block) and scores[index] > 0),
+            key=lambda index: (-scores[index], index)
+        )
+        for index in candidates:
+            needed = [i for i in ancestors[index] + [index] if i not in first]
+            cost = sum(costs[i] for i in needed)
+            if cost <= remaining_budget:
+                first.update(needed)
+                remaining_budget -= cost
+
+    parts = [sorted(first)] if first else []
+    part: List[int] = []
+    part_cost = 0
+    for index in range(len(blocks)):
+        if index in first:
+            continue
+        if part and part_cost + costs[index] > budget:
+            parts.append(part)
+            part, part_cost = [], 0
+        if not part:
+            # Continuation parts repeat the headings their first block sits under
+            part.extend(ancestors[index])
+            part_cost += sum(costs[i] for i in ancestors[index])
+        part.append(index)
+        part_cost += costs[index]
+    if part:
+        parts.append(part)
+
+    return parts
+
+
+def select_blocks(blocks: List[Dict[str, Any]], indices: List[int]) -> List[Dict[str, Any]]:
+    """The blocks of one part, with a marker wherever blocks were left out"""
+    selected = []
+    previous = -1
+    for index in indices:
+        if index > previous + 1:
+            selected.append({"type": "omitted", "text": "…", "depth": blocks[index].get("depth", 0)})
+        selected.append(blocks[index])
+        previous = index
+    if previous < len(blocks) - 1:
+        selected.append({"type": "omitted", "text": "…", "depth": 0})
+    return selected
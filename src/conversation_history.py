@@ -0,0 +1,183 @@
+"""
+Bounded conversation history with rolling summaries of older turns
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .tool_output import count_tokens
+
+
+DEFAULT_MAX_ENTRIES = 20
+DEFAULT_CONTEXT_TOKENS = 1000
+
+# Entries evicted from the buffer are folded into the summary this many at a time
+SUMMARIZE_EVERY = 4
+MAX_SUMMARY_WORDS = 150
+MAX_ENTRY_TOKENS = 300
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant
+that answers questions about a Notion workspace. Keep the facts, names, page references like [p3]
+and open questions that later questions may refer to. Reply with the updated summary only,
+in at most {max_words} words."""
+
+# Summaries are written in the background so answers never wait for them
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summary")
+
+
+def utc_timestamp() -> str:
+    """The current time as an ISO 8601 UTC timestamp"""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _speaker(entry: Dict[str, Any]) -> str:
+    return "User" if entry.get("type") == "user_question" else "Assistant"
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens tokens"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Tokens average about four characters of English text
+    return text[:max_tokens * 4].rstrip() + " …"
+
+
+class ConversationHistory:
+    """
+    Ring buffer of the latest conversation entries plus a summary of the rest
+
+    Entries are {"type": "user_question" | "assistant_response", "content": str,
+    "timestamp": ISO 8601 UTC}. Once the buffer is full, the oldest entries
+    are evicted and an LLM folds them into a running summary, so memory and
+    the context given to the crew stay bounded however long the session runs.
+    The history iterates, indexes and slices like the list it replaces.
+    """
+
+    def __init__(self, llm: Any = None, max_entries: Optional[int] = None, context_tokens: Optional[int] = None):
+        self.llm = llm
+        self.max_entries = max_entries or int(os.getenv("CONVERSATION_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES)))
+        self.context_tokens = context_tokens or int(os.getenv("CONVERSATION_CONTEXT_TOKENS", str(DEFAULT_CONTEXT_TOKENS)))
+        self.summary = ""
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=self.max_entries)
+        self._evicted: List[Dict[str, Any]] = []
+        self._summarizing = False
+        self._lock = threading.Lock()
+
+    def add(self, entry_type: str, content: str) -> Dict[str, Any]:
+        """Record a question or answer, timestamped now"""
+        entry = {"type": entry_type, "content": content, "timestamp": utc_timestamp()}
+        self.append(entry)
+        return entry
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Record an entry, evicting the oldest into the summary when the buffer is full"""
+        entry = dict(entry)
+        if entry.get("timestamp") in (None, "", "now"):
+            entry["timestamp"] = utc_timestamp()
+
+        with self._lock:
+            if len(self._entries) == self.max_entries:
+                self._evicted.append(self._entries[0])
+            self._entries.append(entry)
+            start_summary = len(self._evicted) >= SUMMARIZE_EVERY and not self._summarizing
+            if start_summary:
+                self._summarizing = True
+
+        if start_summary:
+            _summary_executor.submit(self._summarize)
+
+    def clear(self) -> None:
+        """Forget every entry and the summary"""
+        with self._lock:
+            self._entries.clear()
+            self._evicted = []
+            self.summary = ""
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """The entries still held verbatim, oldest first"""
+        with self._lock:
+            return list(self._entries)
+
+    def context_window(self, token_budget: Optional[int] = None) -> str:
+        """
+        The conversation before the current question, fitted to a token budget
+
+        The summary of evicted turns comes first, followed by the most recent
+        turns that fit, each cut to a bounded length. The question being
+        answered (the last entry, if it is a question) is left out.
+
+        Returns:
+            The context text, or "" when there is no earlier conversation
+        """
+        budget = token_budget if token_budget is not None else self.context_tokens
+        with self._lock:
+            entries = list(self._entries)
+            pending = list(self._evicted)
+            summary = self.summary
+        if entries and entries[-1].get("type") == "user_question":
+            entries = entries[:-1]
+
+        sections = []
+        if summary:
+            sections.append(f"Summary of earlier conversation: {summary}")
+            budget -= count_tokens(sections[0])
+
+        recent: List[str] = []
+        # Evicted entries waiting to be summarized are still shown while they fit
+        for entry in reversed(pending + entries):
+            line = f"{_speaker(entry)}: {_truncate(entry['content'], MAX_ENTRY_TOKENS)}"
+            cost = count_tokens(line) + 1
+            if cost > budget:
+                break
+            recent.append(line)
+            budget -= cost
+        sections.extend(reversed(recent))
+
+        return "\n".join(sections)
+
+    def _summarize(self) -> None:
+        """Fold evicted entries into the summary until none are left"""
+        while True:
+            with self._lock:
+                evicted = list(self._evicted)
+                summary = self.summary
+                if not evicted:
+                    self._summarizing = False
+                    return
+
+            try:
+                summary = self._write_summary(summary, evicted)
+            except Exception as e:
+                print(f"⚠️ Could not summarize conversation history: {str(e)}")
+                summary = _truncate(
+                    " ".join(filter(None, [summary] + [f"{_speaker(entry)}: {entry['content']}" for entry in evicted])),
+                    MAX_SUMMARY_WORDS * 2
+                )
+
+            with self._lock:
+                # clear() may have run meanwhile; only drop what was summarized
+                if self._evicted[:len(evicted)] == evicted:
+                    self._evicted = self._evicted[len(evicted):]
+                    self.summary = summary
+
+    def _write_summary(self, summary: str, evicted: List[Dict[str, Any]]) -> str:
+        if self.llm is None:
+            raise ValueError("no LLM configured for summaries")
+        turns = "\n".join(f"{_speaker(entry)}: {_truncate(entry['content'], MAX_ENTRY_TOKENS)}" for entry in evicted)
+        response = self.llm.invoke([
+            ("system", SUMMARY_PROMPT.format(max_words=MAX_SUMMARY_WORDS)),
+            ("human", f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{turns}")
+        ])
+        return str(getattr(response, "content", response)).strip()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.entries())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        return self.entries()[index]
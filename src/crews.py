@@ -1,81 +1,147 @@
 """
 CrewAI crew configurations for the Notion-connected chatbot
 """
-from crewai import Crew, Task, Process
+import asyncio
+import contextvars
+import copy
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from crewai import Agent, Crew, Process, Task
+
 from .agents import (
+    AgentPool,
+    ensure_openai_rate_limiter,
+    get_agent_llm,
+    get_llm,
     create_notion_researcher_agent,
     create_qa_specialist_agent,
     create_conversation_manager_agent,
     create_mcp_coordinator_agent
 )
-from .mcp_client import get_mcp_client
+from .conversation_history import ConversationHistory
+from .context_packing import reset_active_question, set_active_question
+from .mcp_client import (
+    CircuitBreaker,
+    get_async_mcp_client,
+    get_circuit_breaker,
+    get_crew_catalog_cache,
+    get_mcp_client,
+    wait_for_crew_completion
+)
+from .memory import create_crew_memory, get_memory_retention
+from .research import ParallelResearcher, research_mode
+from .router import AGGREGATE, FOLLOW_UP, LOOKUP, RESEARCH, FastPathAnswerer, classify_question
+from .streaming import StreamEvent, StreamSink, emit_step, emit_task_done, get_stream_sink, set_stream_sink
+from .tool_output import get_reference_registry
 
 
-def create_notion_qa_crew():
+def create_notion_qa_crew(agent_pool: Optional[AgentPool] = None):
     """Create a crew specialized in answering questions about Notion content"""
     
-    # Create agents
-    researcher = create_notion_researcher_agent()
-    qa_specialist = create_qa_specialist_agent()
-    conversation_manager = create_conversation_manager_agent()
+    # Reuse prebuilt agents when given
+    agent_pool = agent_pool or AgentPool()
     
     return Crew(
-        agents=[conversation_manager, researcher, qa_specialist],
+        agents=agent_pool.agents,
         process=Process.sequential,
         verbose=True,
-        memory=True,
-        embedder={
-            "provider": "openai",
-            "config": {"model": "text-embedding-3-small"}
-        }
+        step_callback=emit_step,
+        task_callback=emit_task_done,
+        # Memory embeddings are cached by content hash, so repeated texts are not re-embedded
+        memory=create_crew_memory(get_agent_llm(temperature=0.0))
+    )
+
+
+def create_reduced_qa_crew(agent_pool: AgentPool):
+    """Create a researcher and QA crew for questions that need no conversation management"""
+    return Crew(
+        agents=[agent_pool.researcher, agent_pool.qa_specialist],
+        process=Process.sequential,
+        verbose=True,
+        step_callback=emit_step,
+        task_callback=emit_task_done
+    )
+
+
+def create_answer_crew(agent_pool: AgentPool):
+    """Create a crew of only the QA specialist, for findings gathered outside the crew"""
+    return Crew(
+        agents=[agent_pool.qa_specialist],
+        process=Process.sequential,
+        verbose=True,
+        step_callback=emit_step,
+        task_callback=emit_task_done
     )
 
 
-def create_research_task(user_question: str):
+def conversation_section(conversation_context: str) -> str:
+    """Task description section with the conversation leading up to the question"""
+    return f"""
+        Conversation so far (use it to resolve follow-up questions):
+        {conversation_context}
+        """ if conversation_context else ""
+
+
+def create_research_task(user_question: str, agent: Optional[Agent] = None, conversation_context: str = ""):
     """Create a research task for finding relevant Notion content"""
     return Task(
         description=f"""
         Research and find relevant information in the Notion workspace to answer this question: {user_question}
-        
+        {conversation_section(conversation_context)}
         Steps to follow:
-        1. Search for relevant pages and databases in Notion using the search tool
-        2. Retrieve detailed content from the most relevant pages
-        3. Query relevant databases for specific information
-        4. Organize and summarize the findings
+        1. Pull the most relevant passages with the semantic search tool
+        2. If the passages are not enough, search for relevant pages and databases using the search tool
+        3. Retrieve detailed content only from pages the passages do not already cover
+        4. Query relevant databases for specific information; use the aggregate tool for counts, totals and other statistics
+        5. Organize and summarize the findings, keeping the short reference (e.g. [p3]) of every source
         
         Focus on finding the most relevant and up-to-date information to answer the user's question.
         """,
         expected_output="A comprehensive summary of relevant information found in Notion, organized by source and relevance",
-        agent=create_notion_researcher_agent()
+        agent=agent or create_notion_researcher_agent()
     )
 
 
-def create_answer_task(user_question: str):
+def create_answer_task(
+    user_question: str,
+    agent: Optional[Agent] = None,
+    findings: Optional[str] = None,
+    conversation_context: str = ""
+):
     """Create a task for answering the user's question based on research"""
+    findings_section = f"""
+        Research findings from Notion:
+        {findings}
+        """ if findings else ""
+    
     return Task(
         description=f"""
         Based on the research findings from Notion, provide a comprehensive answer to this question: {user_question}
-        
+        {conversation_section(conversation_context)}{findings_section}
         Requirements:
         1. Use the information gathered from Notion to answer the question
         2. Provide a clear, well-structured response
         3. Include relevant details and context
-        4. Cite sources (page titles, URLs) where appropriate
+        4. Cite sources by their short reference in brackets, e.g. [p3]; references are turned into links
         5. If the information is incomplete, mention what additional information might be needed
         
         Make sure your answer is accurate, helpful, and directly addresses the user's question.
         """,
         expected_output="A comprehensive, well-structured answer to the user's question with proper citations",
-        agent=create_qa_specialist_agent()
+        agent=agent or create_qa_specialist_agent()
     )
 
 
-def create_conversation_management_task(user_question: str):
+def create_conversation_management_task(user_question: str, agent: Optional[Agent] = None, conversation_context: str = ""):
     """Create a task for managing the conversation flow"""
     return Task(
         description=f"""
         Manage the conversation flow and ensure the user's question is properly understood and addressed: {user_question}
-        
+        {conversation_section(conversation_context)}
         Responsibilities:
         1. Understand the user's intent and question context
         2. Coordinate with other agents to gather and synthesize information
@@ -85,7 +151,7 @@ def create_conversation_management_task(user_question: str):
         Make sure the overall response is coherent and meets the user's needs.
         """,
         expected_output="A well-managed conversation response that addresses the user's question comprehensively",
-        agent=create_conversation_manager_agent()
+        agent=agent or create_conversation_manager_agent()
     )
 
 
@@ -93,56 +159,267 @@ class NotionChatbot:
     """Main chatbot class that coordinates CrewAI and MCP integration"""
     
     def __init__(self):
-        self.crew = create_notion_qa_crew()
+        self.agent_pool = AgentPool()
+        self.crew = create_notion_qa_crew(self.agent_pool)
+        self.reduced_crew = create_reduced_qa_crew(self.agent_pool)
+        self.answer_crew = create_answer_crew(self.agent_pool)
+        self.parallel_researcher = ParallelResearcher(self.agent_pool.tools)
+        self.fast_path = FastPathAnswerer(self.agent_pool.tools, get_llm())
         self.mcp_client = get_mcp_client()
-        self.conversation_history = []
+        self.async_mcp_client = get_async_mcp_client()
+        self.conversation_history = ConversationHistory(llm=get_llm(temperature=0.0))
+        # Crews hold the tasks of the question they run, so one question at a time per chatbot;
+        # the lock is created in the event loop that first answers
+        self._async_answer_lock: Optional[asyncio.Lock] = None
+        self._async_answer_loop: Optional[asyncio.AbstractEventLoop] = None
     
     def answer_question(self, user_question: str, use_mcp: bool = False):
         """Answer a user question using CrewAI crew and optionally MCP"""
         
         # Add to conversation history
-        self.conversation_history.append({
-            "type": "user_question",
-            "content": user_question,
-            "timestamp": "now"
-        })
-        
-        if use_mcp:
-            # Try to use MCP crew deployment if available
-            return self._answer_with_mcp(user_question)
-        else:
-            # Use local crew
+        self.conversation_history.add("user_question", user_question)
+        
+        # Let tools rank retrieved content against the question
+        question_token = set_active_question(user_question)
+        try:
+            if use_mcp:
+                # Try to use MCP crew deployment if available
+                return self._answer_with_mcp(user_question)
+            else:
+                # Use the cheapest local path that can answer the question
+                return self._answer_locally(user_question)
+        finally:
+            reset_active_question(question_token)
+    
+    async def aanswer_question(self, user_question: str, use_mcp: bool = False):
+        """
+        Answer a user question without blocking the event loop
+        
+        Notion and MCP requests are awaited on async clients and crews run
+        with kickoff_async, so one event loop can serve many conversations
+        at once. Use one chatbot per conversation; questions asked of the
+        same chatbot concurrently are answered one after another.
+        """
+        async with self._answer_lock():
+            self.conversation_history.add("user_question", user_question)
+            
+            # Each asyncio task has its own context, so the active question stays with this answer
+            question_token = set_active_question(user_question)
+            try:
+                if use_mcp:
+                    return await self._aanswer_with_mcp(user_question)
+                else:
+                    return await self._aanswer_locally(user_question)
+            finally:
+                reset_active_question(question_token)
+    
+    def _answer_lock(self) -> asyncio.Lock:
+        """The lock serializing aanswer_question calls in the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_answer_loop is not loop:
+            self._async_answer_lock = asyncio.Lock()
+            self._async_answer_loop = loop
+        return self._async_answer_lock
+    
+    def stream_answer(self, user_question: str, use_mcp: bool = False) -> Iterator[StreamEvent]:
+        """
+        Answer a question, yielding events as they are produced
+        
+        Yields:
+            {"type": "step", "content": ...} for intermediate agent steps,
+            {"type": "token", "content": ...} for pieces of the final answer, and
+            {"type": "done", "response": ...} with the answer_question response last
+        """
+        sink = StreamSink()
+        
+        def answer() -> Dict[str, Any]:
+            set_stream_sink(sink)
+            return self.answer_question(user_question, use_mcp=use_mcp)
+        
+        def run() -> None:
+            try:
+                response = context.run(answer)
+            except Exception as e:
+                response = {"success": False, "error": f"Error answering question: {str(e)}", "source": "local_crew"}
+            sink.close(response)
+        
+        # The crew runs in a copy of this context, so the sink stays private to it
+        context = contextvars.copy_context()
+        threading.Thread(target=run, name="answer-stream", daemon=True).start()
+        yield from sink.events()
+    
+    def answer_many(
+        self,
+        questions: List[str],
+        concurrency: Optional[int] = None,
+        use_mcp: bool = False,
+        on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer a batch of independent questions concurrently
+        
+        Each worker thread answers with its own agents, crews and conversation
+        history, since crews hold the tasks of the question they are running;
+        the tools, fast path and MCP clients of this chatbot are shared, as are
+        the page cache, the rate limiters and the LLMs. With more than one
+        worker, LLM requests go through the OpenAI rate limiter, at
+        OPENAI_RATE_LIMIT or a default rate. Identical questions are answered
+        once, and a page needed by several questions at the same time is
+        fetched once.
+        
+        Args:
+            questions: The questions, answered without conversation history
+            concurrency: Number of questions answered at a time
+                (default: BATCH_CONCURRENCY or 4)
+            use_mcp: Whether to answer with the MCP crew deployment
+            on_result: Called with the index and response of each question
+                as soon as it is answered
+        
+        Returns:
+            The answer_question responses, in the order of questions
+        """
+        concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+        if concurrency > 1:
+            ensure_openai_rate_limiter()
+        
+        # Duplicate questions share one answer
+        positions: Dict[str, List[int]] = {}
+        for index, question in enumerate(questions):
+            positions.setdefault(" ".join(question.split()).lower(), []).append(index)
+        
+        # The first worker reuses this chatbot; its history is restored afterwards
+        workers = threading.local()
+        spare = [self]
+        spare_lock = threading.Lock()
+        history = self.conversation_history
+        self.conversation_history = ConversationHistory(llm=history.llm)
+        
+        def answer(question: str) -> Dict[str, Any]:
+            chatbot = getattr(workers, "chatbot", None)
+            if chatbot is None:
+                with spare_lock:
+                    chatbot = spare.pop() if spare else None
+                chatbot = workers.chatbot = chatbot or self._batch_worker()
+            chatbot.clear_conversation_history()
+            try:
+                return chatbot.answer_question(question, use_mcp=use_mcp)
+            except Exception as e:
+                return {"success": False, "error": f"Error answering question: {str(e)}", "source": "local_crew"}
+        
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+                futures = {
+                    executor.submit(answer, questions[indices[0]]): indices
+                    for indices in positions.values()
+                }
+                for future in as_completed(futures):
+                    response = future.result()
+                    for index in futures[future]:
+                        responses[index] = response
+                        if on_result is not None:
+                            on_result(index, response)
+        finally:
+            self.conversation_history = history
+        return responses
+    
+    def _batch_worker(self) -> "NotionChatbot":
+        """A chatbot for one answer_many worker, sharing this chatbot's tools and clients"""
+        worker = copy.copy(self)
+        # Crews bind their agents while running, so agents are only shared within a worker
+        worker.agent_pool = AgentPool(self.agent_pool.tools)
+        worker.crew = create_notion_qa_crew(worker.agent_pool)
+        worker.reduced_crew = create_reduced_qa_crew(worker.agent_pool)
+        worker.answer_crew = create_answer_crew(worker.agent_pool)
+        worker.conversation_history = ConversationHistory(llm=self.conversation_history.llm)
+        worker._async_answer_lock = None
+        worker._async_answer_loop = None
+        return worker
+    
+    def _answer_locally(self, user_question: str):
+        """Route a question to the fast path, the reduced crew or the full crew"""
+        route = classify_question(user_question, self.conversation_history)
+        
+        if route in (LOOKUP, FOLLOW_UP):
+            try:
+                history = self.conversation_history if route == FOLLOW_UP else None
+                sink = get_stream_sink()
+                if sink is not None:
+                    sink.step(f"⚡ Answering the {route.replace('_', '-')} question directly")
+                answer = self.fast_path.answer(user_question, history)
+                if answer is not None:
+                    return self._local_response(answer, "local_fast_path", route)
+            except Exception as e:
+                print(f"⚠️ Fast path failed, using the full crew: {str(e)}")
+            # Nothing relevant found in one retrieval; let the crew dig deeper
             return self._answer_with_local_crew(user_question)
+        
+        return self._answer_with_local_crew(user_question, reduced=route == AGGREGATE)
     
-    def _answer_with_local_crew(self, user_question: str):
+    async def _aanswer_locally(self, user_question: str):
+        """Async _answer_locally"""
+        route = classify_question(user_question, self.conversation_history)
+        
+        if route in (LOOKUP, FOLLOW_UP):
+            try:
+                history = self.conversation_history if route == FOLLOW_UP else None
+                answer = await self.fast_path.aanswer(user_question, history)
+                if answer is not None:
+                    return self._local_response(answer, "local_fast_path", route)
+            except Exception as e:
+                print(f"⚠️ Fast path failed, using the full crew: {str(e)}")
+            return await self._aanswer_with_local_crew(user_question)
+        
+        return await self._aanswer_with_local_crew(user_question, reduced=route == AGGREGATE)
+    
+    def _local_response(self, result, source: str, route: str):
+        """Record a local answer and build the response"""
+        answer = get_reference_registry().expand(str(result))
+        
+        # Add result to conversation history
+        self.conversation_history.add("assistant_response", answer)
+        
+        return {
+            "success": True,
+            "answer": answer,
+            "source": source,
+            "route": route,
+            "execution_id": None
+        }
+    
+    def _answer_with_local_crew(self, user_question: str, reduced: bool = False):
         """Answer question using local CrewAI crew"""
         try:
-            # Create tasks for this question
-            tasks = [
-                create_conversation_management_task(user_question),
-                create_research_task(user_question),
-                create_answer_task(user_question)
-            ]
-            
-            # Update crew with tasks
-            self.crew.tasks = tasks
+            if not reduced and research_mode() == "parallel":
+                return self._answer_with_parallel_research(user_question)
             
             # Execute the crew
-            result = self.crew.kickoff()
+            crew = self._prepare_local_crew(user_question, reduced)
+            result = crew.kickoff()
+            get_memory_retention().maybe_prune(crew)
             
-            # Add result to conversation history
-            self.conversation_history.append({
-                "type": "assistant_response",
-                "content": str(result),
-                "timestamp": "now"
-            })
+            return self._local_response(result, "local_crew", AGGREGATE if reduced else RESEARCH)
             
+        except Exception as e:
+            error_msg = f"Error executing local crew: {str(e)}"
             return {
-                "success": True,
-                "answer": str(result),
-                "source": "local_crew",
-                "execution_id": None
+                "success": False,
+                "error": error_msg,
+                "source": "local_crew"
             }
+    
+    async def _aanswer_with_local_crew(self, user_question: str, reduced: bool = False):
+        """Async _answer_with_local_crew"""
+        try:
+            if not reduced and research_mode() == "parallel":
+                findings = await self.parallel_researcher.aresearch(user_question)
+                result = await self._prepare_answer_crew(user_question, findings).kickoff_async()
+                return self._local_response(result, "local_crew", RESEARCH)
+            
+            crew = self._prepare_local_crew(user_question, reduced)
+            result = await crew.kickoff_async()
+            get_memory_retention().maybe_prune(crew)
+            return self._local_response(result, "local_crew", AGGREGATE if reduced else RESEARCH)
             
         except Exception as e:
             error_msg = f"Error executing local crew: {str(e)}"
@@ -152,89 +429,222 @@ class NotionChatbot:
                 "source": "local_crew"
             }
     
+    def _prepare_local_crew(self, user_question: str, reduced: bool = False) -> Crew:
+        """Assign this question's tasks to the full or reduced crew"""
+        # Create tasks for this question, assigned to the prebuilt agents
+        context = self.conversation_history.context_window()
+        research_task = create_research_task(user_question, self.agent_pool.researcher, context)
+        answer_task = create_answer_task(user_question, self.agent_pool.qa_specialist, conversation_context=context)
+        
+        if reduced:
+            crew = self.reduced_crew
+            crew.tasks = [research_task, answer_task]
+        else:
+            crew = self.crew
+            crew.tasks = [
+                create_conversation_management_task(user_question, self.agent_pool.conversation_manager, context),
+                research_task,
+                answer_task
+            ]
+        
+        # When streaming, only the last task's final answer is sent as tokens
+        sink = get_stream_sink()
+        if sink is not None:
+            sink.begin_crew(len(crew.tasks))
+        return crew
+    
+    def _prepare_answer_crew(self, user_question: str, findings: str) -> Crew:
+        """Assign the QA task over gathered findings to the answer crew"""
+        self.answer_crew.tasks = [create_answer_task(
+            user_question,
+            self.agent_pool.qa_specialist,
+            findings,
+            self.conversation_history.context_window()
+        )]
+        sink = get_stream_sink()
+        if sink is not None:
+            sink.begin_crew(1)
+        return self.answer_crew
+    
+    def _answer_with_parallel_research(self, user_question: str):
+        """Gather findings with concurrent tool calls, then let the QA specialist answer"""
+        findings = self.parallel_researcher.research(user_question)
+        result = self._prepare_answer_crew(user_question, findings).kickoff()
+        return self._local_response(result, "local_crew", RESEARCH)
+    
     def _answer_with_mcp(self, user_question: str):
         """Answer question using MCP crew deployment"""
+        # While the MCP server is failing, go straight to the local crew
+        breaker = get_circuit_breaker(self.mcp_client)
+        if not breaker.allow_request():
+            return self._answer_with_local_crew(user_question)
+        
+        started = time.monotonic()
         try:
-            # Check available crews
-            crews_response = self.mcp_client.list_available_crews()
+            # Check available crews (cached, so usually no request is made)
+            crews_response = get_crew_catalog_cache().get(self.mcp_client)
             
             if "error" in crews_response:
                 # Fall back to local crew
+                breaker.record_failure()
                 return self._answer_with_local_crew(user_question)
             
-            # Use the first available crew (or find notion_qa_crew)
-            available_crews = crews_response.get("crews", [])
-            crew_id = "notion_qa_crew"  # Default crew ID
-            
-            for crew in available_crews:
-                if crew.get("id") == "notion_qa_crew":
-                    crew_id = crew.get("id")
-                    break
-            
             # Kickoff the crew
             kickoff_response = self.mcp_client.kickoff_crew(
-                crew_id=crew_id,
-                inputs={"user_question": user_question}
+                crew_id=self._select_crew_id(crews_response),
+                inputs=self._mcp_inputs(user_question)
             )
             
             if "error" in kickoff_response:
                 # Fall back to local crew
+                breaker.record_failure()
                 return self._answer_with_local_crew(user_question)
             
+            # Crew runs take long; only the requests before polling count as slow calls
+            request_time = time.monotonic() - started
             execution_id = kickoff_response.get("execution_id")
             
-            # Get crew status (in a real implementation, you might poll this)
-            status_response = self.mcp_client.get_crew_status(execution_id)
+            # Poll with backoff until the run finishes or MCP_POLL_TIMEOUT passes
+            status_response = wait_for_crew_completion(self.mcp_client, execution_id)
+            self._record_mcp_outcome(breaker, status_response, request_time)
             
-            if "error" in status_response:
-                return {
-                    "success": False,
-                    "error": status_response["error"],
-                    "source": "mcp_crew"
-                }
+            return self._mcp_response(status_response, execution_id)
+            
+        except Exception as e:
+            error_msg = f"Error executing MCP crew: {str(e)}"
+            breaker.record_failure()
+            # Fall back to local crew
+            return self._answer_with_local_crew(user_question)
+    
+    async def _aanswer_with_mcp(self, user_question: str):
+        """Async _answer_with_mcp"""
+        breaker = get_circuit_breaker(self.async_mcp_client)
+        if not breaker.allow_request():
+            return await self._aanswer_with_local_crew(user_question)
+        
+        started = time.monotonic()
+        try:
+            crews_response = await get_crew_catalog_cache().aget(self.async_mcp_client)
+            if "error" in crews_response:
+                breaker.record_failure()
+                return await self._aanswer_with_local_crew(user_question)
+            
+            kickoff_response = await self.async_mcp_client.kickoff_crew(
+                crew_id=self._select_crew_id(crews_response),
+                inputs=self._mcp_inputs(user_question)
+            )
+            if "error" in kickoff_response:
+                breaker.record_failure()
+                return await self._aanswer_with_local_crew(user_question)
+            
+            request_time = time.monotonic() - started
+            execution_id = kickoff_response.get("execution_id")
+            status_response = await self.async_mcp_client.wait_for_crew_completion(execution_id)
+            self._record_mcp_outcome(breaker, status_response, request_time)
             
-            # Add result to conversation history
-            result = status_response.get("result", "No result available")
-            self.conversation_history.append({
-                "type": "assistant_response",
-                "content": result,
-                "timestamp": "now"
-            })
+            return self._mcp_response(status_response, execution_id)
             
+        except Exception as e:
+            breaker.record_failure()
+            return await self._aanswer_with_local_crew(user_question)
+    
+    def _record_mcp_outcome(self, breaker: CircuitBreaker, status_response: Dict[str, Any], request_time: float) -> None:
+        """Tell the circuit breaker whether the server handled a crew run"""
+        # A run still going at the deadline is slow work, not a server failure
+        if "error" in status_response and not status_response.get("timed_out"):
+            breaker.record_failure()
+        else:
+            breaker.record_success(request_time)
+    
+    def _mcp_inputs(self, user_question: str) -> Dict[str, Any]:
+        """Crew inputs: the question and the conversation leading up to it"""
+        inputs = {"user_question": user_question}
+        context = self.conversation_history.context_window()
+        if context:
+            inputs["conversation_context"] = context
+        return inputs
+    
+    def _select_crew_id(self, crews_response: Dict[str, Any]) -> str:
+        """Pick notion_qa_crew from the available crews"""
+        # Use the first available crew (or find notion_qa_crew)
+        available_crews = crews_response.get("crews", [])
+        crew_id = "notion_qa_crew"  # Default crew ID
+        
+        for crew in available_crews:
+            if crew.get("id") == "notion_qa_crew":
+                crew_id = crew.get("id")
+                break
+        
+        return crew_id
+    
+    def _mcp_response(self, status_response: Dict[str, Any], execution_id: Optional[str]):
+        """Record an MCP crew result and build the response"""
+        if status_response.get("timed_out"):
+            # The run may still finish; report where it got to so it can be checked later
             return {
-                "success": True,
-                "answer": result,
+                "success": False,
+                "error": status_response["error"],
                 "source": "mcp_crew",
                 "execution_id": execution_id,
-                "status": status_response.get("status", "unknown")
+                "status": status_response.get("status", "unknown"),
+                "timed_out": True
             }
-            
-        except Exception as e:
-            error_msg = f"Error executing MCP crew: {str(e)}"
-            # Fall back to local crew
-            return self._answer_with_local_crew(user_question)
+        
+        if "error" in status_response:
+            return {
+                "success": False,
+                "error": status_response["error"],
+                "source": "mcp_crew"
+            }
+        
+        if str(status_response.get("status", "")).lower() in ("failed", "error", "cancelled"):
+            return {
+                "success": False,
+                "error": f"MCP crew execution {status_response['status']}",
+                "source": "mcp_crew",
+                "execution_id": execution_id,
+                "status": status_response["status"]
+            }
+        
+        # Add result to conversation history
+        result = status_response.get("result", "No result available")
+        self.conversation_history.add("assistant_response", result)
+        
+        return {
+            "success": True,
+            "answer": result,
+            "source": "mcp_crew",
+            "execution_id": execution_id,
+            "status": status_response.get("status", "unknown")
+        }
     
     def get_conversation_history(self):
         """Get the conversation history"""
-        return self.conversation_history
+        return self.conversation_history.entries()
     
     def clear_conversation_history(self):
         """Clear the conversation history"""
-        self.conversation_history = []
+        self.conversation_history.clear()
     
-    def get_mcp_status(self):
-        """Get MCP connection status"""
+    def get_mcp_status(self, refresh: bool = False):
+        """Get MCP connection status; refresh skips the crew catalogue cache"""
         try:
-            crews_response = self.mcp_client.list_available_crews()
+            if refresh:
+                get_crew_catalog_cache().invalidate(self.mcp_client)
+            crews_response = get_crew_catalog_cache().get(self.mcp_client)
+            # "open" means questions are answered by the local crew for now
+            circuit = get_circuit_breaker(self.mcp_client).state
             if "error" in crews_response:
                 return {
                     "connected": False,
-                    "error": crews_response["error"]
+                    "error": crews_response["error"],
+                    "circuit": circuit
                 }
             else:
                 return {
                     "connected": True,
-                    "available_crews": crews_response.get("crews", [])
+                    "available_crews": crews_response.get("crews", []),
+                    "circuit": circuit
                 }
         except Exception as e:
             return {
@@ -0,0 +1,465 @@
+"""
+Local columnar mirror of Notion databases for exact aggregate queries
+"""
+import math
+import os
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from notion_client import Client
+from notion_client.helpers import iterate_paginated_api
+
+from .notion_filters import FilterQueryError, format_property_value, parse_filter_query
+from .notion_registry import get_data_source_id
+
+
+# Property types stored as numbers, booleans or multi-valued lists; every
+# other type is dictionary-encoded as a category column
+NUMBER_TYPES = ("number",)
+BOOLEAN_TYPES = ("checkbox",)
+MULTI_TYPES = ("multi_select", "people", "relation")
+
+OPERATIONS = ("count", "sum", "avg", "min", "max", "distinct")
+
+
+class Column:
+    """Dictionary-encoded column of strings (titles, selects, dates, ...)"""
+
+    kind = "category"
+
+    def __init__(self, prop_type: str):
+        self.prop_type = prop_type
+        self.codes = array("q")
+        self.categories: List[str] = []
+        self._lookup: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None or value == "":
+            return -1
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self._lookup[value] = code
+        return code
+
+    def append(self, value: Any) -> None:
+        self.codes.append(self.encode(value))
+
+    def set(self, row: int, value: Any) -> None:
+        self.codes[row] = self.encode(value)
+
+    def values(self) -> np.ndarray:
+        return np.frombuffer(self.codes, dtype=np.int64) if len(self.codes) else np.zeros(0, dtype=np.int64)
+
+    def present(self) -> np.ndarray:
+        return self.values() >= 0
+
+    def category_mask(self, predicate: Callable[[str], bool]) -> np.ndarray:
+        """Evaluate a predicate once per distinct value and map it onto rows"""
+        per_category = np.array([predicate(value) for value in self.categories] + [False], dtype=bool)
+        # Missing values (-1) pick the trailing False
+        return per_category[self.values()]
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.categories[code] if code >= 0 else None
+
+
+class NumberColumn:
+    """float64 column with NaN for missing values"""
+
+    kind = "number"
+
+    def __init__(self, prop_type: str):
+        self.prop_type = prop_type
+        self.data = array("d")
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @staticmethod
+    def _coerce(value: Any) -> float:
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else math.nan
+
+    def append(self, value: Any) -> None:
+        self.data.append(self._coerce(value))
+
+    def set(self, row: int, value: Any) -> None:
+        self.data[row] = self._coerce(value)
+
+    def values(self) -> np.ndarray:
+        return np.frombuffer(self.data, dtype=np.float64) if len(self.data) else np.zeros(0)
+
+    def present(self) -> np.ndarray:
+        return ~np.isnan(self.values())
+
+
+class BooleanColumn:
+    """int8 column: 1 true, 0 false, -1 missing"""
+
+    kind = "boolean"
+
+    def __init__(self, prop_type: str):
+        self.prop_type = prop_type
+        self.data = array("b")
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @staticmethod
+    def _coerce(value: Any) -> int:
+        return -1 if value is None else int(bool(value))
+
+    def append(self, value: Any) -> None:
+        self.data.append(self._coerce(value))
+
+    def set(self, row: int, value: Any) -> None:
+        self.data[row] = self._coerce(value)
+
+    def values(self) -> np.ndarray:
+        return np.frombuffer(self.data, dtype=np.int8) if len(self.data) else np.zeros(0, dtype=np.int8)
+
+    def present(self) -> np.ndarray:
+        return self.values() >= 0
+
+
+class MultiColumn:
+    """Multi-valued column (multi-select, people) stored as tuples"""
+
+    kind = "multi"
+
+    def __init__(self, prop_type: str):
+        self.prop_type = prop_type
+        self.data: List[Tuple[str, ...]] = []
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def append(self, value: Any) -> None:
+        self.data.append(tuple(value or ()))
+
+    def set(self, row: int, value: Any) -> None:
+        self.data[row] = tuple(value or ())
+
+    def present(self) -> np.ndarray:
+        return np.fromiter((bool(values) for values in self.data), dtype=bool, count=len(self.data))
+
+    def row_mask(self, predicate: Callable[[Tuple[str, ...]], bool]) -> np.ndarray:
+        return np.fromiter((predicate(values) for values in self.data), dtype=bool, count=len(self.data))
+
+
+def make_column(prop_type: str):
+    """Create the column type that stores a Notion property type"""
+    if prop_type in NUMBER_TYPES:
+        return NumberColumn(prop_type)
+    if prop_type in BOOLEAN_TYPES:
+        return BooleanColumn(prop_type)
+    if prop_type in MULTI_TYPES:
+        return MultiColumn(prop_type)
+    return Column(prop_type)
+
+
+def _parse_number(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        raise FilterQueryError(f"'{value}' is not a number")
+
+
+class DatabaseMirror:
+    """
+    Columnar copy of one Notion database
+
+    Rows are stored column by column in typed arrays and refreshed
+    incrementally with a last_edited_time filter. Because deleted rows never
+    show up in an incremental query, the mirror is rebuilt from scratch
+    periodically.
+    """
+
+    def __init__(self, database_id: str):
+        self.database_id = database_id
+        self.columns: Dict[str, Any] = {}
+        self.row_ids: List[str] = []
+        self.row_index: Dict[str, int] = {}
+        self.live = array("b")
+        self.checkpoint: Optional[str] = None
+        self.refreshed_at = 0.0
+        self.rebuilt_at = 0.0
+        self.min_refresh_seconds = float(os.getenv("NOTION_MIRROR_MIN_REFRESH", "30"))
+        self.rebuild_seconds = float(os.getenv("NOTION_MIRROR_REBUILD", "3600"))
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return int(np.frombuffer(self.live, dtype=np.int8).sum()) if len(self.live) else 0
+
+    def refresh(self, notion: Client, force: bool = False) -> int:
+        """
+        Bring the mirror up to date
+
+        Args:
+            notion: The Notion client
+            force: Refresh even if the last refresh was very recent
+
+        Returns:
+            Number of rows fetched
+        """
+        with self._lock:
+            now = time.time()
+            if not force and now - self.refreshed_at < self.min_refresh_seconds:
+                return 0
+
+            rebuild = self.checkpoint is None or now - self.rebuilt_at > self.rebuild_seconds
+            query_payload = {}
+            if not rebuild:
+                query_payload["filter"] = {
+                    "timestamp": "last_edited_time",
+                    "last_edited_time": {"on_or_after": self.checkpoint}
+                }
+
+            rows = list(iterate_paginated_api(
+                notion.data_sources.query,
+                data_source_id=get_data_source_id(notion, self.database_id),
+                page_size=100,
+                **query_payload
+            ))
+            if rebuild:
+                self._reset()
+                self.rebuilt_at = now
+            self.upsert_rows(rows, advance_checkpoint=True)
+            self.refreshed_at = now
+            return len(rows)
+
+    def _reset(self) -> None:
+        self.columns = {}
+        self.row_ids = []
+        self.row_index = {}
+        self.live = array("b")
+        self.checkpoint = None
+
+    def upsert_rows(self, items: Iterable[Dict[str, Any]], advance_checkpoint: bool = False) -> None:
+        """
+        Insert or update raw database rows
+
+        Args:
+            items: Rows as returned by data_sources.query
+            advance_checkpoint: Whether these rows are a complete incremental
+                refresh, so the checkpoint may move to the newest edit
+        """
+        with self._lock:
+            for item in items:
+                row = self.row_index.get(item["id"])
+                if row is None:
+                    row = len(self.row_ids)
+                    self.row_ids.append(item["id"])
+                    self.row_index[item["id"]] = row
+                    self.live.append(1)
+                    for column in self.columns.values():
+                        column.append(None)
+                self.live[row] = 0 if item.get("archived") or item.get("in_trash") else 1
+
+                for prop_name, prop_value in item.get("properties", {}).items():
+                    column = self.columns.get(prop_name)
+                    if column is None:
+                        column = make_column(prop_value.get("type", ""))
+                        for _ in range(len(self.row_ids)):
+                            column.append(None)
+                        self.columns[prop_name] = column
+                    column.set(row, format_property_value(prop_value))
+
+                last_edited = item.get("last_edited_time", "")
+                if advance_checkpoint and (self.checkpoint is None or last_edited > self.checkpoint):
+                    self.checkpoint = last_edited
+
+    def _column(self, name: str):
+        if name in self.columns:
+            return name, self.columns[name]
+        for column_name, column in self.columns.items():
+            if column_name.lower() == name.lower():
+                return column_name, column
+        raise FilterQueryError(
+            f"Unknown property '{name}'. Available properties: {', '.join(sorted(self.columns))}"
+        )
+
+    def _condition_mask(self, property_name: str, operator: str, value: str) -> np.ndarray:
+        _, column = self._column(property_name)
+
+        if operator == "is empty":
+            return ~column.present()
+        if operator == "is not empty":
+            return column.present()
+
+        if column.kind == "number":
+            number = _parse_number(value)
+            data = column.values()
+            comparisons = {
+                "=": data == number,
+                "!=": data != number,
+                ">": data > number,
+                "<": data < number,
+                ">=": data >= number,
+                "<=": data <= number
+            }
+            if operator not in comparisons:
+                raise FilterQueryError(f"Operator '{operator}' is not supported for number properties")
+            return comparisons[operator] & column.present()
+
+        if column.kind == "boolean":
+            expected = 1 if value.lower() in ("true", "yes", "1", "checked") else 0
+            if operator == "=":
+                return column.values() == expected
+            if operator == "!=":
+                return column.values() != expected
+            raise FilterQueryError(f"Operator '{operator}' is not supported for checkbox properties")
+
+        needle = value.lower()
+        if column.kind == "multi":
+            if operator in ("=", "contains"):
+                return column.row_mask(lambda values: any(needle == v.lower() for v in values))
+            if operator in ("!=", "does not contain"):
+                return column.row_mask(lambda values: all(needle != v.lower() for v in values))
+            raise FilterQueryError(f"Operator '{operator}' is not supported for {column.prop_type} properties")
+
+        predicates = {
+            "=": lambda v: v.lower() == needle,
+            "!=": lambda v: v.lower() != needle,
+            "contains": lambda v: needle in v.lower(),
+            "does not contain": lambda v: needle not in v.lower(),
+            # Dates and timestamps are ISO strings, so string order is time order
+            ">": lambda v: v > value,
+            "<": lambda v: v < value,
+            ">=": lambda v: v >= value,
+            "<=": lambda v: v <= value
+        }
+        mask = column.category_mask(predicates[operator])
+        if operator in ("!=", "does not contain"):
+            mask |= ~column.present()
+        return mask
+
+    def filter_mask(self, filter_query: str = "") -> np.ndarray:
+        """Rows that are live and match the clause-syntax filter query"""
+        mask = np.frombuffer(self.live, dtype=np.int8).astype(bool) if len(self.live) else np.zeros(0, dtype=bool)
+        if not filter_query or not filter_query.strip():
+            return mask
+
+        for group in parse_filter_query(filter_query)["groups"]:
+            mask &= np.logical_or.reduce([self._condition_mask(*condition) for condition in group])
+        return mask
+
+    def aggregate(
+        self,
+        operation: str = "count",
+        column: str = "",
+        group_by: str = "",
+        filter_query: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Compute an exact aggregate over the mirrored rows
+
+        Args:
+            operation: count, sum, avg, min, max or distinct
+            column: The property to aggregate (not needed for count)
+            group_by: Optional property to group by
+            filter_query: Optional clause-syntax filter applied first
+
+        Returns:
+            The aggregate, or one aggregate per group
+        """
+        operation = operation.lower()
+        if operation not in OPERATIONS:
+            raise FilterQueryError(f"Unknown operation '{operation}'. Use one of: {', '.join(OPERATIONS)}")
+        if operation != "count" and not column:
+            raise FilterQueryError(f"Operation '{operation}' needs a column")
+
+        with self._lock:
+            mask = self.filter_mask(filter_query)
+            result: Dict[str, Any] = {
+                "database_id": self.database_id,
+                "operation": operation,
+                "column": column or None,
+                "matched_rows": int(mask.sum())
+            }
+
+            if not group_by:
+                result["value"] = self._aggregate_rows(operation, column, np.flatnonzero(mask))
+                return result
+
+            group_name, group_column = self._column(group_by)
+            groups: Dict[Any, List[int]] = {}
+            for row in np.flatnonzero(mask):
+                for key in self._group_keys(group_column, row):
+                    groups.setdefault(key, []).append(row)
+
+            result["group_by"] = group_name
+            result["groups"] = {
+                str(key) if key is not None else "(empty)": self._aggregate_rows(operation, column, np.array(rows, dtype=np.intp))
+                for key, rows in sorted(groups.items(), key=lambda item: -len(item[1]))
+            }
+            return result
+
+    def _group_keys(self, column, row: int) -> List[Any]:
+        if column.kind == "category":
+            return [column.decode(int(column.codes[row]))]
+        if column.kind == "multi":
+            return list(column.data[row]) or [None]
+        if column.kind == "boolean":
+            value = column.data[row]
+            return [None if value < 0 else bool(value)]
+        value = column.data[row]
+        return [None if math.isnan(value) else value]
+
+    def _aggregate_rows(self, operation: str, column: str, rows: np.ndarray) -> Any:
+        if operation == "count" and not column:
+            return int(len(rows))
+
+        _, data_column = self._column(column)
+        present = data_column.present()[rows] if len(rows) else np.zeros(0, dtype=bool)
+        rows = rows[present]
+
+        if operation == "count":
+            return int(len(rows))
+
+        if data_column.kind == "number":
+            values = data_column.values()[rows]
+            if operation == "distinct":
+                return int(len(np.unique(values)))
+            if not len(values):
+                return None
+            reducers = {"sum": np.sum, "avg": np.mean, "min": np.min, "max": np.max}
+            return round(float(reducers[operation](values)), 6)
+
+        if operation in ("sum", "avg"):
+            raise FilterQueryError(f"Operation '{operation}' needs a number column")
+
+        if data_column.kind == "multi":
+            values = sorted({value for row in rows for value in data_column.data[row]})
+        elif data_column.kind == "boolean":
+            values = sorted({bool(data_column.data[row]) for row in rows})
+        else:
+            codes = np.unique(data_column.values()[rows])
+            values = sorted(data_column.categories[code] for code in codes)
+
+        if operation == "distinct":
+            return len(values)
+        if not values:
+            return None
+        return values[0] if operation == "min" else values[-1]
+
+
+_mirrors: Dict[str, DatabaseMirror] = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_database_mirror(database_id: str) -> DatabaseMirror:
+    """Get the process-wide mirror of a database"""
+    with _mirrors_lock:
+        mirror = _mirrors.get(database_id)
+        if mirror is None:
+            mirror = DatabaseMirror(database_id)
+            _mirrors[database_id] = mirror
+        return mirror
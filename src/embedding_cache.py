@@ -0,0 +1,177 @@
+"""
+Persistent cache of text embeddings keyed by content hash
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+DEFAULT_EMBEDDING_CACHE_PATH = ".cache/embeddings.sqlite3"
+DEFAULT_BATCH_SIZE = 256
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Hash the model and text into a cache key"""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite store of float32 embedding vectors
+
+    An embedding only depends on the model and the exact text, so entries
+    never go stale; the least recently used ones are evicted once the file
+    exceeds max_bytes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        if path is None:
+            path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_EMBEDDING_CACHE_PATH)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("EMBEDDING_CACHE_MAX_MB", "128")) * 1024 * 1024)
+
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self._lock = threading.RLock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed_at)")
+        self._db.commit()
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Get the cached embeddings of texts, keyed by text"""
+        keys = {embedding_key(model, text): text for text in set(texts)}
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            key_list = list(keys)
+            # Stay under SQLite's limit on query parameters
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[keys[key]] = np.frombuffer(vector, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                    [(now, embedding_key(model, text)) for text in found]
+                )
+                self._db.commit()
+            self._counters["hits"] += len(found)
+            self._counters["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, model: str, embeddings: Dict[str, Any]) -> None:
+        """Store embeddings keyed by text"""
+        now = time.time()
+        rows = []
+        for text, vector in embeddings.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((embedding_key(model, text), blob, len(blob), now))
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, accessed_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the cache size"""
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+            stats["entries"] = count
+            stats["bytes"] = size
+            return stats
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        freed = 0
+        evicted = []
+        for key, size in self._db.execute("SELECT key, size FROM embeddings ORDER BY accessed_at").fetchall():
+            if total - freed <= self.max_bytes:
+                break
+            evicted.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        self._counters["evictions"] += len(evicted)
+
+
+class CachedEmbeddings:
+    """
+    LangChain-style embeddings that only send uncached texts to the model
+
+    Texts are deduplicated and the misses are embedded in batches of
+    batch_size, so a call costs at most one request per batch of new texts.
+    """
+
+    def __init__(self, embeddings: Any, model: str, cache: Optional[EmbeddingCache] = None, batch_size: Optional[int] = None):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache or get_embedding_cache()
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors"""
+        vectors = self.cache.get_many(self.model, texts)
+        missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            embedded = dict(zip(batch, self.embeddings.embed_documents(batch)))
+            self.cache.put_many(self.model, embedded)
+            vectors.update({text: np.asarray(vector, dtype=np.float32) for text, vector in embedded.items()})
+
+        return [vectors[text].tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed one text, reusing a cached vector"""
+        return self.embed_documents([text])[0]
+
+
+def embedding_cache_enabled() -> bool:
+    """Whether embeddings should be cached"""
+    return os.getenv("EMBEDDING_CACHE", "true").lower() != "false"
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the process-wide embedding cache"""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
@@ -0,0 +1,298 @@
+"""
+Persistent exact-match cache of LLM responses, for LangChain calls and crewai agents
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from crewai.events.types.llm_events import LLMCallType
+from crewai.llms.providers.openai.completion import OpenAICompletion
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from pydantic import Field
+
+
+DEFAULT_LLM_CACHE_PATH = ".cache/llm_cache.sqlite3"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so prompts differing only in indentation share an entry"""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Hash the model, its parameters and the normalized messages into a cache key"""
+    return hashlib.sha256(f"{llm_string}\x00{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+def serialize_generations(generations: RETURN_VAL_TYPE) -> str:
+    """Serialize generations as JSON, keeping chat messages with their tool calls"""
+    return json.dumps([
+        {"message": message_to_dict(generation.message)}
+        if isinstance(generation, ChatGeneration)
+        else {"text": generation.text}
+        for generation in generations
+    ], ensure_ascii=False)
+
+
+def deserialize_generations(serialized: str) -> List[Generation]:
+    """Rebuild generations stored by serialize_generations"""
+    generations: List[Generation] = []
+    for item in json.loads(serialized):
+        if "message" in item:
+            generations.append(ChatGeneration(message=messages_from_dict([item["message"]])[0]))
+        else:
+            generations.append(Generation(text=item["text"]))
+    return generations
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LangChain cache storing LLM responses in SQLite
+
+    LangChain calls lookup with the serialized messages and a string
+    describing the model and its parameters (model name, temperature, ...),
+    so a response is only reused for an identical request to an identically
+    configured model. Entries expire after ttl_seconds, and the least
+    recently used entries are evicted once the file exceeds max_bytes.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        if path is None:
+            path = os.getenv("LLM_CACHE_PATH", DEFAULT_LLM_CACHE_PATH)
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("LLM_CACHE_TTL", "86400"))
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._lock = threading.RLock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._db.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Get the cached generations for a prompt and model, if fresh"""
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+
+            if self.ttl_seconds and time.time() - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self._counters["hits"] += 1
+
+        return deserialize_generations(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations for a prompt and model"""
+        serialized = serialize_generations(return_val)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (cache_key(prompt, llm_string), serialized, len(serialized), now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove every cached response"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the cache size"""
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            stats["entries"] = count
+            stats["bytes"] = size
+            return stats
+
+    def _evict(self) -> None:
+        if self.ttl_seconds:
+            expired = self._db.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self._counters["expired"] += expired
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        freed = 0
+        evicted = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if total - freed <= self.max_bytes:
+                break
+            evicted.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self._counters["evictions"] += len(evicted)
+
+
+class CachedOpenAICompletion(OpenAICompletion):
+    """
+    crewai's OpenAI LLM with the response cache and the shared rate limiter
+
+    Agents call their LLM through crewai, which does not go through
+    LangChain, so its cache and rate limiter never apply to them. This LLM
+    looks up text responses in the same SQLite store, keyed by the messages,
+    tool schemas and LLM settings. Only calls at temperature 0 are cached,
+    since a sampled response is one of many the model could give. Tool-call
+    responses are not cached either, as replaying one would skip the tool run
+    the agent relies on. A cached response is emitted as one stream chunk, so
+    streaming still shows it.
+
+    The cache hooks into crewai's private completion methods, so
+    requirements.txt pins crewai to the 1.15 series they were written for.
+    """
+
+    response_cache: Optional[Any] = Field(default=None, exclude=True)
+    rate_limiter: Optional[Any] = Field(default=None, exclude=True)
+
+    def _call_completions(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        from_task: Any = None,
+        from_agent: Any = None,
+        response_model: Any = None
+    ) -> Any:
+        prompt = self._cache_prompt(messages, tools, available_functions, response_model)
+        cached = self._cached_response(prompt, messages, from_task, from_agent)
+        if cached is not None:
+            return cached
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        response = super()._call_completions(messages, tools, available_functions, from_task, from_agent, response_model)
+        self._store_response(prompt, response)
+        return response
+
+    async def _acall_completions(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        from_task: Any = None,
+        from_agent: Any = None,
+        response_model: Any = None
+    ) -> Any:
+        prompt = self._cache_prompt(messages, tools, available_functions, response_model)
+        cached = self._cached_response(prompt, messages, from_task, from_agent)
+        if cached is not None:
+            return cached
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire()
+        response = await super()._acall_completions(messages, tools, available_functions, from_task, from_agent, response_model)
+        self._store_response(prompt, response)
+        return response
+
+    def _cache_prompt(self, messages: Any, tools: Any, available_functions: Any, response_model: Any) -> Optional[str]:
+        """The cache key text of a call, or None if its response must not be cached"""
+        # With available_functions the LLM runs tools itself and returns their output
+        if self.response_cache is None or self.temperature != 0 or available_functions or response_model is not None:
+            return None
+        return json.dumps({"messages": messages, "tools": tools}, sort_keys=True, default=str)
+
+    def _llm_string(self) -> str:
+        return "crewai:" + json.dumps(self.to_config_dict(), sort_keys=True, default=str)
+
+    def _cached_response(self, prompt: Optional[str], messages: Any, from_task: Any, from_agent: Any) -> Optional[str]:
+        if prompt is None:
+            return None
+        generations = self.response_cache.lookup(prompt, self._llm_string())
+        if not generations:
+            return None
+
+        response = generations[0].text
+        if self._effective_stream():
+            self._emit_stream_chunk_event(chunk=response, from_task=from_task, from_agent=from_agent)
+        self._emit_call_completed_event(
+            response=response,
+            call_type=LLMCallType.LLM_CALL,
+            from_task=from_task,
+            from_agent=from_agent,
+            messages=messages
+        )
+        return response
+
+    def _store_response(self, prompt: Optional[str], response: Any) -> None:
+        if prompt is not None and isinstance(response, str) and response:
+            self.response_cache.update(prompt, self._llm_string(), [Generation(text=response)])
+
+
+def llm_cache_enabled() -> bool:
+    """Whether LLM responses should be cached"""
+    return os.getenv("LLM_CACHE", "true").lower() != "false"
+
+
+def llm_cache_deterministic() -> bool:
+    """Whether all LLMs run at temperature 0, so every call can use the cache"""
+    return os.getenv("LLM_CACHE_DETERMINISTIC", "false").lower() == "true"
+
+
+_llm_cache: Optional[SQLiteLLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[SQLiteLLMCache]:
+    """Get the process-wide LLM response cache, or None when caching is disabled"""
+    global _llm_cache
+    if not llm_cache_enabled():
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = SQLiteLLMCache()
+        return _llm_cache
@@ -1,13 +1,81 @@
 """
 MCP (Model Context Protocol) client for CrewAI Enterprise integration
 """
+import asyncio
 import os
 import json
+import logging
+import random
+import threading
+import time
+import httpx
 import requests
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from urllib3.util.retry import Retry
 from pydantic import BaseModel
 
 
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limited or a transient server error
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    """urllib3 Retry whose exponential backoff is randomized, so clients do not retry in lockstep"""
+    
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return backoff * (0.5 + random.random() / 2) if backoff else backoff
+
+
+def get_mcp_timeout() -> Tuple[float, float]:
+    """Separate connect and read timeouts, so an unreachable server fails fast"""
+    return (
+        float(os.getenv("MCP_CONNECT_TIMEOUT", "3.05")),
+        float(os.getenv("MCP_READ_TIMEOUT", "30"))
+    )
+
+
+def create_mcp_session() -> requests.Session:
+    """
+    Create a session with a sized connection pool and retries
+    
+    Connection errors are retried for every request, since nothing reached
+    the server. Read errors and 429/5xx responses are only retried for GET,
+    so a crew is never kicked off twice; Retry-After is respected.
+    """
+    retry = JitteredRetry(
+        total=int(os.getenv("MCP_MAX_RETRIES", "3")),
+        backoff_factor=float(os.getenv("MCP_RETRY_BACKOFF", "0.5")),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    pool_size = int(os.getenv("MCP_POOL_SIZE", "10"))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_mcp_session: Optional[requests.Session] = None
+_mcp_session_lock = threading.Lock()
+
+
+def get_mcp_session() -> requests.Session:
+    """Get the process-wide MCP session, so connections stay warm across clients"""
+    global _mcp_session
+    with _mcp_session_lock:
+        if _mcp_session is None:
+            _mcp_session = create_mcp_session()
+        return _mcp_session
+
+
 class MCPClient:
     """Client for interacting with CrewAI Enterprise MCP Server"""
     
@@ -22,6 +90,8 @@ class MCPClient:
             "Authorization": f"Bearer {self.bearer_token}",
             "Content-Type": "application/json"
         }
+        self.session = get_mcp_session()
+        self.timeout = get_mcp_timeout()
     
     def kickoff_crew(self, crew_id: str, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -40,11 +110,11 @@ class MCPClient:
                 "inputs": inputs or {}
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.server_url}/mcp/kickoff_crew",
                 headers=self.headers,
                 json=payload,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
@@ -70,10 +140,10 @@ class MCPClient:
             Status information from the MCP server
         """
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.server_url}/mcp/get_crew_status/{execution_id}",
                 headers=self.headers,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
@@ -96,10 +166,10 @@ class MCPClient:
             List of available crews
         """
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.server_url}/mcp/crews",
                 headers=self.headers,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
@@ -115,6 +185,270 @@ class MCPClient:
             }
 
 
+def retry_delay(response: Optional[httpx.Response], attempt: int, backoff: float) -> float:
+    """Seconds before retrying: the server's Retry-After, or jittered exponential backoff"""
+    header = response.headers.get("Retry-After") if response is not None else None
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+    return backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+
+# Crew execution statuses after which polling stops
+FINISHED_STATUSES = ("completed", "success", "succeeded", "failed", "error", "cancelled")
+
+
+def crew_finished(status_response: Dict[str, Any]) -> bool:
+    """Whether a status response is final: the execution ended or the status could not be read"""
+    return "error" in status_response or str(status_response.get("status", "")).lower() in FINISHED_STATUSES
+
+
+class PollSchedule:
+    """
+    Delays between status polls of a crew execution
+    
+    The first poll is immediate and the delay then grows exponentially with
+    jitter up to max_delay, so short runs are noticed quickly while long
+    runs cost few requests. Delays are cut to end exactly at the deadline.
+    """
+    
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        initial_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        factor: float = 1.5
+    ):
+        self.timeout = timeout if timeout is not None else float(os.getenv("MCP_POLL_TIMEOUT", "300"))
+        self.initial_delay = initial_delay if initial_delay is not None else float(os.getenv("MCP_POLL_INITIAL_DELAY", "0.5"))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("MCP_POLL_MAX_DELAY", "10"))
+        self.factor = factor
+        self.deadline = time.monotonic() + self.timeout
+        self.polls = 0
+    
+    def next_delay(self) -> Optional[float]:
+        """Seconds to wait before the next poll, or None once the deadline has passed"""
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        if self.polls == 0:
+            delay = 0.0
+        else:
+            delay = min(self.max_delay, self.initial_delay * self.factor ** (self.polls - 1))
+            delay *= 0.8 + random.random() * 0.4
+        self.polls += 1
+        return min(delay, remaining)
+    
+    def timed_out(self, status_response: Dict[str, Any]) -> Dict[str, Any]:
+        """The last status seen, marked as not finished within the deadline"""
+        return {
+            **status_response,
+            "timed_out": True,
+            "polls": self.polls,
+            "error": f"Crew execution did not finish within {self.timeout:g} seconds"
+        }
+
+
+def wait_for_crew_completion(client: Any, execution_id: str, schedule: Optional[PollSchedule] = None) -> Dict[str, Any]:
+    """
+    Poll a crew execution until it finishes or the deadline passes
+    
+    Args:
+        client: An MCPClient or LocalMCPSimulator
+        execution_id: The ID of the crew execution
+        schedule: Poll delays and deadline; MCP_POLL_* settings by default
+        
+    Returns:
+        The final status, or the last status seen with "timed_out": True
+    """
+    schedule = schedule or PollSchedule()
+    status_response: Dict[str, Any] = {"execution_id": execution_id, "status": "unknown"}
+    while True:
+        delay = schedule.next_delay()
+        if delay is None:
+            return schedule.timed_out(status_response)
+        time.sleep(delay)
+        status_response = client.get_crew_status(execution_id)
+        if crew_finished(status_response):
+            return status_response
+
+
+class ConcurrentMCPOperations:
+    """
+    Batch operations for async MCP clients
+    
+    At most max_concurrency requests are in flight at once, so dispatching
+    a large batch does not overrun the server or the connection pool.
+    """
+    
+    max_concurrency: int = 20
+    _semaphore: Optional[asyncio.Semaphore] = None
+    
+    def _limit(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def kickoff_many(self, kickoffs: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """
+        Kick off many crew runs concurrently
+        
+        Args:
+            kickoffs: (crew_id, inputs) pairs
+            
+        Returns:
+            The kickoff responses, in the order of kickoffs
+        """
+        async def kickoff(crew_id: str, inputs: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            async with self._limit():
+                return await self.kickoff_crew(crew_id, inputs)
+        
+        return list(await asyncio.gather(*(kickoff(crew_id, inputs) for crew_id, inputs in kickoffs)))
+    
+    async def get_crew_statuses(self, execution_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the status of many crew executions concurrently, keyed by execution id"""
+        execution_ids = list(dict.fromkeys(execution_ids))
+        
+        async def status(execution_id: str) -> Dict[str, Any]:
+            async with self._limit():
+                return await self.get_crew_status(execution_id)
+        
+        statuses = await asyncio.gather(*(status(execution_id) for execution_id in execution_ids))
+        return dict(zip(execution_ids, statuses))
+    
+    async def wait_for_crew_completion(self, execution_id: str, schedule: Optional[PollSchedule] = None) -> Dict[str, Any]:
+        """Async wait_for_crew_completion"""
+        statuses = await self.wait_for_crews([execution_id], schedule)
+        return statuses[execution_id]
+    
+    async def wait_for_crews(self, execution_ids: Iterable[str], schedule: Optional[PollSchedule] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Poll many crew executions until all finish or the deadline passes
+        
+        Each round polls only the executions still running, concurrently,
+        so waiting on a batch costs one round of requests per delay.
+        
+        Returns:
+            The final status of each execution, keyed by execution id; those
+            not finished by the deadline have their last status with "timed_out": True
+        """
+        schedule = schedule or PollSchedule()
+        statuses: Dict[str, Dict[str, Any]] = {
+            execution_id: {"execution_id": execution_id, "status": "unknown"}
+            for execution_id in execution_ids
+        }
+        pending = list(statuses)
+        while pending:
+            delay = schedule.next_delay()
+            if delay is None:
+                for execution_id in pending:
+                    statuses[execution_id] = schedule.timed_out(statuses[execution_id])
+                break
+            await asyncio.sleep(delay)
+            statuses.update(await self.get_crew_statuses(pending))
+            pending = [execution_id for execution_id in pending if not crew_finished(statuses[execution_id])]
+        return statuses
+
+
+class AsyncMCPClient(ConcurrentMCPOperations):
+    """
+    Asyncio client for the CrewAI Enterprise MCP Server
+    
+    Has the same operations as MCPClient, as coroutines over one pooled
+    httpx.AsyncClient, so many requests can be in flight on one event loop.
+    Retries follow MCPClient: connection errors for every request, 429/5xx
+    responses and read errors only for GET.
+    """
+    
+    def __init__(self):
+        self.server_url = os.getenv("MCP_CREWAI_ENTERPRISE_SERVER_URL", "https://app.crewai.com")
+        self.bearer_token = os.getenv("MCP_CREWAI_ENTERPRISE_BEARER_TOKEN")
+        
+        if not self.bearer_token:
+            raise ValueError("MCP_CREWAI_ENTERPRISE_BEARER_TOKEN environment variable is required")
+        
+        self.headers = {
+            "Authorization": f"Bearer {self.bearer_token}",
+            "Content-Type": "application/json"
+        }
+        self.max_concurrency = int(os.getenv("MCP_MAX_CONCURRENCY", "20"))
+        self.max_retries = int(os.getenv("MCP_MAX_RETRIES", "3"))
+        self.retry_backoff = float(os.getenv("MCP_RETRY_BACKOFF", "0.5"))
+        pool_size = int(os.getenv("MCP_POOL_SIZE", "10"))
+        connect_timeout, read_timeout = get_mcp_timeout()
+        self.http = httpx.AsyncClient(
+            base_url=self.server_url,
+            headers=self.headers,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            # Connection failures are retried by the transport; nothing reached the server
+            transport=httpx.AsyncHTTPTransport(retries=self.max_retries)
+        )
+    
+    async def kickoff_crew(self, crew_id: str, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Kickoff a CrewAI crew deployment"""
+        try:
+            response = await self.http.post(
+                "/mcp/kickoff_crew",
+                json={"crew_id": crew_id, "inputs": inputs or {}}
+            )
+            return self._json_or_error(response, "Failed to kickoff crew")
+        except Exception as e:
+            return {
+                "error": f"Error kicking off crew: {str(e)}"
+            }
+    
+    async def get_crew_status(self, execution_id: str) -> Dict[str, Any]:
+        """Get the status of a crew execution"""
+        try:
+            response = await self._get(f"/mcp/get_crew_status/{execution_id}")
+            return self._json_or_error(response, "Failed to get crew status")
+        except Exception as e:
+            return {
+                "error": f"Error getting crew status: {str(e)}"
+            }
+    
+    async def list_available_crews(self) -> Dict[str, Any]:
+        """List available crews in the enterprise deployment"""
+        try:
+            response = await self._get("/mcp/crews")
+            return self._json_or_error(response, "Failed to list crews")
+        except Exception as e:
+            return {
+                "error": f"Error listing crews: {str(e)}"
+            }
+    
+    async def aclose(self) -> None:
+        """Close the pooled connections"""
+        await self.http.aclose()
+    
+    async def _get(self, path: str) -> httpx.Response:
+        """GET with jittered exponential retries on 429/5xx responses and read errors"""
+        attempt = 0
+        while True:
+            try:
+                response = await self.http.get(path)
+            except (httpx.ReadError, httpx.ReadTimeout):
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+            await asyncio.sleep(retry_delay(response, attempt, self.retry_backoff))
+            attempt += 1
+    
+    def _json_or_error(self, response: httpx.Response, message: str) -> Dict[str, Any]:
+        if response.status_code == 200:
+            return response.json()
+        return {
+            "error": f"{message}: {response.status_code}",
+            "details": response.text
+        }
+
+
 class LocalMCPSimulator:
     """
     Simulator for MCP functionality when not using CrewAI Enterprise
@@ -179,6 +513,243 @@ class LocalMCPSimulator:
         }
 
 
+class AsyncLocalMCPSimulator(ConcurrentMCPOperations, LocalMCPSimulator):
+    """LocalMCPSimulator with the coroutine interface of AsyncMCPClient"""
+    
+    async def kickoff_crew(self, crew_id: str, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Simulate crew kickoff"""
+        return super().kickoff_crew(crew_id, inputs)
+    
+    async def get_crew_status(self, execution_id: str) -> Dict[str, Any]:
+        """Simulate crew status check"""
+        return super().get_crew_status(execution_id)
+    
+    async def list_available_crews(self) -> Dict[str, Any]:
+        """Simulate crew listing"""
+        return super().list_available_crews()
+    
+    async def aclose(self) -> None:
+        """Nothing to close"""
+
+
+class CrewCatalogCache:
+    """
+    Shared cache of list_available_crews responses, keyed by server URL
+    
+    The crew catalogue rarely changes, so a response is served from memory
+    for ttl seconds. After that it is still served, stale, for up to
+    max_stale seconds while one background refresh replaces it, so only the
+    first request and requests after a long idle period wait on the server.
+    Error responses are never cached; a failed refresh keeps the stale entry.
+    """
+    
+    def __init__(self, ttl: Optional[float] = None, max_stale: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("MCP_CREWS_TTL", "300"))
+        self.max_stale = max_stale if max_stale is not None else float(os.getenv("MCP_CREWS_MAX_STALE", "3600"))
+        self._entries: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._refreshing: set = set()
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+    
+    def get(self, client: Any) -> Dict[str, Any]:
+        """List the crews of a client's server, from the cache when possible"""
+        key = self._key(client)
+        cached = self._lookup(key)
+        if cached is None:
+            # One request per server when many questions arrive on an empty cache
+            with self._fetch_lock:
+                cached = self._lookup(key, count=False)
+                if cached is None:
+                    return self._store(key, client.list_available_crews())
+        
+        response, refresh = cached
+        if refresh:
+            threading.Thread(target=self._refresh, args=(key, client), name="mcp-crews-refresh", daemon=True).start()
+        return response
+    
+    async def aget(self, client: Any) -> Dict[str, Any]:
+        """Async get, for AsyncMCPClient and AsyncLocalMCPSimulator"""
+        key = self._key(client)
+        cached = self._lookup(key)
+        if cached is not None:
+            response, refresh = cached
+            if refresh:
+                task = asyncio.ensure_future(self._arefresh(key, client))
+                # Keep a reference so the refresh is not garbage collected mid-flight
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return response
+        return self._store(key, await client.list_available_crews())
+    
+    def invalidate(self, client: Any = None) -> None:
+        """Drop the cached catalogue of one client's server, or of every server"""
+        with self._lock:
+            if client is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(client), None)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the number of cached servers"""
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries)}
+    
+    def _key(self, client: Any) -> str:
+        # Simulators have no server; their catalogue is the same everywhere
+        return getattr(client, "server_url", "local")
+    
+    def _lookup(self, key: str, count: bool = True) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """The cached response and whether to refresh it, or None if there is none to serve"""
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry[1] if entry else None
+            if age is None or age > self.ttl + self.max_stale:
+                if count:
+                    self._counters["misses"] += 1
+                return None
+            if age <= self.ttl:
+                if count:
+                    self._counters["hits"] += 1
+                return entry[0], False
+            if count:
+                self._counters["stale_hits"] += 1
+            refresh = key not in self._refreshing
+            if refresh:
+                self._refreshing.add(key)
+            return entry[0], refresh
+    
+    def _store(self, key: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        if "error" not in response:
+            with self._lock:
+                self._entries[key] = (response, time.monotonic())
+        return response
+    
+    def _refresh(self, key: str, client: Any) -> None:
+        try:
+            self._store(key, client.list_available_crews())
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+                self._counters["refreshes"] += 1
+    
+    async def _arefresh(self, key: str, client: Any) -> None:
+        try:
+            self._store(key, await client.list_available_crews())
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+                self._counters["refreshes"] += 1
+
+
+_crew_catalog_cache: Optional[CrewCatalogCache] = None
+_crew_catalog_cache_lock = threading.Lock()
+
+
+def get_crew_catalog_cache() -> CrewCatalogCache:
+    """Get the process-wide crew catalogue cache, shared by every chatbot"""
+    global _crew_catalog_cache
+    with _crew_catalog_cache_lock:
+        if _crew_catalog_cache is None:
+            _crew_catalog_cache = CrewCatalogCache()
+        return _crew_catalog_cache
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for the MCP server
+    
+    Closed, requests go through. After failure_threshold consecutive
+    failures or slow calls it opens, and requests are refused so callers
+    fall back at once instead of waiting on timeouts. After cooldown
+    seconds it is half-open: one probe request is let through, and its
+    outcome closes the circuit again or reopens it for another cooldown.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        slow_call_seconds: Optional[float] = None,
+        cooldown: Optional[float] = None
+    ):
+        self.failure_threshold = failure_threshold if failure_threshold is not None else int(os.getenv("MCP_BREAKER_FAILURES", "3"))
+        self.slow_call_seconds = slow_call_seconds if slow_call_seconds is not None else float(os.getenv("MCP_BREAKER_SLOW_CALL", "10"))
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv("MCP_BREAKER_COOLDOWN", "30"))
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._counters = {"allowed": 0, "rejected": 0, "failures": 0, "slow_calls": 0, "opened": 0}
+    
+    def allow_request(self) -> bool:
+        """Whether a request may go to the server now"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            
+            if self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self._probing):
+                # In half-open state only one probe is in flight
+                self._probing = self.state == self.HALF_OPEN
+                self._counters["allowed"] += 1
+                return True
+            
+            self._counters["rejected"] += 1
+            return False
+    
+    def record_success(self, duration: float = 0.0) -> None:
+        """Record a completed request; one slower than slow_call_seconds counts as a failure"""
+        if duration >= self.slow_call_seconds:
+            with self._lock:
+                self._counters["slow_calls"] += 1
+            self.record_failure()
+            return
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+    
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit at the threshold or on a failed probe"""
+        opened = False
+        with self._lock:
+            self.failures += 1
+            self._counters["failures"] += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self._counters["opened"] += 1
+                    opened = True
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+        if opened:
+            logger.warning("MCP server unavailable; using the local crew for %g seconds", self.cooldown)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the state and counters"""
+        with self._lock:
+            return {**self._counters, "state": self.state, "consecutive_failures": self.failures}
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(client: Any) -> CircuitBreaker:
+    """Get the process-wide circuit breaker of a client's MCP server"""
+    key = getattr(client, "server_url", "local")
+    with _circuit_breakers_lock:
+        if key not in _circuit_breakers:
+            _circuit_breakers[key] = CircuitBreaker()
+        return _circuit_breakers[key]
+
+
 def get_mcp_client() -> MCPClient | LocalMCPSimulator:
     """
     Get the appropriate MCP client based on environment configuration
@@ -190,3 +761,15 @@ def get_mcp_client() -> MCPClient | LocalMCPSimulator:
     else:
         print("Using local MCP simulator for development")
         return LocalMCPSimulator()
+
+
+def get_async_mcp_client() -> AsyncMCPClient | AsyncLocalMCPSimulator:
+    """
+    Get the appropriate async MCP client based on environment configuration
+    """
+    bearer_token = os.getenv("MCP_CREWAI_ENTERPRISE_BEARER_TOKEN")
+    
+    if bearer_token and bearer_token != "your_bearer_token_here":
+        return AsyncMCPClient()
+    else:
+        return AsyncLocalMCPSimulator()
@@ -0,0 +1,144 @@
+"""
+Crew memory: cached, batched embeddings and bounded retention
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional
+
+import numpy as np
+from crewai.memory.unified_memory import Memory
+from crewai.rag.embeddings.providers.custom.embedding_callable import CustomEmbeddingFunction
+
+from .embedding_cache import CachedEmbeddings
+from .vector_index import DEFAULT_EMBEDDING_MODEL
+
+
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_MAX_RECORDS = 5000
+DEFAULT_PRUNE_INTERVAL = 3600
+
+
+class CachedMemoryEmbedder(CustomEmbeddingFunction):
+    """
+    Embedding function for crew memory backed by the embedding cache
+
+    Task outputs and memory queries repeat across runs, so only texts not
+    embedded before reach the OpenAI API, in batches.
+    """
+
+    def __init__(self, model: str = DEFAULT_EMBEDDING_MODEL, **kwargs: Any):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.model = model
+        self.embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(model=model, openai_api_key=os.getenv("OPENAI_API_KEY")),
+            model
+        )
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        return [np.asarray(vector, dtype=np.float32) for vector in self.embeddings.embed_documents(list(input))]
+
+
+def create_crew_memory(llm: Any, storage: str = "lancedb") -> Memory:
+    """
+    Create a crew memory that embeds through the cached memory embedder
+
+    Args:
+        llm: LLM the memory uses to analyse records
+        storage: "lancedb" for crewai's default store, or a LanceDB directory
+    """
+    return Memory(
+        llm=llm,
+        embedder=CachedMemoryEmbedder(os.getenv("NOTION_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)),
+        storage=storage,
+        root_scope="/crew/notion-qa"
+    )
+
+
+def get_crew_memory(crew: Any) -> Optional[Any]:
+    """The memory store a crew reads and writes, if it has one"""
+    memory = getattr(crew, "memory", None)
+    if hasattr(memory, "forget"):
+        return memory
+    # With memory=True crewai builds the store itself and keeps it private
+    return getattr(crew, "_memory", None)
+
+
+class MemoryRetention:
+    """
+    Retention policy for a crew's memory store
+
+    Records older than max_age_days are deleted, and beyond max_records
+    the oldest are evicted, so the store stops growing once it reaches a
+    steady state. Pruning runs in the background at most once per interval.
+    """
+
+    def __init__(
+        self,
+        max_age_days: Optional[float] = None,
+        max_records: Optional[int] = None,
+        interval: Optional[float] = None
+    ):
+        self.max_age_days = max_age_days if max_age_days is not None else float(os.getenv("MEMORY_RETENTION_DAYS", str(DEFAULT_RETENTION_DAYS)))
+        self.max_records = max_records if max_records is not None else int(os.getenv("MEMORY_MAX_RECORDS", str(DEFAULT_MAX_RECORDS)))
+        self.interval = interval if interval is not None else float(os.getenv("MEMORY_PRUNE_INTERVAL", str(DEFAULT_PRUNE_INTERVAL)))
+        self._last_pruned = float("-inf")
+        self._lock = threading.Lock()
+
+    def prune(self, memory: Any) -> int:
+        """
+        Apply the policy to a memory store now
+
+        Args:
+            memory: A crewai Memory (anything with forget and list_records)
+
+        Returns:
+            The number of records deleted
+        """
+        deleted = 0
+        if self.max_age_days > 0:
+            cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=self.max_age_days)
+            deleted += memory.forget(older_than=cutoff) or 0
+
+        if self.max_records > 0:
+            # Records are listed newest first, so everything past max_records is the oldest
+            excess: List[str] = []
+            while True:
+                records = memory.list_records(limit=1000, offset=self.max_records + len(excess))
+                if not records:
+                    break
+                excess.extend(record.id for record in records)
+            if excess:
+                deleted += memory.forget(record_ids=excess) or 0
+
+        return deleted
+
+    def maybe_prune(self, crew: Any) -> None:
+        """Prune a crew's memory in a background thread if the interval has passed"""
+        memory = get_crew_memory(crew)
+        if memory is None:
+            return
+        with self._lock:
+            if time.monotonic() - self._last_pruned < self.interval:
+                return
+            self._last_pruned = time.monotonic()
+
+        def run() -> None:
+            try:
+                deleted = self.prune(memory)
+                if deleted:
+                    print(f"🧹 Pruned {deleted} crew memory records")
+            except Exception as e:
+                print(f"⚠️ Could not prune crew memory: {str(e)}")
+
+        threading.Thread(target=run, name="memory-prune", daemon=True).start()
+
+
+_memory_retention = MemoryRetention()
+
+
+def get_memory_retention() -> MemoryRetention:
+    """Get the process-wide crew memory retention policy"""
+    return _memory_retention
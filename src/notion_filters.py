@@ -0,0 +1,303 @@
+"""
+Notion database property helpers: filter and sort payloads, plain values
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Comparison operators, longest first so ">=" wins over ">"
+OPERATORS = (
+    "is not empty",
+    "is empty",
+    "does not contain",
+    "contains",
+    ">=",
+    "<=",
+    "!=",
+    "==",
+    "=",
+    ">",
+    "<"
+)
+
+# Notion filter conditions per property type and operator
+TEXT_CONDITIONS = {
+    "=": "equals",
+    "!=": "does_not_equal",
+    "contains": "contains",
+    "does not contain": "does_not_contain"
+}
+NUMBER_CONDITIONS = {
+    "=": "equals",
+    "!=": "does_not_equal",
+    ">": "greater_than",
+    "<": "less_than",
+    ">=": "greater_than_or_equal_to",
+    "<=": "less_than_or_equal_to"
+}
+DATE_CONDITIONS = {
+    "=": "equals",
+    ">": "after",
+    "<": "before",
+    ">=": "on_or_after",
+    "<=": "on_or_before"
+}
+CONDITIONS_BY_TYPE = {
+    "title": TEXT_CONDITIONS,
+    "rich_text": TEXT_CONDITIONS,
+    "url": TEXT_CONDITIONS,
+    "email": TEXT_CONDITIONS,
+    "phone_number": TEXT_CONDITIONS,
+    "number": NUMBER_CONDITIONS,
+    "select": {"=": "equals", "!=": "does_not_equal"},
+    "status": {"=": "equals", "!=": "does_not_equal"},
+    "multi_select": {"=": "contains", "contains": "contains", "!=": "does_not_contain", "does not contain": "does_not_contain"},
+    "checkbox": {"=": "equals", "!=": "does_not_equal"},
+    "people": {"contains": "contains", "does not contain": "does_not_contain"},
+    "date": DATE_CONDITIONS,
+    "created_time": DATE_CONDITIONS,
+    "last_edited_time": DATE_CONDITIONS
+}
+
+# Page timestamps that can be filtered and sorted without a matching property
+TIMESTAMPS = ("created_time", "last_edited_time")
+
+_CONDITION_PATTERN = re.compile(
+    r"^\s*(?P<property>.+?)\s*(?P<operator>"
+    + "|".join(re.escape(op) if op[0] in "<>!=" else r"\b" + re.escape(op) + r"\b" for op in OPERATORS)
+    + r")\s*(?P<value>.*?)\s*$",
+    re.IGNORECASE
+)
+_SORT_PATTERN = re.compile(r"^\s*(?:sort|order)\s+by\s+(?P<sorts>.+)$", re.IGNORECASE)
+
+
+def format_property_value(prop_value: Dict) -> Any:
+    """Extract a plain value from a Notion database property"""
+    prop_type = prop_value.get("type", "")
+
+    if prop_type in ("title", "rich_text"):
+        return "".join(text.get("plain_text", "") for text in prop_value.get(prop_type, [])) or None
+    elif prop_type in ("select", "status"):
+        option = prop_value.get(prop_type) or {}
+        return option.get("name") or None
+    elif prop_type == "multi_select":
+        return [option.get("name", "") for option in prop_value.get("multi_select", [])] or None
+    elif prop_type == "date":
+        date_value = prop_value.get("date") or {}
+        return date_value.get("start") or None
+    elif prop_type in ("number", "checkbox", "url", "email", "phone_number", "created_time", "last_edited_time"):
+        return prop_value.get(prop_type)
+    elif prop_type == "people":
+        return [person.get("name") or person.get("id", "") for person in prop_value.get("people", [])] or None
+
+    return None
+
+
+class FilterQueryError(ValueError):
+    """Raised when a filter query cannot be translated for a database"""
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def _starts_condition(text: str) -> bool:
+    """Whether text, up to the next 'and'/'or', is a '<Property> <operator>' condition"""
+    clause = re.split(r"\s+(?:and|or)\s+", text, maxsplit=1, flags=re.IGNORECASE)[0]
+    return bool(_CONDITION_PATTERN.match(clause))
+
+
+def _split_outside_quotes(text: str, pattern: str, before_condition: bool = False) -> List[str]:
+    """
+    Split text on a regex, ignoring matches inside quoted values
+
+    With before_condition, only split where a new condition follows, so
+    values such as 'R and D' stay whole.
+    """
+    parts = []
+    start = 0
+    for match in re.finditer(pattern, text, re.IGNORECASE):
+        prefix = text[start:match.start()]
+        if before_condition and not _starts_condition(text[match.end():]):
+            continue
+        if prefix.count('"') % 2 == 0 and prefix.count("'") % 2 == 0:
+            parts.append(prefix)
+            start = match.end()
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def split_clauses(filter_query: str) -> List[List[str]]:
+    """
+    Split a filter query into groups of clauses
+
+    Groups are separated by ";" or "and" and must all match; the clauses of
+    a group are separated by "or" and any of them may match. "and" and "or"
+    only separate clauses when a condition follows them; otherwise they are
+    part of a value. A sort clause is a group of its own.
+    """
+    groups: List[List[str]] = []
+    for part in _split_outside_quotes(filter_query, r";"):
+        if _SORT_PATTERN.match(part):
+            groups.append([part])
+            continue
+        and_parts = _split_outside_quotes(part, r"\s+and\s+", before_condition=True)
+        or_groups = [_split_outside_quotes(and_part, r"\s+or\s+", before_condition=True) for and_part in and_parts]
+        if len(and_parts) > 1 and any(len(group) > 1 for group in or_groups):
+            raise FilterQueryError(
+                f"'{part}' mixes 'and' with 'or'; separate the clauses that must all match "
+                "with ';', e.g. 'Status = Done; Priority > 2 or Tag = Bob'"
+            )
+        groups.extend(or_groups)
+    return groups
+
+
+def parse_filter_query(filter_query: str) -> Dict[str, Any]:
+    """
+    Parse a filter query into conditions and sorts
+
+    The syntax is a list of clauses separated by ";" or "and", any of which
+    may be alternatives separated by "or":
+    ``Status = Done; Priority >= 2 or Owner contains Alice; sort by Due desc``.
+
+    Returns:
+        {"groups": [[(property, operator, value)]], "sorts": [(property,
+         "ascending" | "descending")]}, where every group must match and a
+        group matches when any of its conditions does
+    """
+    groups: List[List[Tuple[str, str, str]]] = []
+    sorts: List[Tuple[str, str]] = []
+
+    for clauses in split_clauses(filter_query):
+        sort_match = _SORT_PATTERN.match(clauses[0])
+        if sort_match:
+            for sort in sort_match.group("sorts").split(","):
+                words = sort.strip().rsplit(None, 1)
+                direction = "ascending"
+                if len(words) == 2 and words[1].lower() in ("asc", "ascending", "desc", "descending"):
+                    direction = "descending" if words[1].lower().startswith("desc") else "ascending"
+                    sort = words[0]
+                sorts.append((_unquote(sort.strip()), direction))
+            continue
+
+        groups.append([parse_condition(clause) for clause in clauses])
+
+    return {"groups": groups, "sorts": sorts}
+
+
+def parse_condition(clause: str) -> Tuple[str, str, str]:
+    """Parse one "property operator value" clause"""
+    match = _CONDITION_PATTERN.match(clause)
+    if not match:
+        raise FilterQueryError(f"Could not understand filter clause '{clause}'")
+    operator = match.group("operator").lower()
+    operator = "=" if operator == "==" else operator
+    return _unquote(match.group("property")), operator, _unquote(match.group("value"))
+
+
+def resolve_property(name: str, schema: Dict[str, Dict[str, Any]]) -> Tuple[str, str]:
+    """Match a property name case-insensitively and return its exact name and type"""
+    if name in schema:
+        return name, schema[name].get("type", "")
+    for prop_name, prop in schema.items():
+        if prop_name.lower() == name.lower():
+            return prop_name, prop.get("type", "")
+    if name.lower() in TIMESTAMPS:
+        return name.lower(), name.lower()
+    raise FilterQueryError(
+        f"Unknown property '{name}'. Available properties: {', '.join(sorted(schema))}"
+    )
+
+
+def coerce_value(prop_type: str, value: str) -> Any:
+    """Convert a filter value to the JSON type Notion expects for a property"""
+    if prop_type == "number":
+        try:
+            number = float(value)
+        except ValueError:
+            raise FilterQueryError(f"'{value}' is not a number")
+        return int(number) if number.is_integer() else number
+    if prop_type == "checkbox":
+        return value.lower() in ("true", "yes", "1", "checked")
+    return value
+
+
+def build_condition(property_name: str, operator: str, value: str, schema: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Build one Notion filter condition"""
+    name, prop_type = resolve_property(property_name, schema)
+
+    if operator in ("is empty", "is not empty"):
+        if prop_type in TIMESTAMPS:
+            raise FilterQueryError(f"'{name}' is never empty")
+        condition = {"is_empty" if operator == "is empty" else "is_not_empty": True}
+    else:
+        conditions = CONDITIONS_BY_TYPE.get(prop_type)
+        if conditions is None:
+            raise FilterQueryError(f"Filtering on {prop_type} property '{name}' is not supported")
+        if operator not in conditions:
+            raise FilterQueryError(
+                f"Operator '{operator}' is not supported for {prop_type} property '{name}'. "
+                f"Use one of: {', '.join(conditions)}"
+            )
+        condition = {conditions[operator]: coerce_value(prop_type, value)}
+
+    if prop_type in TIMESTAMPS and name in TIMESTAMPS:
+        return {"timestamp": name, name: condition}
+    return {"property": name, prop_type: condition}
+
+
+def build_query_payload(filter_query: str, schema: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Build the filter and sorts of a data_sources.query request
+
+    Args:
+        filter_query: Either raw Notion JSON (a filter object, or an object with
+            "filter" and/or "sorts") or the clause syntax of parse_filter_query
+        schema: The database properties, needed for the clause syntax
+
+    Returns:
+        Keyword arguments for data_sources.query
+    """
+    filter_query = (filter_query or "").strip()
+    if not filter_query:
+        return {}
+
+    if filter_query[0] in "{[":
+        try:
+            raw = json.loads(filter_query)
+        except json.JSONDecodeError as e:
+            raise FilterQueryError(f"Invalid JSON filter: {str(e)}")
+        if isinstance(raw, dict) and ("filter" in raw or "sorts" in raw):
+            return {key: raw[key] for key in ("filter", "sorts") if key in raw}
+        if isinstance(raw, list):
+            return {"sorts": raw}
+        return {"filter": raw}
+
+    parsed = parse_filter_query(filter_query)
+    schema = schema or {}
+    payload: Dict[str, Any] = {}
+
+    # An AND of OR groups stays within Notion's two levels of compound filters
+    filters = []
+    for group in parsed["groups"]:
+        conditions = [build_condition(prop, op, value, schema) for prop, op, value in group]
+        filters.append(conditions[0] if len(conditions) == 1 else {"or": conditions})
+    if len(filters) == 1:
+        payload["filter"] = filters[0]
+    elif filters:
+        payload["filter"] = {"and": filters}
+
+    sorts = []
+    for prop, direction in parsed["sorts"]:
+        name, prop_type = resolve_property(prop, schema)
+        if name in TIMESTAMPS and prop_type in TIMESTAMPS:
+            sorts.append({"timestamp": name, "direction": direction})
+        else:
+            sorts.append({"property": name, "direction": direction})
+    if sorts:
+        payload["sorts"] = sorts
+
+    return payload
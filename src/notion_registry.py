@@ -0,0 +1,272 @@
+"""
+Process-wide registry of pooled, rate-limited Notion clients
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+import httpx
+from notion_client import APIErrorCode, APIResponseError, AsyncClient, Client
+
+
+# Notion allows an average of three requests per second per integration
+DEFAULT_RATE_LIMIT = 3.0
+DEFAULT_BURST = 3
+DEFAULT_MAX_RETRIES = 5
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every client using the same integration"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(capacity)
+        self._updated_at = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it"""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self) -> None:
+        """Block until a request may be sent"""
+        wait = self.reserve()
+        if wait > 0:
+            self.sleep(wait)
+
+    def block_for(self, seconds: float) -> None:
+        """Pause every caller, e.g. after Notion answered with a Retry-After"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self.clock() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+
+def _retry_after_seconds(response: httpx.Response, attempt: int) -> float:
+    """Delay requested by a 429 response, falling back to jittered exponential backoff"""
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+class RateLimitedTransport(httpx.HTTPTransport):
+    """Keep-alive HTTP transport that throttles requests and retries 429 responses"""
+
+    def __init__(self, bucket: TokenBucket, max_retries: int = DEFAULT_MAX_RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.bucket = bucket
+        self.max_retries = max_retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            response = super().handle_request(request)
+            if response.status_code != 429 or attempt >= self.max_retries:
+                return response
+
+            delay = _retry_after_seconds(response, attempt)
+            response.close()
+            self.bucket.block_for(delay)
+            attempt += 1
+
+
+class AsyncRateLimitedTransport(httpx.AsyncHTTPTransport):
+    """Async counterpart of RateLimitedTransport; waits without blocking the event loop"""
+
+    def __init__(self, bucket: TokenBucket, max_retries: int = DEFAULT_MAX_RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.bucket = bucket
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            wait = self.bucket.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            response = await super().handle_async_request(request)
+            if response.status_code != 429 or attempt >= self.max_retries:
+                return response
+
+            delay = _retry_after_seconds(response, attempt)
+            await response.aclose()
+            self.bucket.block_for(delay)
+            attempt += 1
+
+
+_clients: Dict[str, Client] = {}
+# Async connections belong to the event loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncClient]]" = weakref.WeakKeyDictionary()
+_buckets: Dict[str, TokenBucket] = {}
+_data_sources: Dict[str, str] = {}
+_registry_lock = threading.Lock()
+
+
+def get_notion_token() -> str:
+    """Get the Notion integration token from the environment"""
+    notion_token = os.getenv("NOTION_TOKEN")
+    if not notion_token:
+        raise ValueError("NOTION_TOKEN environment variable is required")
+    return notion_token
+
+
+def get_rate_limiter(notion_token: str) -> TokenBucket:
+    """Get the token bucket shared by all clients of one Notion integration"""
+    with _registry_lock:
+        bucket = _buckets.get(notion_token)
+        if bucket is None:
+            bucket = TokenBucket(
+                rate=float(os.getenv("NOTION_RATE_LIMIT", DEFAULT_RATE_LIMIT)),
+                capacity=int(os.getenv("NOTION_RATE_BURST", DEFAULT_BURST))
+            )
+            _buckets[notion_token] = bucket
+        return bucket
+
+
+def get_data_source_id(notion: Client, database_id: str) -> str:
+    """
+    Get the data source whose rows and properties a database id refers to
+
+    Since Notion API version 2025-09-03 databases hold their rows in data
+    sources, and search returns data sources rather than databases. A
+    database id maps to its first data source; an id Notion does not know
+    as a database is taken to be a data source id already.
+    """
+    with _registry_lock:
+        data_source_id = _data_sources.get(database_id)
+    if data_source_id is not None:
+        return data_source_id
+
+    try:
+        data_sources = notion.databases.retrieve(database_id).get("data_sources") or []
+        data_source_id = data_sources[0]["id"] if data_sources else database_id
+    except APIResponseError as e:
+        if e.code != APIErrorCode.ObjectNotFound:
+            raise
+        data_source_id = database_id
+
+    with _registry_lock:
+        _data_sources[database_id] = data_source_id
+    return data_source_id
+
+
+def _connection_limits() -> httpx.Limits:
+    max_connections = int(os.getenv("NOTION_MAX_CONNECTIONS", "10"))
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=60.0
+    )
+
+
+def get_notion_client(notion_token: Optional[str] = None) -> Client:
+    """
+    Get the shared Notion client for an integration token
+
+    All tools reuse the same client, so keep-alive connections stay warm and
+    every request goes through one rate limiter.
+    """
+    notion_token = notion_token or get_notion_token()
+
+    with _registry_lock:
+        client = _clients.get(notion_token)
+    if client is not None:
+        return client
+
+    bucket = get_rate_limiter(notion_token)
+    http_client = httpx.Client(
+        transport=RateLimitedTransport(
+            bucket,
+            max_retries=int(os.getenv("NOTION_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            limits=_connection_limits()
+        )
+    )
+    # RateLimitedTransport already retries 429s, so the client must not retry on top of it
+    client = Client(auth=notion_token, client=http_client, retry=False)
+
+    with _registry_lock:
+        existing = _clients.setdefault(notion_token, client)
+    if existing is not client:
+        http_client.close()
+    return existing
+
+
+def get_async_notion_client(notion_token: Optional[str] = None) -> AsyncClient:
+    """
+    Get the shared async Notion client of the running event loop
+
+    Async clients share the token bucket of the synchronous clients, so
+    sync and async requests together stay within the integration's limit.
+    """
+    notion_token = notion_token or get_notion_token()
+    loop = asyncio.get_running_loop()
+
+    with _registry_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(notion_token)
+        if client is not None:
+            return client
+
+    bucket = get_rate_limiter(notion_token)
+    http_client = httpx.AsyncClient(
+        transport=AsyncRateLimitedTransport(
+            bucket,
+            max_retries=int(os.getenv("NOTION_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            limits=_connection_limits()
+        )
+    )
+    client = AsyncClient(auth=notion_token, client=http_client, retry=False)
+
+    # Only coroutines of this loop create its clients, so no other caller raced us
+    with _registry_lock:
+        clients[notion_token] = client
+    return client
+
+
+async def close_async_notion_clients() -> None:
+    """Close the pooled async Notion connections of the running event loop"""
+    with _registry_lock:
+        clients = list(_async_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        await client.aclose()
+
+
+def close_notion_clients() -> None:
+    """Close all pooled Notion connections"""
+    with _registry_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,235 @@
+"""
+Incremental sync of the shared Notion workspace into local caches and indexes
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from notion_client import Client
+from notion_client.helpers import iterate_paginated_api
+
+from .notion_registry import get_notion_client
+from .notion_tools import BlockTreeFetcher, extract_page_content, get_object_type, get_page_text, get_title_from_item
+from .page_cache import PageCache, get_page_cache
+from .search_index import SearchIndex, get_search_index
+
+
+CHECKPOINT_KEY = "sync_checkpoint"
+FAILURES_KEY = "sync_failures"
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Called with the page object and its extracted content for every synced
+# page; archived pages arrive with no blocks so listeners can drop them
+PageListener = Callable[[Dict[str, Any], Dict[str, Any]], None]
+
+
+class WorkspaceSync:
+    """
+    Delta crawler that mirrors recently edited Notion pages locally
+
+    Notion's search endpoint is walked newest-first by last_edited_time and
+    the crawl stops at the checkpoint of the previous run, so only pages
+    edited since then are fetched. Synced pages update the page cache, the
+    search index and any registered listeners.
+
+    A page that fails holds the checkpoint at its edit time, so the next run
+    retries it. After max_attempts failures of the same edit it is skipped,
+    so one broken page cannot stop the checkpoint for good.
+    """
+
+    def __init__(
+        self,
+        notion: Optional[Client] = None,
+        page_cache: Optional[PageCache] = None,
+        search_index: Optional[SearchIndex] = None,
+        block_fetcher: Optional[BlockTreeFetcher] = None,
+        listeners: Optional[List[PageListener]] = None,
+        max_attempts: Optional[int] = None
+    ):
+        self.notion = notion or get_notion_client()
+        self.page_cache = page_cache or get_page_cache()
+        self.search_index = search_index or get_search_index()
+        self.block_fetcher = block_fetcher or BlockTreeFetcher(self.notion)
+        self.listeners = list(listeners or [])
+        self.max_attempts = max_attempts if max_attempts is not None else int(os.getenv("NOTION_SYNC_MAX_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS)))
+        self.completion_callbacks: List[Callable[[], None]] = []
+
+    def add_listener(self, listener: PageListener, on_complete: Optional[Callable[[], None]] = None) -> None:
+        """
+        Register a callback that receives every synced page
+
+        Args:
+            listener: Called with the page object and its extracted content
+            on_complete: Optional callback run once after each sync, e.g. to persist an index
+        """
+        self.listeners.append(listener)
+        if on_complete is not None:
+            self.completion_callbacks.append(on_complete)
+
+    @property
+    def checkpoint(self) -> Optional[str]:
+        """last_edited_time of the newest page seen by the last completed run"""
+        return self.search_index.get_meta(CHECKPOINT_KEY)
+
+    def iter_changed_items(self, since: Optional[str]):
+        """Yield pages and databases edited at or after since, newest first"""
+        items = iterate_paginated_api(
+            self.notion.search,
+            sort={"direction": "descending", "timestamp": "last_edited_time"},
+            page_size=100
+        )
+        for item in items:
+            # Notion timestamps have minute precision, so items edited in the
+            # checkpoint minute are synced again rather than risk missing one
+            if since and item.get("last_edited_time", "") < since:
+                break
+            yield item
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Sync every page edited since the last checkpoint
+
+        Returns:
+            A summary of the run
+        """
+        started_at = time.time()
+        since = self.checkpoint
+        newest = since
+        retry_from: Optional[str] = None
+        synced = 0
+        removed = 0
+        errors = []
+        # Failed attempts per item id, for the edit that failed
+        failures: Dict[str, Dict[str, Any]] = json.loads(self.search_index.get_meta(FAILURES_KEY) or "{}")
+
+        for item in self.iter_changed_items(since):
+            last_edited = item.get("last_edited_time", "")
+            if newest is None or last_edited > newest:
+                newest = last_edited
+
+            try:
+                if item.get("archived") or item.get("in_trash"):
+                    self.search_index.remove(item["id"])
+                    self.page_cache.invalidate(item["id"])
+                    for listener in self.listeners:
+                        listener(item, {"title": get_title_from_item(item), "url": item.get("url", ""), "blocks": []})
+                    removed += 1
+                elif item.get("object") == "page":
+                    self._sync_page(item)
+                    synced += 1
+                else:
+                    self.search_index.upsert(
+                        item["id"],
+                        get_title_from_item(item),
+                        url=item.get("url", ""),
+                        object_type=get_object_type(item) or "database",
+                        last_edited=last_edited
+                    )
+                    synced += 1
+                failures.pop(item.get("id", ""), None)
+            except Exception as e:
+                failure = failures.get(item.get("id", ""), {})
+                attempts = failure.get("attempts", 0) + 1 if failure.get("last_edited") == last_edited else 1
+                failures[item.get("id", "")] = {"last_edited": last_edited, "attempts": attempts}
+                if attempts < self.max_attempts:
+                    retry_from = last_edited if retry_from is None else min(retry_from, last_edited)
+                    errors.append(f"{item.get('id', '')}: {str(e)}")
+                else:
+                    errors.append(f"{item.get('id', '')}: {str(e)} (skipped after {attempts} attempts)")
+
+        for on_complete in self.completion_callbacks:
+            on_complete()
+
+        self.search_index.set_meta(FAILURES_KEY, json.dumps(failures))
+        # Stop at the oldest page still to be retried, so the next run picks it up again
+        checkpoint = retry_from or newest
+        if checkpoint and (since is None or checkpoint > since):
+            self.search_index.set_meta(CHECKPOINT_KEY, checkpoint)
+        if retry_from is None:
+            self.search_index.mark_synced(started_at)
+
+        return {
+            "synced": synced,
+            "removed": removed,
+            "errors": errors,
+            "checkpoint": self.checkpoint,
+            "duration": time.time() - started_at
+        }
+
+    def _sync_page(self, page: Dict[str, Any]) -> None:
+        last_edited = page.get("last_edited_time", "")
+        content = self.page_cache.get(page["id"], last_edited)
+        if content is None:
+            content = extract_page_content(page, self.block_fetcher)
+            self.page_cache.put(page["id"], last_edited, content)
+
+        self.search_index.upsert(
+            page["id"],
+            content["title"],
+            body=get_page_text(content),
+            url=content["url"],
+            last_edited=last_edited
+        )
+        for listener in self.listeners:
+            listener(page, content)
+
+    def run_forever(self, interval: float, stop_event: Optional[threading.Event] = None) -> None:
+        """Sync repeatedly, waiting interval seconds between runs"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                summary = self.run_once()
+                if summary["synced"] or summary["errors"]:
+                    print(
+                        f"🔄 Notion sync: {summary['synced']} updated, {summary['removed']} removed, "
+                        f"{len(summary['errors'])} errors in {summary['duration']:.1f}s"
+                    )
+            except Exception as e:
+                print(f"⚠️ Notion sync failed: {str(e)}")
+            stop_event.wait(interval)
+
+
+def create_workspace_sync() -> WorkspaceSync:
+    """Create a workspace sync that also maintains the semantic vector index when enabled"""
+    workspace_sync = WorkspaceSync()
+
+    openai_key = os.getenv("OPENAI_API_KEY", "")
+    vector_index_enabled = os.getenv("NOTION_VECTOR_INDEX", "true").lower() != "false"
+    if vector_index_enabled and openai_key and not openai_key.startswith("your_"):
+        from .vector_index import get_vector_index
+
+        vector_index = get_vector_index()
+        workspace_sync.add_listener(vector_index.index_page, on_complete=vector_index.save)
+
+    return workspace_sync
+
+
+def start_background_sync(
+    interval: Optional[float] = None,
+    workspace_sync: Optional[WorkspaceSync] = None
+) -> threading.Event:
+    """
+    Run the workspace sync in a daemon thread
+
+    Args:
+        interval: Seconds between runs (default: NOTION_SYNC_INTERVAL or 300)
+        workspace_sync: The sync to run; a default one is created if omitted
+
+    Returns:
+        An event that stops the thread when set
+    """
+    if interval is None:
+        interval = float(os.getenv("NOTION_SYNC_INTERVAL", "300"))
+    workspace_sync = workspace_sync or create_workspace_sync()
+    stop_event = threading.Event()
+
+    thread = threading.Thread(
+        target=workspace_sync.run_forever,
+        args=(interval, stop_event),
+        name="notion-sync",
+        daemon=True
+    )
+    thread.start()
+    return stop_event
@@ -1,202 +1,680 @@
 """
 Notion integration tools for CrewAI chatbot
 """
+import asyncio
+import json
 import os
-from typing import Dict, List, Any, Optional
-from notion_client import Client
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, List, Any, Optional, Tuple
+from notion_client import AsyncClient, Client
+from notion_client.helpers import async_iterate_paginated_api, iterate_paginated_api
 from pydantic import BaseModel, Field
-from crewai_tools import BaseTool
+from crewai.tools import BaseTool
+from .context_packing import get_active_question, pack_blocks, select_blocks
+from .database_mirror import get_database_mirror
+from .notion_filters import build_query_payload, format_property_value
+from .notion_registry import get_async_notion_client, get_data_source_id, get_notion_client, get_notion_token
+from .page_cache import AsyncSingleFlight, SingleFlight, get_page_cache
+from .search_index import get_search_index
+from .tool_output import format_page, format_table, get_reference_registry, report, short_date
+from .vector_index import get_vector_index
+
+
+# Block types whose text lives in a rich_text array under the type key
+TEXT_BLOCK_TYPES = (
+    "paragraph",
+    "heading_1",
+    "heading_2",
+    "heading_3",
+    "bulleted_list_item",
+    "numbered_list_item",
+    "toggle",
+    "to_do",
+    "quote",
+    "callout",
+    "code"
+)
+
+# Child pages and databases are separate documents, so the walk stops there
+NON_DESCENDING_BLOCK_TYPES = ("child_page", "child_database")
+
+
+def get_object_type(item: Dict) -> str:
+    """"page" or "database" for a Notion search result; data sources count as databases"""
+    object_type = item.get("object", "")
+    return "database" if object_type == "data_source" else object_type
+
+
+def get_title_from_item(item: Dict) -> str:
+    """Extract title from a Notion page or database object"""
+    properties = item.get("properties", {})
+    
+    # Try to find title property
+    for prop_name, prop_value in properties.items():
+        if prop_value.get("type") == "title":
+            title_array = prop_value.get("title", [])
+            if title_array:
+                return title_array[0].get("plain_text", "Untitled")
+    
+    # Databases keep their title at the top level
+    if "title" in item:
+        title_array = item.get("title", [])
+        if title_array:
+            return title_array[0].get("plain_text", "Untitled")
+    
+    return "Untitled"
+
+
+def extract_rich_text(rich_text_array: List[Dict]) -> str:
+    """Extract plain text from Notion rich text array"""
+    return "".join(text_item.get("plain_text", "") for text_item in rich_text_array)
+
+
+def extract_block_content(block: Dict) -> Optional[Dict]:
+    """Extract content from a Notion block"""
+    block_type = block.get("type", "")
+    
+    if block_type not in TEXT_BLOCK_TYPES:
+        return None
+    
+    block_value = block.get(block_type, {})
+    content = {
+        "type": block_type,
+        "text": extract_rich_text(block_value.get("rich_text", []))
+    }
+    if block_type == "to_do":
+        content["checked"] = block_value.get("checked", False)
+    return content
+
+
+def get_page_text(content: Dict[str, Any]) -> str:
+    """Join the extracted block text of a page for indexing"""
+    return "\n".join(block["text"] for block in content.get("blocks", []) if block.get("text"))
+
+
+class _BlockWalk:
+    """Bookkeeping of a block tree fetch: limits, fetched children and document order"""
+    
+    def __init__(self, max_depth: int, max_blocks: int):
+        self.max_depth = max_depth
+        self.max_blocks = max_blocks
+        self.children: Dict[str, List[Dict]] = {}
+        self.truncated = False
+        self.total = 0
+    
+    def add(self, parent_id: str, depth: int, blocks: List[Dict]) -> List[str]:
+        """Record the children of a block and return the ids whose children to fetch next"""
+        remaining = self.max_blocks - self.total
+        if len(blocks) > remaining:
+            blocks = blocks[:remaining]
+            self.truncated = True
+        self.total += len(blocks)
+        self.children[parent_id] = blocks
+        
+        descend = []
+        for block in blocks:
+            if not block.get("has_children") or block.get("type") in NON_DESCENDING_BLOCK_TYPES:
+                continue
+            if depth >= self.max_depth or self.total >= self.max_blocks:
+                self.truncated = True
+                continue
+            descend.append(block["id"])
+        return descend
+    
+    def ordered(self, block_id: str) -> List[Tuple[int, Dict]]:
+        """The fetched blocks as (depth, block) pairs in document order"""
+        ordered: List[Tuple[int, Dict]] = []
+        
+        def walk(parent_id: str, depth: int) -> None:
+            for block in self.children.get(parent_id, []):
+                ordered.append((depth, block))
+                walk(block.get("id", ""), depth + 1)
+        
+        walk(block_id, 0)
+        return ordered
+
+
+class BlockTreeFetcher:
+    """
+    Fetch every block of a page, following pagination and nested children
+
+    Child lists are requested concurrently as soon as their parent is known,
+    so a page takes roughly as long as its deepest branch rather than the sum
+    of all round-trips. Depth and block-count limits keep huge pages bounded.
+    """
+    
+    def __init__(
+        self,
+        notion: Client,
+        max_depth: Optional[int] = None,
+        max_blocks: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ):
+        self.notion = notion
+        self.max_depth = max_depth if max_depth is not None else int(os.getenv("NOTION_MAX_BLOCK_DEPTH", "3"))
+        self.max_blocks = max_blocks if max_blocks is not None else int(os.getenv("NOTION_MAX_BLOCKS", "1000"))
+        self.max_workers = max_workers if max_workers is not None else int(os.getenv("NOTION_FETCH_WORKERS", "4"))
+    
+    def list_children(self, block_id: str) -> List[Dict]:
+        """List all direct children of a block, following next_cursor"""
+        children = iterate_paginated_api(
+            self.notion.blocks.children.list,
+            block_id=block_id,
+            page_size=100
+        )
+        # One extra block tells the caller the limit was exceeded
+        return list(islice(children, self.max_blocks + 1))
+    
+    def fetch(self, block_id: str) -> Tuple[List[Tuple[int, Dict]], bool]:
+        """
+        Fetch the block tree below a page or block
+        
+        Args:
+            block_id: The page or block to walk
+            
+        Returns:
+            The blocks as (depth, block) pairs in document order, and whether
+            the depth or block-count limit cut the tree short
+        """
+        walk = _BlockWalk(self.max_depth, self.max_blocks)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(self.list_children, block_id): (block_id, 0)}
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    parent_id, depth = pending.pop(future)
+                    for child_id in walk.add(parent_id, depth, future.result()):
+                        pending[executor.submit(self.list_children, child_id)] = (child_id, depth + 1)
+        
+        return walk.ordered(block_id), walk.truncated
+    
+    async def alist_children(self, notion: AsyncClient, block_id: str) -> List[Dict]:
+        """Async list_children using an async Notion client"""
+        children = []
+        async for child in async_iterate_paginated_api(notion.blocks.children.list, block_id=block_id, page_size=100):
+            children.append(child)
+            if len(children) > self.max_blocks:
+                break
+        return children
+    
+    async def afetch(self, notion: AsyncClient, block_id: str) -> Tuple[List[Tuple[int, Dict]], bool]:
+        """Async fetch; child lists are requested as concurrent tasks instead of threads"""
+        walk = _BlockWalk(self.max_depth, self.max_blocks)
+        # Bounds in-flight requests like the thread pool of fetch
+        semaphore = asyncio.Semaphore(self.max_workers)
+        
+        async def list_children(parent_id: str) -> List[Dict]:
+            async with semaphore:
+                return await self.alist_children(notion, parent_id)
+        
+        pending = {asyncio.ensure_future(list_children(block_id)): (block_id, 0)}
+        
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    parent_id, depth = pending.pop(task)
+                    for child_id in walk.add(parent_id, depth, task.result()):
+                        pending[asyncio.ensure_future(list_children(child_id))] = (child_id, depth + 1)
+        except BaseException:
+            # A failed or cancelled fetch leaves the tree incomplete, so stop the sibling requests
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise
+        
+        return walk.ordered(block_id), walk.truncated
+
+
+def extract_page_content(page: Dict, block_fetcher: BlockTreeFetcher) -> Dict[str, Any]:
+    """Fetch the block tree of a page and extract its text content"""
+    # Get all page content blocks, including nested children
+    blocks, truncated = block_fetcher.fetch(page["id"])
+    return build_page_content(page, blocks, truncated)
+
+
+def build_page_content(page: Dict, blocks: List[Tuple[int, Dict]], truncated: bool) -> Dict[str, Any]:
+    """Extract the text content of a page from its fetched block tree"""
+    content = {
+        "title": get_title_from_item(page),
+        "url": page.get("url", ""),
+        "last_edited": page.get("last_edited_time", ""),
+        "blocks": []
+    }
+    
+    # Process blocks to extract text content
+    for depth, block in blocks:
+        block_content = extract_block_content(block)
+        if block_content:
+            if depth:
+                block_content["depth"] = depth
+            content["blocks"].append(block_content)
+    
+    if truncated:
+        content["truncated"] = True
+    
+    return content
 
 
 class NotionSearchTool(BaseTool):
     name: str = "notion_search"
-    description: str = "Search for pages and databases in Notion workspace"
+    description: str = "Search for pages and databases in Notion workspace by title and content"
+    # Clients and indexes, set in __init__
+    notion_token: Optional[str] = None
+    notion: Any = None
+    search_index: Any = None
+    references: Any = None
     
     def __init__(self):
         super().__init__()
-        self.notion_token = os.getenv("NOTION_TOKEN")
-        if not self.notion_token:
-            raise ValueError("NOTION_TOKEN environment variable is required")
-        self.notion = Client(auth=self.notion_token)
+        self.notion_token = get_notion_token()
+        self.notion = get_notion_client(self.notion_token)
+        self.search_index = get_search_index()
+        self.references = get_reference_registry()
     
     def _run(self, query: str) -> str:
         """Search Notion for pages and databases containing the query"""
         try:
-            results = self.notion.search(query=query, page_size=10)
+            # Answer from the local full-text index while it is fresh
+            if not self.search_index.is_stale():
+                local_results = self.search_index.search(query, limit=10)
+                if local_results:
+                    return report(self.name, self._format_results(local_results))
             
-            formatted_results = []
-            for item in results.get("results", []):
-                title = self._get_title_from_item(item)
-                url = item.get("url", "")
-                object_type = item.get("object", "")
-                
-                formatted_results.append({
-                    "title": title,
-                    "type": object_type,
-                    "url": url,
-                    "id": item.get("id", "")
-                })
+            results = self.notion.search(query=query, page_size=10)
+            return report(self.name, self._format_results(self._index_remote_results(results)))
+        except Exception as e:
+            return f"Error searching Notion: {str(e)}"
+    
+    async def _arun(self, query: str) -> str:
+        """Async _run; remote searches use the async Notion client"""
+        try:
+            if not self.search_index.is_stale():
+                local_results = self.search_index.search(query, limit=10)
+                if local_results:
+                    return report(self.name, self._format_results(local_results))
             
-            return str(formatted_results)
+            notion = get_async_notion_client(self.notion_token)
+            results = await notion.search(query=query, page_size=10)
+            return report(self.name, self._format_results(self._index_remote_results(results)))
         except Exception as e:
             return f"Error searching Notion: {str(e)}"
     
+    def _index_remote_results(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Flatten a Notion search response and add its hits to the local index"""
+        formatted_results = []
+        for item in results.get("results", []):
+            title = self._get_title_from_item(item)
+            url = item.get("url", "")
+            object_type = get_object_type(item)
+            
+            formatted_results.append({
+                "title": title,
+                "type": object_type,
+                "url": url,
+                "id": item.get("id", ""),
+                "last_edited": item.get("last_edited_time", "")
+            })
+            
+            # Make titles found remotely searchable locally as well
+            self.search_index.upsert(
+                item.get("id", ""),
+                title,
+                url=url,
+                object_type=object_type,
+                last_edited=item.get("last_edited_time", "")
+            )
+        
+        return formatted_results
+    
+    def _format_results(self, results: List[Dict[str, Any]]) -> str:
+        """Render search hits as a table keyed by short references"""
+        if not results:
+            return "No matching pages or databases"
+        
+        rows = []
+        for result in results:
+            rows.append({
+                "ref": self.references.register(result["id"], result.get("url", ""), result.get("type", ""), result.get("title", "")),
+                "type": result.get("type", ""),
+                "title": result.get("title", ""),
+                "edited": short_date(result.get("last_edited")),
+                "snippet": result.get("snippet", "")
+            })
+        return format_table(["ref", "type", "title", "edited", "snippet"], rows)
+    
     def _get_title_from_item(self, item: Dict) -> str:
         """Extract title from Notion item"""
-        properties = item.get("properties", {})
-        
-        # Try to find title property
-        for prop_name, prop_value in properties.items():
-            if prop_value.get("type") == "title":
-                title_array = prop_value.get("title", [])
-                if title_array:
-                    return title_array[0].get("plain_text", "Untitled")
-        
-        # Fallback to checking if it's a page with title in different structure
-        if "title" in item:
-            title_array = item.get("title", [])
-            if title_array:
-                return title_array[0].get("plain_text", "Untitled")
-        
-        return "Untitled"
+        return get_title_from_item(item)
+
+
+# Concurrent retrievals of one page, e.g. from a batch of questions, share a single fetch
+_page_loads = SingleFlight()
+_async_page_loads = AsyncSingleFlight()
 
 
 class NotionPageRetrieverTool(BaseTool):
     name: str = "notion_page_retriever"
-    description: str = "Retrieve content from a specific Notion page"
+    description: str = (
+        "Retrieve content from a specific Notion page, including nested blocks. Long pages are "
+        "trimmed to the blocks most relevant to the question (or to query, if given); "
+        "pass part=2, 3, ... to read the remaining blocks"
+    )
+    # Clients, caches and indexes, set in __init__
+    notion_token: Optional[str] = None
+    notion: Any = None
+    block_fetcher: Any = None
+    page_cache: Any = None
+    search_index: Any = None
+    references: Any = None
     
     def __init__(self):
         super().__init__()
-        self.notion_token = os.getenv("NOTION_TOKEN")
-        if not self.notion_token:
-            raise ValueError("NOTION_TOKEN environment variable is required")
-        self.notion = Client(auth=self.notion_token)
+        self.notion_token = get_notion_token()
+        self.notion = get_notion_client(self.notion_token)
+        self.block_fetcher = BlockTreeFetcher(self.notion)
+        self.page_cache = get_page_cache()
+        self.search_index = get_search_index()
+        self.references = get_reference_registry()
     
-    def _run(self, page_id: str) -> str:
+    def _run(self, page_id: str, query: str = "", part: int = 1) -> str:
         """Retrieve content from a Notion page"""
         try:
-            # Get page details
-            page = self.notion.pages.retrieve(page_id)
-            
-            # Get page content blocks
-            blocks = self.notion.blocks.children.list(page_id)
-            
-            content = {
-                "title": self._get_title_from_item(page),
-                "url": page.get("url", ""),
-                "last_edited": page.get("last_edited_time", ""),
-                "blocks": []
-            }
+            page_id = self.references.resolve(page_id)
+            cache_key, content = _page_loads.do(page_id, lambda: self._load_page(page_id))
             
-            # Process blocks to extract text content
-            for block in blocks.get("results", []):
-                block_content = self._extract_block_content(block)
-                if block_content:
-                    content["blocks"].append(block_content)
+            ref = self.references.register(cache_key, content["url"], "page", content["title"])
+            return report(self.name, self._format_part(ref, content, query or get_active_question(), int(part)))
+        except Exception as e:
+            return f"Error retrieving Notion page: {str(e)}"
+    
+    async def _arun(self, page_id: str, query: str = "", part: int = 1) -> str:
+        """Async _run; the page and its blocks are fetched with the async Notion client"""
+        try:
+            page_id = self.references.resolve(page_id)
+            cache_key, content = await _async_page_loads.do(page_id, lambda: self._aload_page(page_id))
             
-            return str(content)
+            ref = self.references.register(cache_key, content["url"], "page", content["title"])
+            return report(self.name, self._format_part(ref, content, query or get_active_question(), int(part)))
         except Exception as e:
             return f"Error retrieving Notion page: {str(e)}"
     
-    def _get_title_from_item(self, item: Dict) -> str:
-        """Extract title from Notion item"""
-        properties = item.get("properties", {})
+    def _load_page(self, page_id: str) -> Tuple[str, Dict[str, Any]]:
+        """Get a page's content from the cache, or fetch and cache it if outdated"""
+        # Get page details; last_edited_time tells whether cached blocks are current
+        page = self.notion.pages.retrieve(page_id)
+        cache_key = page.get("id", page_id)
+        last_edited = page.get("last_edited_time", "")
+        
+        content = self.page_cache.get(cache_key, last_edited)
+        if content is None:
+            content = self._fetch_content(page)
+            self._store_page(cache_key, last_edited, content)
+        return cache_key, content
+    
+    async def _aload_page(self, page_id: str) -> Tuple[str, Dict[str, Any]]:
+        """Async _load_page"""
+        notion = get_async_notion_client(self.notion_token)
+        page = await notion.pages.retrieve(page_id)
+        cache_key = page.get("id", page_id)
+        last_edited = page.get("last_edited_time", "")
         
-        for prop_name, prop_value in properties.items():
-            if prop_value.get("type") == "title":
-                title_array = prop_value.get("title", [])
-                if title_array:
-                    return title_array[0].get("plain_text", "Untitled")
+        content = self.page_cache.get(cache_key, last_edited)
+        if content is None:
+            blocks, truncated = await self.block_fetcher.afetch(notion, page["id"])
+            content = build_page_content(page, blocks, truncated)
+            self._store_page(cache_key, last_edited, content)
+        return cache_key, content
+    
+    def _store_page(self, cache_key: str, last_edited: str, content: Dict[str, Any]) -> None:
+        """Cache freshly fetched page content and refresh its search index entry"""
+        self.page_cache.put(cache_key, last_edited, content)
+        self.search_index.upsert(
+            cache_key,
+            content["title"],
+            body=get_page_text(content),
+            url=content["url"],
+            last_edited=last_edited
+        )
+    
+    def _format_part(self, ref: str, content: Dict[str, Any], question: str, part: int) -> str:
+        """Render one token-budgeted part of a page; cached content is never modified"""
+        # Parts are cut from the whole cached page rather than fetched lazily: the
+        # first part ranks every block against the question, and later parts are
+        # then served from the page cache without another Notion request
+        blocks = content["blocks"]
+        parts = pack_blocks(blocks, question)
+        if len(parts) == 1:
+            return format_page(ref, content)
+        if not 1 <= part <= len(parts):
+            return f"[{ref}] has {len(parts)} parts; pass part between 1 and {len(parts)}"
         
-        return "Untitled"
+        indices = parts[part - 1]
+        result = format_page(ref, content, select_blocks(blocks, indices))
+        result += f"\n(Part {part} of {len(parts)}, {len(indices)} of {len(blocks)} blocks"
+        if part < len(parts):
+            result += f"; call again with part={part + 1} for more)"
+        else:
+            result += ")"
+        return result
+    
+    def _fetch_content(self, page: Dict) -> Dict[str, Any]:
+        """Fetch and extract all content blocks of a page"""
+        return extract_page_content(page, self.block_fetcher)
+    
+    def _get_title_from_item(self, item: Dict) -> str:
+        """Extract title from Notion item"""
+        return get_title_from_item(item)
     
     def _extract_block_content(self, block: Dict) -> Optional[Dict]:
         """Extract content from a Notion block"""
-        block_type = block.get("type", "")
-        
-        if block_type == "paragraph":
-            text_content = self._extract_rich_text(block.get("paragraph", {}).get("rich_text", []))
-            return {"type": "paragraph", "text": text_content}
-        elif block_type == "heading_1":
-            text_content = self._extract_rich_text(block.get("heading_1", {}).get("rich_text", []))
-            return {"type": "heading_1", "text": text_content}
-        elif block_type == "heading_2":
-            text_content = self._extract_rich_text(block.get("heading_2", {}).get("rich_text", []))
-            return {"type": "heading_2", "text": text_content}
-        elif block_type == "heading_3":
-            text_content = self._extract_rich_text(block.get("heading_3", {}).get("rich_text", []))
-            return {"type": "heading_3", "text": text_content}
-        elif block_type == "bulleted_list_item":
-            text_content = self._extract_rich_text(block.get("bulleted_list_item", {}).get("rich_text", []))
-            return {"type": "bulleted_list_item", "text": text_content}
-        elif block_type == "numbered_list_item":
-            text_content = self._extract_rich_text(block.get("numbered_list_item", {}).get("rich_text", []))
-            return {"type": "numbered_list_item", "text": text_content}
-        
-        return None
+        return extract_block_content(block)
     
     def _extract_rich_text(self, rich_text_array: List[Dict]) -> str:
         """Extract plain text from Notion rich text array"""
-        text_parts = []
-        for text_item in rich_text_array:
-            text_parts.append(text_item.get("plain_text", ""))
-        return "".join(text_parts)
+        return extract_rich_text(rich_text_array)
+
+
+class NotionSemanticSearchTool(BaseTool):
+    name: str = "notion_semantic_search"
+    description: str = (
+        "Find the passages of synced Notion pages most relevant to a question. "
+        "Returns the top passages with page titles and URLs in one call, so whole pages "
+        "only need to be retrieved when the passages are not enough"
+    )
+    # Index and references, set in __init__
+    vector_index: Any = None
+    references: Any = None
+    
+    def __init__(self):
+        super().__init__()
+        self.vector_index = get_vector_index()
+        self.references = get_reference_registry()
+    
+    def _run(self, query: str, top_k: int = 5) -> str:
+        """Search the local vector index for passages similar to the query"""
+        try:
+            if not len(self.vector_index):
+                return "The semantic index is empty; use notion_search and notion_page_retriever instead"
+            
+            # Passages already start with the page title and heading path
+            passages = []
+            for passage in self.vector_index.search(query, top_k=int(top_k)):
+                ref = self.references.register(passage["page_id"], passage["url"], "page", passage["title"])
+                passages.append(f"[{ref}] (score {passage['score']:.2f}) {passage['text']}")
+            return report(self.name, "\n\n".join(passages))
+        except Exception as e:
+            return f"Error searching Notion passages: {str(e)}"
+    
+    async def _arun(self, query: str, top_k: int = 5) -> str:
+        """Async _run; the query embedding and index search run in a worker thread"""
+        return await asyncio.to_thread(self._run, query, top_k)
+
+
+def format_database_row(item: Dict) -> Dict[str, Any]:
+    """Flatten a database row into its id, URL and plain property values"""
+    formatted_item = {
+        "id": item.get("id", ""),
+        "url": item.get("url", ""),
+        "last_edited": item.get("last_edited_time", ""),
+        "properties": {}
+    }
+    
+    # Extract property values
+    for prop_name, prop_value in item.get("properties", {}).items():
+        value = format_property_value(prop_value)
+        if value is not None and value != "":
+            formatted_item["properties"][prop_name] = value
+    
+    return formatted_item
+
+
+def iter_database_rows(notion: Client, database_id: str, query_payload: Optional[Dict[str, Any]] = None, page_size: int = 100):
+    """Stream every row matching a query, following next_cursor lazily"""
+    return iterate_paginated_api(
+        notion.data_sources.query,
+        data_source_id=get_data_source_id(notion, database_id),
+        page_size=page_size,
+        **(query_payload or {})
+    )
 
 
 class NotionDatabaseQueryTool(BaseTool):
     name: str = "notion_database_query"
-    description: str = "Query a Notion database for specific information"
+    description: str = (
+        "Query a Notion database for specific information. filter_query accepts clauses like "
+        "'Status = Done; Priority >= 2; Owner contains Alice; sort by Due desc' "
+        "(operators: =, !=, >, <, >=, <=, contains, does not contain, is empty, is not empty; "
+        "clauses joined with ';' or 'and' must all match, alternatives within a clause are joined with 'or', "
+        "e.g. 'Status = Done; Priority > 2 or Tag = Bob'; 'and'/'or' followed by anything but a new "
+        "'<Property> <operator>' clause are part of the value, e.g. 'Team = R and D') or a raw Notion filter JSON object. "
+        "max_results caps the number of matching rows returned"
+    )
+    # Clients and schema cache, set in __init__
+    notion_token: Optional[str] = None
+    notion: Any = None
+    schemas: Dict[str, Any] = Field(default_factory=dict)
+    references: Any = None
     
     def __init__(self):
         super().__init__()
-        self.notion_token = os.getenv("NOTION_TOKEN")
-        if not self.notion_token:
-            raise ValueError("NOTION_TOKEN environment variable is required")
-        self.notion = Client(auth=self.notion_token)
+        self.notion_token = get_notion_token()
+        self.notion = get_notion_client(self.notion_token)
+        self.schemas = {}
+        self.references = get_reference_registry()
     
-    def _run(self, database_id: str, filter_query: str = "") -> str:
+    def _run(self, database_id: str, filter_query: str = "", max_results: int = 20) -> str:
         """Query a Notion database"""
         try:
-            # Basic query without complex filters for now
-            query_params = {"page_size": 20}
-            
-            results = self.notion.databases.query(database_id, **query_params)
+            database_id = self.references.resolve(database_id)
+            query_payload = build_query_payload(filter_query, self._get_schema(database_id, filter_query))
+            max_results = int(max_results)
             
-            formatted_results = []
-            for item in results.get("results", []):
-                properties = item.get("properties", {})
-                formatted_item = {
-                    "id": item.get("id", ""),
-                    "url": item.get("url", ""),
-                    "last_edited": item.get("last_edited_time", ""),
-                    "properties": {}
-                }
-                
-                # Extract property values
-                for prop_name, prop_value in properties.items():
-                    prop_type = prop_value.get("type", "")
-                    
-                    if prop_type == "title":
-                        title_array = prop_value.get("title", [])
-                        if title_array:
-                            formatted_item["properties"][prop_name] = title_array[0].get("plain_text", "")
-                    elif prop_type == "rich_text":
-                        rich_text_array = prop_value.get("rich_text", [])
-                        if rich_text_array:
-                            formatted_item["properties"][prop_name] = rich_text_array[0].get("plain_text", "")
-                    elif prop_type == "select":
-                        select_value = prop_value.get("select", {})
-                        if select_value:
-                            formatted_item["properties"][prop_name] = select_value.get("name", "")
-                    elif prop_type == "number":
-                        formatted_item["properties"][prop_name] = prop_value.get("number", "")
-                    elif prop_type == "date":
-                        date_value = prop_value.get("date", {})
-                        if date_value:
-                            formatted_item["properties"][prop_name] = date_value.get("start", "")
-                
-                formatted_results.append(formatted_item)
+            rows = iter_database_rows(
+                self.notion,
+                database_id,
+                query_payload,
+                page_size=min(100, max_results + 1)
+            )
             
-            return str(formatted_results)
+            # One extra row tells whether the cap cut the result set short
+            items = list(islice(rows, max_results + 1))
+            get_database_mirror(database_id).upsert_rows(items)
+            has_more = len(items) > max_results
+            result = self._format_rows([format_database_row(item) for item in items[:max_results]])
+            if has_more:
+                result += f"\n(Showing the first {max_results} matching rows; narrow filter_query or raise max_results to see more)"
+            return report(self.name, result)
         except Exception as e:
             return f"Error querying Notion database: {str(e)}"
+    
+    async def _arun(self, database_id: str, filter_query: str = "", max_results: int = 20) -> str:
+        """Async _run; rows are streamed from Notion in a worker thread"""
+        return await asyncio.to_thread(self._run, database_id, filter_query, max_results)
+    
+    def _format_rows(self, rows: List[Dict[str, Any]]) -> str:
+        """Render rows as one table with a column per property"""
+        if not rows:
+            return "No matching rows"
+        
+        columns = ["ref"]
+        for row in rows:
+            columns.extend(name for name in row["properties"] if name not in columns)
+        
+        table_rows = []
+        for row in rows:
+            table_row = dict(row["properties"])
+            table_row["ref"] = self.references.register(row["id"], row["url"], "page", self._row_title(row))
+            table_row["edited"] = short_date(row["last_edited"])
+            table_rows.append(table_row)
+        return format_table(columns + ["edited"], table_rows)
+    
+    def _row_title(self, row: Dict[str, Any]) -> str:
+        """First text property of a row, used as the link text for its reference"""
+        for value in row["properties"].values():
+            if isinstance(value, str):
+                return value
+        return ""
+    
+    def _get_schema(self, database_id: str, filter_query: str) -> Dict[str, Dict[str, Any]]:
+        """Get database properties, which the clause syntax needs to build filters"""
+        filter_query = (filter_query or "").strip()
+        if not filter_query or filter_query[0] in "{[":
+            return {}
+        if database_id not in self.schemas:
+            data_source = self.notion.data_sources.retrieve(get_data_source_id(self.notion, database_id))
+            self.schemas[database_id] = data_source.get("properties", {})
+        return self.schemas[database_id]
+
+
+class NotionDatabaseAggregateTool(BaseTool):
+    name: str = "notion_database_aggregate"
+    description: str = (
+        "Compute exact aggregates over all rows of a Notion database, e.g. how many open tasks "
+        "per owner. operation is one of count, sum, avg, min, max, distinct; column is the "
+        "property to aggregate (optional for count); group_by is an optional property to group "
+        "by; filter_query uses the same clause syntax as notion_database_query"
+    )
+    # Clients, set in __init__
+    notion_token: Optional[str] = None
+    notion: Any = None
+    
+    def __init__(self):
+        super().__init__()
+        self.notion_token = get_notion_token()
+        self.notion = get_notion_client(self.notion_token)
+    
+    def _run(
+        self,
+        database_id: str,
+        operation: str = "count",
+        column: str = "",
+        group_by: str = "",
+        filter_query: str = ""
+    ) -> str:
+        """Aggregate a database from its local columnar mirror"""
+        try:
+            references = get_reference_registry()
+            database_id = references.resolve(database_id)
+            mirror = get_database_mirror(database_id)
+            mirror.refresh(self.notion)
+            result = mirror.aggregate(operation, column=column, group_by=group_by, filter_query=filter_query)
+            result["database_id"] = references.register(database_id, object_type="database")
+            result = {key: value for key, value in result.items() if value is not None}
+            return report(self.name, json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str))
+        except Exception as e:
+            return f"Error aggregating Notion database: {str(e)}"
+    
+    async def _arun(
+        self,
+        database_id: str,
+        operation: str = "count",
+        column: str = "",
+        group_by: str = "",
+        filter_query: str = ""
+    ) -> str:
+        """Async _run; the mirror refresh and aggregation run in a worker thread"""
+        return await asyncio.to_thread(self._run, database_id, operation, column, group_by, filter_query)
@@ -0,0 +1,268 @@
+"""
+Version-aware two-tier cache for extracted Notion page content
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+DEFAULT_CACHE_PATH = ".cache/notion_pages.sqlite3"
+
+
+class PageCache:
+    """
+    In-memory LRU backed by an on-disk SQLite store
+
+    Entries are keyed by page id and only served while the stored
+    last_edited_time matches the one Notion currently reports, so a cheap
+    pages.retrieve call decides whether the cached blocks are still valid.
+    Both tiers evict least recently used pages once their size budget is
+    exceeded.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_bytes: Optional[int] = None,
+        max_disk_bytes: Optional[int] = None
+    ):
+        if path is None:
+            path = os.getenv("NOTION_CACHE_PATH", DEFAULT_CACHE_PATH)
+        if max_memory_bytes is None:
+            max_memory_bytes = int(float(os.getenv("NOTION_CACHE_MEMORY_MB", "64")) * 1024 * 1024)
+        if max_disk_bytes is None:
+            max_disk_bytes = int(float(os.getenv("NOTION_CACHE_DISK_MB", "512")) * 1024 * 1024)
+
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, Tuple[str, Dict[str, Any], int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "evictions": 0
+        }
+
+        self._db = None
+        if path:
+            if path != ":memory:":
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    page_id TEXT PRIMARY KEY,
+                    last_edited TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+            self._db.commit()
+
+    def get(self, page_id: str, last_edited_time: str) -> Optional[Dict[str, Any]]:
+        """
+        Get cached page content if it matches the current page version
+
+        Args:
+            page_id: The Notion page ID
+            last_edited_time: The page's current last_edited_time
+
+        Returns:
+            The cached content, or None on a miss or an outdated entry
+        """
+        with self._lock:
+            entry = self._memory.get(page_id)
+            if entry is not None:
+                if entry[0] == last_edited_time:
+                    self._memory.move_to_end(page_id)
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                self._drop_memory(page_id)
+                self._counters["stale"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT last_edited, content FROM pages WHERE page_id = ?",
+                    (page_id,)
+                ).fetchone()
+                if row is not None:
+                    if row[0] == last_edited_time:
+                        self._db.execute(
+                            "UPDATE pages SET accessed_at = ? WHERE page_id = ?",
+                            (time.time(), page_id)
+                        )
+                        self._db.commit()
+                        content = json.loads(row[1])
+                        self._remember(page_id, last_edited_time, content, len(row[1]))
+                        self._counters["disk_hits"] += 1
+                        return content
+                    self._db.execute("DELETE FROM pages WHERE page_id = ?", (page_id,))
+                    self._db.commit()
+                    self._counters["stale"] += 1
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, page_id: str, last_edited_time: str, content: Dict[str, Any]) -> None:
+        """Store page content for the given page version"""
+        serialized = json.dumps(content, ensure_ascii=False)
+        size = len(serialized)
+
+        with self._lock:
+            self._remember(page_id, last_edited_time, content, size)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages (page_id, last_edited, content, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (page_id, last_edited_time, serialized, size, time.time())
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def invalidate(self, page_id: str) -> None:
+        """Remove a page from both tiers"""
+        with self._lock:
+            self._drop_memory(page_id)
+            if self._db is not None:
+                self._db.execute("DELETE FROM pages WHERE page_id = ?", (page_id,))
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Remove every cached page"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM pages")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current cache sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            if self._db is not None:
+                count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+                stats["disk_entries"] = count
+                stats["disk_bytes"] = size
+            return stats
+
+    def _remember(self, page_id: str, last_edited_time: str, content: Dict[str, Any], size: int) -> None:
+        self._drop_memory(page_id)
+        if size > self.max_memory_bytes:
+            return
+        self._memory[page_id] = (last_edited_time, content, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, _, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self._counters["evictions"] += 1
+
+    def _drop_memory(self, page_id: str) -> None:
+        entry = self._memory.pop(page_id, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+
+    def _evict_disk(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        freed = 0
+        evicted = []
+        for page_id, size in self._db.execute("SELECT page_id, size FROM pages ORDER BY accessed_at").fetchall():
+            if total - freed <= self.max_disk_bytes:
+                break
+            evicted.append((page_id,))
+            freed += size
+        self._db.executemany("DELETE FROM pages WHERE page_id = ?", evicted)
+        self._counters["evictions"] += len(evicted)
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for and share its result (or exception) instead of repeating
+    the work. Used so concurrent questions fetch a shared page only once.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Tuple[threading.Event, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, function: Callable[[], Any]) -> Any:
+        """Run function for key, or wait for the run already in flight"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = (threading.Event(), {})
+                self._calls[key] = call
+        done, outcome = call
+
+        if not leader:
+            done.wait()
+        else:
+            try:
+                outcome["result"] = function()
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                done.set()
+
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: concurrent awaits of one key share one run"""
+
+    def __init__(self):
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, str], "asyncio.Future[Any]"] = {}
+
+    async def do(self, key: str, function: Callable[[], Awaitable[Any]]) -> Any:
+        """Await function for key, or the run already in flight on this event loop"""
+        call_key = (asyncio.get_running_loop(), key)
+        call = self._calls.get(call_key)
+        if call is None:
+            call = asyncio.ensure_future(function())
+            self._calls[call_key] = call
+            call.add_done_callback(lambda _: self._calls.pop(call_key, None))
+        # A cancelled waiter must not cancel the shared run
+        return await asyncio.shield(call)
+
+
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    """Get the process-wide page cache"""
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache()
+        return _page_cache
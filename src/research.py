@@ -0,0 +1,182 @@
+"""
+Parallel research: sub-queries fanned out over the Notion tools concurrently
+"""
+import asyncio
+import contextvars
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from .streaming import get_stream_sink
+
+
+_REFERENCE_ROW = re.compile(r"^([pd]\d+) \|", re.MULTILINE)
+_SPLIT_PATTERN = re.compile(r"\?|;|\n|\balso\b|\bas well as\b|,?\s+and\s+(?=(?:what|who|when|where|which|how|why|is|are|do|does|list|show)\b)", re.IGNORECASE)
+
+
+def research_mode() -> str:
+    """Get how the research step runs: "parallel" or the default "agent" loop"""
+    return os.getenv("RESEARCH_MODE", "agent").lower()
+
+
+def split_question(question: str, max_subqueries: int = 4) -> List[str]:
+    """
+    Split a multi-part question into sub-queries
+
+    The whole question always comes first, followed by its parts when it
+    asks about several things ("What is X, and who owns Y?").
+    """
+    parts = [part.strip(" ,.") for part in _SPLIT_PATTERN.split(question) if part and part.strip(" ,.")]
+    subqueries = [question.strip()]
+    seen = {_normalize_query(question)}
+    for part in parts:
+        key = _normalize_query(part)
+        if len(part.split()) >= 2 and key not in seen:
+            seen.add(key)
+            subqueries.append(part)
+    return subqueries[:max_subqueries]
+
+
+def _normalize_query(query: str) -> str:
+    return query.strip().rstrip("?").strip().lower()
+
+
+class ParallelResearcher:
+    """
+    Run the research step as concurrent tool calls instead of an agent loop
+
+    Every sub-query is searched at once. As soon as a search returns, the
+    pages and databases it found are fetched, so the wall-clock time is
+    about that of the slowest search-then-fetch branch rather than the sum
+    of all calls. The findings are merged into one text for the QA task.
+    """
+
+    def __init__(
+        self,
+        tools: Dict[str, Any],
+        max_workers: Optional[int] = None,
+        pages_per_query: int = 2,
+        databases_per_query: int = 1
+    ):
+        self.tools = tools
+        self.max_workers = max_workers or int(os.getenv("RESEARCH_WORKERS", "8"))
+        self.pages_per_query = pages_per_query
+        self.databases_per_query = databases_per_query
+
+    def research(self, question: str) -> str:
+        """Research a question and return the merged findings"""
+        subqueries = split_question(question)
+        sink = get_stream_sink()
+        if sink is not None:
+            sink.step(f"🔎 Researching {len(subqueries)} queries in parallel")
+
+        findings: Dict[Tuple[str, str], str] = {}
+        fetched = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="research") as executor:
+            pending: Dict[Future, Tuple[str, str]] = {}
+
+            def submit(kind: str, target: str, function, *args, **kwargs) -> None:
+                # Tools read context variables such as the active question
+                context = contextvars.copy_context()
+                pending[executor.submit(context.run, function, *args, **kwargs)] = (kind, target)
+
+            semantic = self.tools.get("notion_semantic_search")
+            for subquery in subqueries:
+                submit("search", subquery, self.tools["notion_search"]._run, subquery)
+                if semantic is not None and len(semantic.vector_index):
+                    submit("passages", subquery, semantic._run, subquery, top_k=3)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, target = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = f"Error: {str(e)}"
+                    findings[(kind, target)] = result
+                    if kind == "search":
+                        for follow_up, ref, tool, kwargs in self.follow_ups(target, result, fetched):
+                            submit(follow_up, ref, tool._run, ref, **kwargs)
+
+        if sink is not None:
+            sink.step(f"📚 Gathered {len(findings)} results")
+        return self.merge(subqueries, findings)
+
+    async def aresearch(self, question: str) -> str:
+        """Async research; tool calls run as tasks on the event loop instead of threads"""
+        subqueries = split_question(question)
+        sink = get_stream_sink()
+        if sink is not None:
+            sink.step(f"🔎 Researching {len(subqueries)} queries in parallel")
+
+        findings: Dict[Tuple[str, str], str] = {}
+        fetched = set()
+        semaphore = asyncio.Semaphore(self.max_workers)
+        pending: Dict["asyncio.Task[str]", Tuple[str, str]] = {}
+
+        async def call(function, *args, **kwargs) -> str:
+            async with semaphore:
+                return await function(*args, **kwargs)
+
+        def submit(kind: str, target: str, function, *args, **kwargs) -> None:
+            pending[asyncio.ensure_future(call(function, *args, **kwargs))] = (kind, target)
+
+        semantic = self.tools.get("notion_semantic_search")
+        for subquery in subqueries:
+            submit("search", subquery, self.tools["notion_search"]._arun, subquery)
+            if semantic is not None and len(semantic.vector_index):
+                submit("passages", subquery, semantic._arun, subquery, top_k=3)
+
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                kind, target = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    result = f"Error: {str(e)}"
+                findings[(kind, target)] = result
+                if kind == "search":
+                    for follow_up, ref, tool, kwargs in self.follow_ups(target, result, fetched):
+                        submit(follow_up, ref, tool._arun, ref, **kwargs)
+
+        if sink is not None:
+            sink.step(f"📚 Gathered {len(findings)} results")
+        return self.merge(subqueries, findings)
+
+    def follow_ups(self, subquery: str, search_result: str, fetched: set) -> List[Tuple[str, str, Any, Dict[str, Any]]]:
+        """The page and database fetches a search result calls for, skipping refs already fetched"""
+        refs = _REFERENCE_ROW.findall(search_result)
+        pages = [ref for ref in refs if ref.startswith("p")][:self.pages_per_query]
+        databases = [ref for ref in refs if ref.startswith("d")][:self.databases_per_query]
+
+        calls = []
+        for ref in pages:
+            if ref not in fetched:
+                fetched.add(ref)
+                calls.append(("page", ref, self.tools["notion_page_retriever"], {"query": subquery}))
+        for ref in databases:
+            if ref not in fetched:
+                fetched.add(ref)
+                calls.append(("database", ref, self.tools["notion_database_query"], {"max_results": 10}))
+        return calls
+
+    def merge(self, subqueries: List[str], findings: Dict[Tuple[str, str], str]) -> str:
+        """Combine search hits, passages, pages and database rows into one text"""
+        sections = []
+        for subquery in subqueries:
+            parts = [f"### {subquery}"]
+            if ("passages", subquery) in findings:
+                parts.append(findings[("passages", subquery)])
+            parts.append(findings.get(("search", subquery), ""))
+            sections.append("\n".join(part for part in parts if part))
+
+        for kind, title in (("page", "Pages"), ("database", "Databases")):
+            results = [result for (found_kind, _), result in findings.items() if found_kind == kind]
+            if results:
+                sections.append(f"### {title}\n" + "\n\n".join(results))
+
+        return "\n\n".join(sections)
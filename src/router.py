@@ -0,0 +1,165 @@
+"""
+Question routing, so only complex questions pay for the full crew
+"""
+import asyncio
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .streaming import FINAL_ANSWER_MARKER
+
+
+LOOKUP = "lookup"
+AGGREGATE = "aggregate"
+FOLLOW_UP = "follow_up"
+RESEARCH = "research"
+ROUTES = (LOOKUP, AGGREGATE, FOLLOW_UP, RESEARCH)
+
+_AGGREGATE_PATTERN = re.compile(
+    r"\b(how many|count|number of|total|sum of|average|avg|mean|median|minimum|maximum|"
+    r"per (owner|person|assignee|status|team|project|month|week)|group(ed)? by|breakdown|"
+    # "most"/"least" alone also start ordinary questions ("the most important decision", "at least")
+    r"(most|least) (common|frequent)|(most|fewest|least) (\w+ )?(tasks|items|rows|issues|tickets|entries|records)|"
+    r"top \d+)\b",
+    re.IGNORECASE
+)
+_RESEARCH_PATTERN = re.compile(
+    r"\b(compare|comparison|summari[sz]e|summary of|analy[sz]e|analysis|explain why|pros and cons|"
+    r"trade-?offs?|difference between|relationship|across all|overview of|recommend|strategy|plan for|"
+    r"step[- ]by[- ]step)\b",
+    re.IGNORECASE
+)
+_FOLLOW_UP_START = re.compile(r"^(and|also|what about|how about|then|so|why|but|ok(ay)?|more on)\b", re.IGNORECASE)
+_FOLLOW_UP_REFERENCE = re.compile(r"\b(it|its|that|this|those|these|they|them|their|he|she|above|previous)\b", re.IGNORECASE)
+
+# Questions longer than this are treated as research even without keywords
+MAX_LOOKUP_WORDS = 25
+MAX_FOLLOW_UP_WORDS = 12
+
+
+def classify_question(question: str, conversation_history: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Classify a question by how much work answering it needs
+
+    Returns:
+        "lookup" for a single fact or page, "aggregate" for counts and
+        statistics over a database, "follow_up" for a short question about
+        the previous answer, or "research" for anything that needs the full crew
+    """
+    mode = os.getenv("QUERY_ROUTER", "auto").lower()
+    if mode in ROUTES:
+        return mode
+    if mode in ("off", "false"):
+        return RESEARCH
+
+    question = question.strip()
+    words = question.split()
+    has_previous_answer = any(
+        entry.get("type") == "assistant_response" for entry in (conversation_history or [])
+    )
+
+    if has_previous_answer and len(words) <= MAX_FOLLOW_UP_WORDS and (
+        _FOLLOW_UP_START.search(question) or _FOLLOW_UP_REFERENCE.search(question)
+    ):
+        return FOLLOW_UP
+    if _RESEARCH_PATTERN.search(question) or question.count("?") > 1 or len(words) > MAX_LOOKUP_WORDS:
+        return RESEARCH
+    if _AGGREGATE_PATTERN.search(question):
+        return AGGREGATE
+    return LOOKUP
+
+
+FAST_PATH_PROMPT = """You answer questions about a Notion workspace using only the context below.
+Cite sources by their short reference in brackets, e.g. [p3]. Begin your reply with
+"{final_answer}". If the context does not contain the answer, reply exactly: {not_found}"""
+
+NOT_FOUND = "NOT_FOUND"
+
+_REFERENCE_ROW = re.compile(r"^(p\d+) \|", re.MULTILINE)
+
+
+class FastPathAnswerer:
+    """
+    Answer simple questions with one retrieval and one LLM call
+
+    Context comes from the semantic passage index when it has content, and
+    otherwise from the full-text search hits and the top pages they point to.
+    """
+
+    def __init__(self, tools: Dict[str, Any], llm, max_pages: int = 2):
+        self.tools = tools
+        self.llm = llm
+        self.max_pages = max_pages
+
+    def gather_context(self, question: str) -> str:
+        """Collect the passages or pages most relevant to a question"""
+        semantic = self.tools.get("notion_semantic_search")
+        if semantic is not None and len(semantic.vector_index):
+            return semantic._run(question, top_k=5)
+
+        hits = self.tools["notion_search"]._run(question)
+        refs = _REFERENCE_ROW.findall(hits)[:self.max_pages]
+        pages = [self.tools["notion_page_retriever"]._run(ref, query=question) for ref in refs]
+        return "\n\n".join(page for page in pages if not page.startswith("Error"))
+
+    async def agather_context(self, question: str) -> str:
+        """Async gather_context; the top pages are retrieved concurrently"""
+        semantic = self.tools.get("notion_semantic_search")
+        if semantic is not None and len(semantic.vector_index):
+            return await semantic._arun(question, top_k=5)
+
+        hits = await self.tools["notion_search"]._arun(question)
+        refs = _REFERENCE_ROW.findall(hits)[:self.max_pages]
+        pages = await asyncio.gather(*(self.tools["notion_page_retriever"]._arun(ref, query=question) for ref in refs))
+        return "\n\n".join(page for page in pages if not page.startswith("Error"))
+
+    def answer(self, question: str, conversation_history: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
+        """
+        Answer a question, or return None if nothing relevant was found
+
+        Args:
+            question: The user's question
+            conversation_history: The conversation ending with this question,
+                given for follow-ups so earlier turns can be resolved
+        """
+        retrieval_query, recent = self._conversation(question, conversation_history)
+        context = self.gather_context(retrieval_query)
+        if not context.strip():
+            return None
+        return self._parse(self.llm.invoke(self._messages(question, context, recent)))
+
+    async def aanswer(self, question: str, conversation_history: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
+        """Async answer"""
+        retrieval_query, recent = self._conversation(question, conversation_history)
+        context = await self.agather_context(retrieval_query)
+        if not context.strip():
+            return None
+        return self._parse(await self.llm.ainvoke(self._messages(question, context, recent)))
+
+    def _conversation(self, question: str, conversation_history: Optional[List[Dict[str, Any]]]) -> Tuple[str, List[str]]:
+        """The query to retrieve context with, and the recent turns to show the LLM"""
+        # The current question is the last entry of the history
+        earlier = (conversation_history or [])[:-1]
+        recent = [
+            f"{'User' if entry['type'] == 'user_question' else 'Assistant'}: {entry['content'][:1000]}"
+            for entry in earlier[-4:]
+        ]
+        previous_questions = [entry["content"] for entry in earlier if entry["type"] == "user_question"]
+        retrieval_query = f"{previous_questions[-1]} {question}" if previous_questions else question
+        return retrieval_query, recent
+
+    def _messages(self, question: str, context: str, recent: List[str]) -> List[Tuple[str, str]]:
+        prompt = f"Context:\n{context}\n\n"
+        if recent:
+            prompt += "Conversation so far:\n" + "\n".join(recent) + "\n\n"
+        prompt += f"Question: {question}"
+        return [
+            ("system", FAST_PATH_PROMPT.format(final_answer=FINAL_ANSWER_MARKER, not_found=NOT_FOUND)),
+            ("human", prompt)
+        ]
+
+    def _parse(self, response: Any) -> Optional[str]:
+        answer = str(getattr(response, "content", response)).strip()
+        if answer.startswith(NOT_FOUND):
+            return None
+        return answer.split(FINAL_ANSWER_MARKER, 1)[-1].strip()
@@ -0,0 +1,210 @@
+"""
+Local full-text index of Notion page titles and block text
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_INDEX_PATH = ".cache/notion_index.sqlite3"
+
+# Title matches count ten times as much as body matches in BM25 ranking
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+# Question words that would otherwise match almost every page
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "our the to we what when where which who why with you your".split()
+)
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index with BM25 ranking over synced Notion pages
+
+    The index is considered stale when it has never been synced or the last
+    sync is older than the configured maximum age; callers should then fall
+    back to Notion's remote search.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age_seconds: Optional[float] = None):
+        if path is None:
+            path = os.getenv("NOTION_INDEX_PATH", DEFAULT_INDEX_PATH)
+        if max_age_seconds is None:
+            max_age_seconds = float(os.getenv("NOTION_INDEX_MAX_AGE", "3600"))
+
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.RLock()
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                rowid INTEGER PRIMARY KEY,
+                page_id TEXT UNIQUE NOT NULL,
+                url TEXT NOT NULL DEFAULT '',
+                object_type TEXT NOT NULL DEFAULT 'page',
+                last_edited TEXT NOT NULL DEFAULT ''
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                title,
+                body,
+                tokenize = 'porter unicode61 remove_diacritics 2'
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._db.commit()
+
+    def upsert(
+        self,
+        page_id: str,
+        title: str,
+        body: Optional[str] = None,
+        url: str = "",
+        object_type: str = "page",
+        last_edited: str = ""
+    ) -> None:
+        """
+        Add or replace a page in the index
+
+        Args:
+            page_id: The Notion page or database ID
+            title: The page title
+            body: The page's block text; None keeps any previously indexed body
+            url: The page URL
+            object_type: "page" or "database"
+            last_edited: The page's last_edited_time
+        """
+        with self._lock:
+            row = self._db.execute("SELECT rowid FROM documents WHERE page_id = ?", (page_id,)).fetchone()
+            if row is None:
+                cursor = self._db.execute(
+                    "INSERT INTO documents (page_id, url, object_type, last_edited) VALUES (?, ?, ?, ?)",
+                    (page_id, url, object_type, last_edited)
+                )
+                rowid = cursor.lastrowid
+            else:
+                rowid = row[0]
+                self._db.execute(
+                    "UPDATE documents SET url = ?, object_type = ?, last_edited = ? WHERE rowid = ?",
+                    (url, object_type, last_edited, rowid)
+                )
+                if body is None:
+                    existing = self._db.execute("SELECT body FROM documents_fts WHERE rowid = ?", (rowid,)).fetchone()
+                    body = existing[0] if existing else ""
+                self._db.execute("DELETE FROM documents_fts WHERE rowid = ?", (rowid,))
+
+            self._db.execute(
+                "INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)",
+                (rowid, title, body or "")
+            )
+            self._db.commit()
+
+    def remove(self, page_id: str) -> None:
+        """Remove a page from the index"""
+        with self._lock:
+            row = self._db.execute("SELECT rowid FROM documents WHERE page_id = ?", (page_id,)).fetchone()
+            if row is not None:
+                self._db.execute("DELETE FROM documents_fts WHERE rowid = ?", (row[0],))
+                self._db.execute("DELETE FROM documents WHERE rowid = ?", (row[0],))
+                self._db.commit()
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search indexed titles and body text
+
+        Args:
+            query: Free-text query; any matching term counts, BM25 ranks the results
+            limit: Maximum number of results
+
+        Returns:
+            Matching pages, best first
+        """
+        terms = [term for term in re.findall(r"\w+", query.lower()) if term not in STOPWORDS]
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+
+        with self._lock:
+            rows = self._db.execute(
+                f"""
+                SELECT d.page_id, d.url, d.object_type, d.last_edited, f.title,
+                       snippet(documents_fts, 1, '', '', '…', 16),
+                       bm25(documents_fts, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score
+                FROM documents_fts AS f
+                JOIN documents AS d ON d.rowid = f.rowid
+                WHERE documents_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+                """,
+                (match, limit)
+            ).fetchall()
+
+        return [
+            {
+                "title": title,
+                "type": object_type,
+                "url": url,
+                "id": page_id,
+                "last_edited": last_edited,
+                "snippet": snippet
+            }
+            for page_id, url, object_type, last_edited, title, snippet, _ in rows
+        ]
+
+    def count(self) -> int:
+        """Number of indexed pages"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def mark_synced(self, synced_at: Optional[float] = None) -> None:
+        """Record that the index reflects the workspace as of synced_at"""
+        self.set_meta("last_synced", str(synced_at if synced_at is not None else time.time()))
+
+    def last_synced(self) -> Optional[float]:
+        """When the index was last fully brought up to date"""
+        value = self.get_meta("last_synced")
+        return float(value) if value is not None else None
+
+    def is_stale(self) -> bool:
+        """Whether results may be missing recent workspace changes"""
+        last_synced = self.last_synced()
+        return last_synced is None or time.time() - last_synced > self.max_age_seconds
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Read a value from the index metadata table"""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        """Write a value to the index metadata table"""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._db.commit()
+
+
+_search_index: Optional[SearchIndex] = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Get the process-wide search index"""
+    global _search_index
+    with _search_index_lock:
+        if _search_index is None:
+            _search_index = SearchIndex()
+        return _search_index
@@ -0,0 +1,251 @@
+"""
+Streaming of final-answer tokens and intermediate steps while a question is answered
+"""
+import queue
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+from uuid import UUID
+
+from crewai.events.event_bus import crewai_event_bus
+from crewai.events.types.llm_events import LLMCallCompletedEvent, LLMCallFailedEvent, LLMStreamChunkEvent
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .tool_output import get_reference_registry
+
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+# Agent replies starting with these are ReAct reasoning, not the answer itself
+REACT_PREFIXES = ("Thought", "Action", FINAL_ANSWER_MARKER)
+
+# Events are {"type": "step" | "token", "content": str}, and finally
+# {"type": "done", "response": <the answer_question response>}
+StreamEvent = Dict[str, Any]
+
+
+class StreamSink:
+    """
+    Queue of stream events produced while one question is answered
+
+    Tokens are only forwarded while stream_tokens is set, so a crew can
+    hold them back until its last task starts. Short references such as
+    [p3] are expanded to links before tokens are emitted.
+    """
+
+    def __init__(self):
+        self.stream_tokens = True
+        self.tokens_emitted = False
+        self._events: "queue.Queue[StreamEvent]" = queue.Queue()
+        self._pending = ""
+        self._tasks_total = 0
+        self._tasks_done = 0
+
+    def step(self, content: str) -> None:
+        """Report an intermediate step"""
+        self._events.put({"type": "step", "content": content})
+
+    def token(self, content: str) -> None:
+        """Forward final-answer text, expanding references once they are complete"""
+        if not self.stream_tokens:
+            return
+        self._pending += content
+        # Hold back a reference that may still be split across tokens
+        split = self._pending.rfind("[")
+        if split == -1 or "]" in self._pending[split:]:
+            split = len(self._pending)
+        ready, self._pending = self._pending[:split], self._pending[split:]
+        if not self.tokens_emitted:
+            ready = ready.lstrip()
+        if ready:
+            self._emit(ready)
+
+    def begin_crew(self, task_count: int) -> None:
+        """Only stream tokens of the last of task_count crew tasks"""
+        self._tasks_total = task_count
+        self._tasks_done = 0
+        self.stream_tokens = task_count <= 1
+
+    def task_done(self, output: Any) -> None:
+        """Record a finished crew task"""
+        self._tasks_done += 1
+        self.step(f"✅ {getattr(output, 'agent', 'Agent')} finished")
+        if self._tasks_done >= self._tasks_total - 1:
+            self.stream_tokens = True
+
+    def close(self, response: Dict[str, Any]) -> None:
+        """Finish the stream with the final response"""
+        if self._pending:
+            self._emit(self._pending)
+            self._pending = ""
+        # Cached or remote answers arrive without tokens; send them whole
+        if not self.tokens_emitted and response.get("success"):
+            self._emit(response.get("answer", ""), expand=False)
+        self._events.put({"type": "done", "response": response})
+
+    def events(self) -> Iterator[StreamEvent]:
+        """Yield events until the stream is closed"""
+        while True:
+            event = self._events.get()
+            yield event
+            if event["type"] == "done":
+                return
+
+    def _emit(self, text: str, expand: bool = True) -> None:
+        if expand:
+            text = get_reference_registry().expand(text)
+        self.tokens_emitted = True
+        self._events.put({"type": "token", "content": text})
+
+
+_stream_sink: ContextVar[Optional[StreamSink]] = ContextVar("stream_sink", default=None)
+
+
+def set_stream_sink(sink: Optional[StreamSink]) -> None:
+    """Send stream events of this context to sink"""
+    _stream_sink.set(sink)
+
+
+def get_stream_sink() -> Optional[StreamSink]:
+    """Get the sink of the question being answered in this context, if streaming"""
+    return _stream_sink.get()
+
+
+def describe_step(step: Any) -> Optional[str]:
+    """Summarize an agent step for display"""
+    tool = getattr(step, "tool", None)
+    if tool:
+        tool_input = str(getattr(step, "tool_input", "")).replace("\n", " ")
+        return f"🔧 {tool}: {tool_input[:120]}"
+    thought = str(getattr(step, "thought", "") or "").strip()
+    if thought:
+        return f"💭 {thought[:160]}"
+    return None
+
+
+def emit_step(step: Any) -> None:
+    """Crew step_callback forwarding agent steps to the active sink"""
+    sink = get_stream_sink()
+    description = describe_step(step)
+    if sink is not None and description:
+        sink.step(description)
+
+
+def emit_task_done(output: Any) -> None:
+    """Crew task_callback forwarding task completion to the active sink"""
+    sink = get_stream_sink()
+    if sink is not None:
+        sink.task_done(output)
+
+
+class CrewStreamForwarder:
+    """
+    crewai event handler forwarding the answer text streamed by crew agents
+
+    Agents call tools natively and reply with the answer itself; when they
+    fall back to the Thought/Action format only the text after the
+    final-answer marker is forwarded. Stream chunk events are handled in
+    the calling thread, so tokens go to the sink of that context and are
+    dropped when nobody is streaming.
+    """
+
+    def __init__(self):
+        self._buffers: Dict[str, str] = {}
+        self._answering: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def on_chunk(self, source: Any, event: LLMStreamChunkEvent) -> None:
+        sink = get_stream_sink()
+        if sink is None or event.tool_call is not None or not event.chunk:
+            return
+
+        with self._lock:
+            if self._answering.get(event.call_id):
+                text = event.chunk
+            else:
+                buffer = self._buffers.get(event.call_id, "") + event.chunk
+                head = buffer.lstrip()
+                # Wait until the reply can be told apart from ReAct reasoning
+                if any(prefix.startswith(head) for prefix in REACT_PREFIXES):
+                    self._buffers[event.call_id] = buffer
+                    return
+                if head.startswith(REACT_PREFIXES):
+                    marker = buffer.find(FINAL_ANSWER_MARKER)
+                    if marker == -1:
+                        self._buffers[event.call_id] = buffer
+                        return
+                    text = buffer[marker + len(FINAL_ANSWER_MARKER):].lstrip()
+                else:
+                    text = head
+                self._answering[event.call_id] = True
+                self._buffers.pop(event.call_id, None)
+
+        if text:
+            sink.token(text)
+
+    def on_call_end(self, source: Any, event: Any) -> None:
+        with self._lock:
+            self._buffers.pop(event.call_id, None)
+            self._answering.pop(event.call_id, None)
+
+    def register(self) -> None:
+        """Subscribe to crewai's LLM events"""
+        crewai_event_bus.on(LLMStreamChunkEvent)(self.on_chunk)
+        crewai_event_bus.on(LLMCallCompletedEvent)(self.on_call_end)
+        crewai_event_bus.on(LLMCallFailedEvent)(self.on_call_end)
+
+
+_crew_stream_forwarder = CrewStreamForwarder()
+_crew_stream_forwarder.register()
+
+
+class FinalAnswerStreamHandler(BaseCallbackHandler):
+    """
+    LangChain LLM callback forwarding streamed tokens that follow "Final Answer:"
+
+    Agents reason in a Thought/Action format and only the text after the
+    final-answer marker is meant for the user. Tokens go to the sink of the
+    calling context and are dropped when nobody is streaming.
+    """
+
+    def __init__(self):
+        self._buffers: Dict[UUID, str] = {}
+        self._answering: Dict[UUID, bool] = {}
+        self._lock = threading.Lock()
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        sink = get_stream_sink()
+        if sink is None:
+            return
+
+        with self._lock:
+            if self._answering.get(run_id):
+                text = token
+            else:
+                buffer = self._buffers.get(run_id, "") + token
+                marker = buffer.find(FINAL_ANSWER_MARKER)
+                if marker == -1:
+                    self._buffers[run_id] = buffer
+                    return
+                self._answering[run_id] = True
+                self._buffers.pop(run_id, None)
+                text = buffer[marker + len(FINAL_ANSWER_MARKER):].lstrip()
+
+        if text:
+            sink.token(text)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._buffers.pop(run_id, None)
+            self._answering.pop(run_id, None)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.on_llm_end(None, run_id=run_id)
+
+
+_stream_handler = FinalAnswerStreamHandler()
+
+
+def get_stream_handler() -> FinalAnswerStreamHandler:
+    """Get the process-wide token streaming callback for LangChain models"""
+    return _stream_handler
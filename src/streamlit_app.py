@@ -4,12 +4,12 @@ Streamlit interface for the CrewAI Notion Chatbot
 import streamlit as st
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-# Add the src directory to the Python path
-sys.path.append(str(Path(__file__).parent))
+# Make the src package importable; streamlit runs this file as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from crews import NotionChatbot
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -71,9 +71,30 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'chatbot' not in st.session_state:
-    st.session_state.chatbot = NotionChatbot()
+@st.cache_resource
+def get_startup_executor():
+    """Thread pool that builds chatbots without blocking the first render"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="chatbot-loader")
+
+
+def create_chatbot():
+    """Import the crew modules and build a chatbot; runs in the background"""
+    from src.crews import NotionChatbot
+    return NotionChatbot()
+
+
+def get_chatbot():
+    """Get this session's chatbot, waiting for the background build if needed"""
+    future = st.session_state.chatbot_future
+    if not future.done():
+        with st.spinner("⏳ Starting the chatbot..."):
+            return future.result()
+    return future.result()
+
+
+# Initialize session state; the chatbot is built while the page renders
+if 'chatbot_future' not in st.session_state:
+    st.session_state.chatbot_future = get_startup_executor().submit(create_chatbot)
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'mcp_status' not in st.session_state:
@@ -108,10 +129,13 @@ with st.sidebar:
     for var, status in env_status.items():
         st.write(f"**{required_vars[var]}**: {status}")
     
+    if not st.session_state.chatbot_future.done():
+        st.info("⏳ Chatbot is starting in the background")
+    
     # MCP Status
     st.subheader("MCP Connection Status")
     if st.button("Check MCP Status"):
-        st.session_state.mcp_status = st.session_state.chatbot.get_mcp_status()
+        st.session_state.mcp_status = get_chatbot().get_mcp_status(refresh=True)
     
     if st.session_state.mcp_status:
         if st.session_state.mcp_status['connected']:
@@ -131,7 +155,7 @@ with st.sidebar:
     # Clear conversation
     if st.button("Clear Conversation"):
         st.session_state.messages = []
-        st.session_state.chatbot.clear_conversation_history()
+        get_chatbot().clear_conversation_history()
         st.rerun()
 
 # Main chat interface
@@ -152,33 +176,46 @@ if prompt := st.chat_input("Ask a question about your Notion workspace..."):
     # Display user message
     st.markdown(f'<div class="chat-message user-message"><strong>You:</strong> {prompt}</div>', unsafe_allow_html=True)
     
-    # Get response from chatbot
-    with st.spinner("🤔 Thinking..."):
-        try:
-            response = st.session_state.chatbot.answer_question(prompt, use_mcp=use_mcp)
-            
-            if response['success']:
-                answer = response['answer']
-                source = response['source']
-                
-                # Add assistant response to conversation
-                st.session_state.messages.append({"role": "assistant", "content": answer})
-                
-                # Display assistant response
-                st.markdown(f'<div class="chat-message assistant-message"><strong>Assistant:</strong> {answer}</div>', unsafe_allow_html=True)
-                
-                # Show source information
-                if source == "mcp_crew":
-                    st.markdown(f'<div class="status-box status-success">✅ Response from MCP Crew (ID: {response.get("execution_id", "unknown")})</div>', unsafe_allow_html=True)
+    # Stream the response from the chatbot
+    try:
+        chatbot = get_chatbot()
+        steps = st.status("🤔 Thinking...")
+        response = {}
+        
+        def answer_tokens():
+            for event in chatbot.stream_answer(prompt, use_mcp=use_mcp):
+                if event["type"] == "step":
+                    steps.write(event["content"])
+                elif event["type"] == "token":
+                    yield event["content"]
                 else:
-                    st.markdown(f'<div class="status-box status-warning">⚠️ Response from Local Crew (MCP unavailable)</div>', unsafe_allow_html=True)
-                
+                    response.update(event["response"])
+        
+        st.markdown("**Assistant:**")
+        st.write_stream(answer_tokens())
+        steps.update(label="Done", state="complete")
+        
+        if response.get('success'):
+            answer = response['answer']
+            source = response['source']
+            
+            # Add assistant response to conversation
+            st.session_state.messages.append({"role": "assistant", "content": answer})
+            
+            # Show source information
+            if source == "mcp_crew":
+                st.markdown(f'<div class="status-box status-success">✅ Response from MCP Crew (ID: {response.get("execution_id", "unknown")})</div>', unsafe_allow_html=True)
+            elif source == "local_fast_path":
+                st.markdown(f'<div class="status-box status-success">⚡ Fast path for a {response.get("route", "lookup")} question</div>', unsafe_allow_html=True)
             else:
-                error_msg = response.get('error', 'Unknown error')
-                st.error(f"❌ Error: {error_msg}")
-                
-        except Exception as e:
-            st.error(f"❌ Unexpected error: {str(e)}")
+                st.markdown(f'<div class="status-box status-warning">⚠️ Response from Local Crew (MCP unavailable)</div>', unsafe_allow_html=True)
+            
+        else:
+            error_msg = response.get('error', 'Unknown error')
+            st.error(f"❌ Error: {error_msg}")
+            
+    except Exception as e:
+        st.error(f"❌ Unexpected error: {str(e)}")
     
     # Rerun to update the display
     st.rerun()
@@ -244,6 +281,15 @@ if st.checkbox("Show Debug Information"):
         else:
             st.write(f"- {var}: Not configured")
     
+    st.write("**LLM Response Cache:**")
+    from src.llm_cache import get_llm_cache
+    llm_cache = get_llm_cache()
+    st.json(llm_cache.stats() if llm_cache else {"enabled": False})
+    
+    st.write("**Embedding Cache:**")
+    from src.embedding_cache import embedding_cache_enabled, get_embedding_cache
+    st.json(get_embedding_cache().stats() if embedding_cache_enabled() else {"enabled": False})
+    
     st.write("**Conversation History:**")
-    history = st.session_state.chatbot.get_conversation_history()
+    history = get_chatbot().get_conversation_history()
     st.json(history)
@@ -0,0 +1,231 @@
+"""
+Compact, token-efficient serialization of Notion tool results
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+
+logger = logging.getLogger(__name__)
+
+_REFERENCE_PATTERN = re.compile(r"\[([pd]\d+)\]")
+
+DEFAULT_MAX_REFERENCES = 5000
+
+
+class ReferenceRegistry:
+    """
+    Short reference ids (p1, d2, ...) for Notion pages and databases
+
+    Tool output mentions pages by reference instead of repeating 36-character
+    UUIDs and long URLs. Tools accept references wherever they take an id,
+    and final answers have references expanded back to links.
+
+    At most max_refs references are kept; the least recently used are
+    evicted. Numbers are never reused, so an evicted reference stops
+    resolving instead of pointing at another page.
+    """
+
+    def __init__(self, max_refs: Optional[int] = None):
+        self.max_refs = max_refs if max_refs is not None else int(os.getenv("NOTION_MAX_REFERENCES", str(DEFAULT_MAX_REFERENCES)))
+        self._refs: Dict[str, str] = {}
+        self._targets: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._counters = {"p": 0, "d": 0}
+        self._lock = threading.Lock()
+
+    def register(self, notion_id: str, url: str = "", object_type: str = "page", title: str = "") -> str:
+        """Get the reference for a Notion object, creating one if needed"""
+        if not notion_id:
+            return ""
+        with self._lock:
+            ref = self._refs.get(notion_id)
+            if ref is None:
+                prefix = "d" if object_type == "database" else "p"
+                self._counters[prefix] += 1
+                ref = f"{prefix}{self._counters[prefix]}"
+                self._refs[notion_id] = ref
+                self._targets[ref] = {"id": notion_id, "url": url, "title": title}
+                while len(self._targets) > max(1, self.max_refs):
+                    _, evicted = self._targets.popitem(last=False)
+                    del self._refs[evicted["id"]]
+            else:
+                target = self._targets[ref]
+                target["url"] = url or target["url"]
+                target["title"] = title or target["title"]
+                self._targets.move_to_end(ref)
+            return ref
+
+    def resolve(self, value: str) -> str:
+        """Map a reference (or an id passed through unchanged) to a Notion id"""
+        value = (value or "").strip().strip("[]")
+        with self._lock:
+            target = self._targets.get(value)
+            if target:
+                self._targets.move_to_end(value)
+        return target["id"] if target else value
+
+    def lookup(self, ref: str) -> Optional[Dict[str, str]]:
+        """Get the id, URL and title behind a reference"""
+        with self._lock:
+            target = self._targets.get(ref)
+            if target:
+                self._targets.move_to_end(ref)
+            return dict(target) if target else None
+
+    def expand(self, text: str) -> str:
+        """Replace [p1]-style references in text with markdown links"""
+        def replace(match: "re.Match") -> str:
+            target = self.lookup(match.group(1))
+            if not target or not target["url"]:
+                return match.group(0)
+            return f"[{target['title'] or match.group(1)}]({target['url']})"
+
+        return _REFERENCE_PATTERN.sub(replace, text)
+
+
+_references = ReferenceRegistry()
+
+
+def get_reference_registry() -> ReferenceRegistry:
+    """Get the process-wide reference registry"""
+    return _references
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens the way OpenAI chat models do, estimating if tiktoken is missing"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class ToolOutputStats:
+    """Per-tool call and token counters"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tool_name: str, tokens: int) -> None:
+        """Add one tool call and its output tokens"""
+        with self._lock:
+            stats = self._stats.setdefault(tool_name, {"calls": 0, "tokens": 0})
+            stats["calls"] += 1
+            stats["tokens"] += tokens
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Copy of the counters per tool"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        """Clear all counters"""
+        with self._lock:
+            self._stats.clear()
+
+
+_stats = ToolOutputStats()
+
+
+def get_tool_output_stats() -> ToolOutputStats:
+    """Get the process-wide tool output counters"""
+    return _stats
+
+
+def report(tool_name: str, text: str) -> str:
+    """Count and record the tokens a tool result adds to the LLM context"""
+    tokens = count_tokens(text)
+    _stats.record(tool_name, tokens)
+    logger.info("%s returned %d tokens", tool_name, tokens)
+    return text
+
+
+def short_date(timestamp: Optional[str]) -> str:
+    """Trim an ISO timestamp to its date"""
+    return (timestamp or "")[:10]
+
+
+def format_value(value: Any) -> str:
+    """Render one cell value compactly"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (list, tuple)):
+        return ", ".join(format_value(item) for item in value)
+    return str(value).replace("\n", " ").replace("|", "/")
+
+
+def format_table(columns: Sequence[str], rows: List[Dict[str, Any]], hoist_constants: bool = True) -> str:
+    """
+    Render rows as a header line plus one pipe-separated line per row
+
+    Columns holding the same value in every row are printed once above the
+    table instead of being repeated, and empty columns are dropped.
+    """
+    columns = [column for column in columns if any(format_value(row.get(column)) for row in rows)]
+    lines = []
+
+    if hoist_constants and len(rows) > 1:
+        constants = [
+            column for column in columns
+            if len({format_value(row.get(column)) for row in rows}) == 1
+        ]
+        if constants:
+            lines.append("All rows: " + "; ".join(f"{column}={format_value(rows[0].get(column))}" for column in constants))
+            columns = [column for column in columns if column not in constants]
+
+    lines.append(" | ".join(columns))
+    for row in rows:
+        lines.append(" | ".join(format_value(row.get(column)) for column in columns))
+    return "\n".join(lines)
+
+
+BLOCK_PREFIXES = {
+    "heading_1": "# ",
+    "heading_2": "## ",
+    "heading_3": "### ",
+    "bulleted_list_item": "- ",
+    "numbered_list_item": "1. ",
+    "toggle": "> ",
+    "quote": "> ",
+    "callout": "! ",
+    "code": "`"
+}
+
+
+def format_block(block: Dict[str, Any]) -> str:
+    """Render an extracted block as one markdown-like line"""
+    block_type = block.get("type", "")
+    text = block.get("text", "")
+    indent = "  " * block.get("depth", 0)
+
+    if block_type == "to_do":
+        return f"{indent}[{'x' if block.get('checked') else ' '}] {text}"
+    if block_type == "code":
+        return f"{indent}`{text}`"
+    return indent + BLOCK_PREFIXES.get(block_type, "") + text
+
+
+def format_page(ref: str, content: Dict[str, Any], blocks: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Render a page header followed by its blocks"""
+    lines = [f"[{ref}] {content.get('title', 'Untitled')} (edited {short_date(content.get('last_edited'))}) {content.get('url', '')}".rstrip()]
+    lines.extend(format_block(block) for block in (blocks if blocks is not None else content.get("blocks", [])))
+    if content.get("truncated"):
+        lines.append("(page truncated at the block limit)")
+    return "\n".join(lines)
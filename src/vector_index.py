@@ -0,0 +1,253 @@
+"""
+Chunked embedding index over Notion page content for semantic retrieval
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+DEFAULT_VECTOR_INDEX_DIR = ".cache/vector_index"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_CHUNK_CHARS = 1200
+
+
+def chunk_page_content(content: Dict[str, Any], max_chars: int = DEFAULT_CHUNK_CHARS) -> List[str]:
+    """
+    Split extracted page blocks into passages of roughly max_chars
+
+    Chunks never span a heading, and each one is prefixed with the page
+    title and the headings above it so it can be understood on its own.
+    """
+    title = content.get("title", "Untitled")
+    headings: Dict[int, str] = {}
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    def flush() -> None:
+        nonlocal current, size
+        if current:
+            path = " > ".join([title] + [headings[level] for level in sorted(headings)])
+            chunks.append(path + "\n" + "\n".join(current))
+        current = []
+        size = 0
+
+    for block in content.get("blocks", []):
+        text = block.get("text", "").strip()
+        if not text:
+            continue
+
+        block_type = block.get("type", "")
+        if block_type.startswith("heading_"):
+            flush()
+            level = int(block_type[-1])
+            headings = {lvl: heading for lvl, heading in headings.items() if lvl < level}
+            headings[level] = text
+            continue
+
+        # Very long blocks are split on their own
+        while len(text) > max_chars:
+            flush()
+            current.append(text[:max_chars])
+            flush()
+            text = text[max_chars:]
+
+        if size + len(text) > max_chars:
+            flush()
+        current.append(text)
+        size += len(text)
+
+    flush()
+    return chunks
+
+
+def get_embedder():
+    """Get the embedding model used for passages and queries, behind the embedding cache"""
+    from langchain_openai import OpenAIEmbeddings
+
+    from .embedding_cache import CachedEmbeddings, embedding_cache_enabled
+
+    model = os.getenv("NOTION_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+    embeddings = OpenAIEmbeddings(model=model, openai_api_key=os.getenv("OPENAI_API_KEY"))
+    # Unchanged passages of re-synced pages and repeated queries are not embedded again
+    return CachedEmbeddings(embeddings, model) if embedding_cache_enabled() else embeddings
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class VectorIndex:
+    """
+    Brute-force cosine similarity index stored as a float32 matrix
+
+    Embeddings are kept L2-normalized in embeddings.npy and memory-mapped on
+    load, so opening a large index is instant and only touched pages of the
+    matrix are read. Passage metadata lives alongside in chunks.json.
+
+    Upserts append the new rows and tombstone the page's old ones, so a
+    sync touching many pages never copies the matrix; save() compacts the
+    live rows into a new file once per run.
+    """
+
+    def __init__(self, directory: Optional[str] = None, embedder=None):
+        self.directory = Path(directory or os.getenv("NOTION_VECTOR_INDEX_DIR", DEFAULT_VECTOR_INDEX_DIR))
+        self._embedder = embedder
+        self._lock = threading.RLock()
+        self._dirty = False
+
+        # Rows of the saved matrix, then rows appended since; live[i] is 0 for replaced rows
+        self.embeddings: Optional[np.ndarray] = None
+        self.chunks: List[Dict[str, Any]] = []
+        self.live = bytearray()
+        self._appended: List[np.ndarray] = []
+        self._page_rows: Dict[str, List[int]] = {}
+        self.load()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    @property
+    def embeddings_path(self) -> Path:
+        return self.directory / "embeddings.npy"
+
+    @property
+    def chunks_path(self) -> Path:
+        return self.directory / "chunks.json"
+
+    def load(self) -> None:
+        """Load the index from disk, memory-mapping the embedding matrix"""
+        with self._lock:
+            if self.embeddings_path.exists() and self.chunks_path.exists():
+                self.embeddings = np.load(self.embeddings_path, mmap_mode="r")
+                with open(self.chunks_path, encoding="utf-8") as f:
+                    self.chunks = json.load(f)
+            else:
+                self.embeddings = None
+                self.chunks = []
+            self.live = bytearray(b"\x01" * len(self.chunks))
+            self._appended = []
+            self._page_rows = {}
+            for row, chunk in enumerate(self.chunks):
+                self._page_rows.setdefault(chunk["page_id"], []).append(row)
+            self._dirty = False
+
+    def save(self) -> None:
+        """Write the index to disk if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Compact: only live rows are written
+            live = np.frombuffer(self.live, dtype=np.int8).astype(bool)
+            blocks = self._blocks()
+            embeddings = np.vstack(blocks)[live] if blocks else np.zeros((0, 0), dtype=np.float32)
+            chunks = [chunk for chunk, alive in zip(self.chunks, self.live) if alive]
+
+            tmp_embeddings = self.embeddings_path.with_suffix(".tmp.npy")
+            np.save(tmp_embeddings, np.ascontiguousarray(embeddings, dtype=np.float32))
+            tmp_chunks = self.chunks_path.with_suffix(".tmp")
+            with open(tmp_chunks, "w", encoding="utf-8") as f:
+                json.dump(chunks, f, ensure_ascii=False)
+
+            # Release the memory map before replacing the file underneath it
+            self.embeddings = None
+            os.replace(tmp_embeddings, self.embeddings_path)
+            os.replace(tmp_chunks, self.chunks_path)
+            self._dirty = False
+            self.load()
+
+    def __len__(self) -> int:
+        return self.live.count(1)
+
+    def _blocks(self) -> List[np.ndarray]:
+        """The saved matrix and the appended rows, in row order"""
+        saved = [self.embeddings] if self.embeddings is not None and len(self.embeddings) else []
+        return saved + self._appended
+
+    def upsert_page(
+        self,
+        page_id: str,
+        title: str,
+        url: str,
+        passages: List[str],
+        embeddings: np.ndarray
+    ) -> None:
+        """Replace all passages of a page"""
+        with self._lock:
+            for row in self._page_rows.pop(page_id, []):
+                self.live[row] = 0
+
+            if len(passages):
+                start = len(self.chunks)
+                self._appended.append(_normalize(np.asarray(embeddings, dtype=np.float32)))
+                self.chunks.extend({"page_id": page_id, "title": title, "url": url, "text": text} for text in passages)
+                self.live.extend(b"\x01" * len(passages))
+                self._page_rows[page_id] = list(range(start, len(self.chunks)))
+
+            self._dirty = True
+
+    def remove_page(self, page_id: str) -> None:
+        """Drop all passages of a page"""
+        self.upsert_page(page_id, "", "", [], np.zeros((0, 0), dtype=np.float32))
+
+    def index_page(self, page: Dict[str, Any], content: Dict[str, Any]) -> None:
+        """Chunk and embed an extracted page; usable as a WorkspaceSync listener"""
+        passages = chunk_page_content(content)
+        embeddings = np.asarray(self.embedder.embed_documents(passages), dtype=np.float32) if passages else None
+        self.upsert_page(page["id"], content.get("title", ""), content.get("url", ""), passages, embeddings)
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find the passages most similar to a query
+
+        Args:
+            query: The natural-language query
+            top_k: Number of passages to return
+
+        Returns:
+            Passages with their page title, URL and cosine similarity, best first
+        """
+        if top_k <= 0:
+            return []
+        with self._lock:
+            live = np.frombuffer(self.live, dtype=np.int8).astype(bool)
+            if not live.any():
+                return []
+            if len(self._appended) > 1:
+                self._appended = [np.vstack(self._appended)]
+            blocks = self._blocks()
+            chunks = self.chunks
+
+        query_vector = _normalize(np.asarray(self.embedder.embed_query(query), dtype=np.float32))
+        scores = np.concatenate([block @ query_vector for block in blocks])
+        scores[~live] = -np.inf
+
+        top_k = min(top_k, int(live.sum()))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+
+        return [dict(chunks[i], score=round(float(scores[i]), 4)) for i in best]
+
+
+_vector_index: Optional[VectorIndex] = None
+_vector_index_lock = threading.Lock()
+
+
+def get_vector_index() -> VectorIndex:
+    """Get the process-wide vector index"""
+    global _vector_index
+    with _vector_index_lock:
+        if _vector_index is None:
+            _vector_index = VectorIndex()
+        return _vector_index
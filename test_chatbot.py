@@ -5,12 +5,158 @@ import os
 import sys
 from pathlib import Path
 
-# Add the src directory to the Python path
-sys.path.append(str(Path(__file__).parent / "src"))
+# Make the src package importable wherever the script is run from
+sys.path.insert(0, str(Path(__file__).parent))
 
+from crewai.tools import BaseTool
 from dotenv import load_dotenv
-from crews import NotionChatbot
-from mcp_client import get_mcp_client
+from src.crews import NotionChatbot
+from src.mcp_client import get_mcp_client
+
+def start_fake_openai(answers):
+    """Serve canned chat completions on localhost; returns the base URL, the requests received and the server"""
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    requests = []
+    
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests.append(body)
+            answer = answers[min(len(requests), len(answers)) - 1]
+            chunk = {"id": f"chatcmpl-{len(requests)}", "created": 0, "model": body["model"]}
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                words = answer.split(" ")
+                for i, word in enumerate(words):
+                    delta = {"role": "assistant", "content": word if i == 0 else " " + word}
+                    event = {**chunk, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                event = {**chunk, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\ndata: [DONE]\n\n".encode())
+            else:
+                data = json.dumps({
+                    **chunk,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/v1", requests, server
+
+class StubFastPathLLM:
+    """Chat model stub answering with the question it was asked"""
+    
+    def invoke(self, messages):
+        from langchain_core.messages import AIMessage
+        question = messages[-1][1].rsplit("Question: ", 1)[-1]
+        return AIMessage(content=f"Final Answer: Answer to {question}")
+    
+    async def ainvoke(self, messages):
+        import asyncio
+        await asyncio.sleep(0.05)
+        return self.invoke(messages)
+
+class StubSemanticSearch(BaseTool):
+    """notion_semantic_search stub returning one passage about the query"""
+    
+    name: str = "notion_semantic_search"
+    description: str = "Pull passages about a query"
+    vector_index: list = ["passage"]
+    calls: list = []
+    
+    def _run(self, query, top_k=5):
+        self.calls.append(query)
+        return f"[p1] Notes about {query}"
+    
+    async def _arun(self, query, top_k=5):
+        import asyncio
+        await asyncio.sleep(0.05)
+        return self._run(query, top_k)
+
+class StubbedChatbot(NotionChatbot):
+    """NotionChatbot answering lookups on the fast path from stubbed tools, without MCP"""
+    
+    def __init__(self):
+        from src.router import FastPathAnswerer
+        super().__init__()
+        self.agent_pool.tools["notion_semantic_search"] = StubSemanticSearch()
+        self.fast_path = FastPathAnswerer(self.agent_pool.tools, StubFastPathLLM())
+    
+    def get_mcp_status(self, refresh=False):
+        return {"connected": False, "error": "MCP is not used with stubbed tools"}
+
+def stubbed_environment():
+    """Environment in which StubbedChatbot can be built offline and routes every question to the fast path"""
+    from unittest import mock
+    return mock.patch.dict(os.environ, {
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "sk-test",
+        "NOTION_TOKEN": os.getenv("NOTION_TOKEN") or "secret_test",
+        "QUERY_ROUTER": "lookup",
+        "NOTION_SYNC_INTERVAL": "0"
+    })
+
+def mock_notion_client(database_rows):
+    """A real notion-client Client whose HTTP requests are answered by a fake database"""
+    import json
+    import httpx
+    from notion_client import Client
+    
+    requests = []
+    
+    def handle(request):
+        requests.append((request.method, request.url.path))
+        if request.url.path == "/v1/databases/db-1":
+            body = {"object": "database", "id": "db-1", "data_sources": [{"id": "ds-1", "name": "Tasks"}]}
+        elif request.url.path == "/v1/data_sources/ds-1" and request.method == "GET":
+            body = {"object": "data_source", "id": "ds-1", "properties": {
+                "Name": {"type": "title"},
+                "Status": {"type": "status"},
+                "Points": {"type": "number"}
+            }}
+        elif request.url.path == "/v1/data_sources/ds-1/query":
+            start = int(json.loads(request.content or b"{}").get("start_cursor") or 0)
+            has_more = start + 2 < len(database_rows)
+            body = {
+                "object": "list",
+                "results": database_rows[start:start + 2],
+                "has_more": has_more,
+                "next_cursor": str(start + 2) if has_more else None
+            }
+        else:
+            return httpx.Response(404, json={"object": "error", "status": 404, "code": "object_not_found", "message": "Not found"})
+        return httpx.Response(200, json=body)
+    
+    client = Client(auth="secret_test", client=httpx.Client(transport=httpx.MockTransport(handle)))
+    return client, requests
+
+def database_row(i, status, points):
+    """A Notion database row as returned by a data source query"""
+    return {
+        "object": "page",
+        "id": f"row-{i}",
+        "url": f"https://notion.so/row-{i}",
+        "last_edited_time": f"2024-01-0{i}T00:00:00.000Z",
+        "properties": {
+            "Name": {"type": "title", "title": [{"plain_text": f"Task {i}"}]},
+            "Status": {"type": "status", "status": {"name": status}},
+            "Points": {"type": "number", "number": points}
+        }
+    }
 
 def test_environment_setup():
     """Test that environment variables are properly configured"""
@@ -97,7 +243,7 @@ def test_notion_tools():
         return True
     
     try:
-        from notion_tools import NotionSearchTool, NotionPageRetrieverTool, NotionDatabaseQueryTool
+        from src.notion_tools import NotionSearchTool, NotionPageRetrieverTool, NotionDatabaseQueryTool
         
         print("  🔍 Testing NotionSearchTool...")
         search_tool = NotionSearchTool()
@@ -120,14 +266,1337 @@ def test_notion_tools():
         print(f"  ❌ Notion Tools Error: {str(e)}")
         return False
 
+def test_notion_rate_limiting():
+    """Test the Notion token bucket and 429 retries of the rate-limited transport"""
+    print("\n🧪 Testing Notion Rate Limiting...")
+    
+    try:
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        import httpx
+        from src.notion_registry import RateLimitedTransport, TokenBucket
+        
+        class FakeClock:
+            def __init__(self):
+                self.now = 0.0
+                self.sleeps = []
+            
+            def __call__(self):
+                return self.now
+            
+            def sleep(self, seconds):
+                self.sleeps.append(round(seconds, 6))
+                self.now += seconds
+        
+        clock = FakeClock()
+        bucket = TokenBucket(rate=3.0, capacity=3, clock=clock, sleep=clock.sleep)
+        for _ in range(5):
+            bucket.acquire()
+        assert clock.sleeps == [0.333333, 0.333333], clock.sleeps
+        clock.now += 10
+        bucket.acquire()
+        assert len(clock.sleeps) == 2
+        print("  ✅ Burst of 3 passes, then requests are spaced at 3 per second")
+        
+        bucket.block_for(5)
+        bucket.acquire()
+        assert clock.sleeps[-1] == 5.0, clock.sleeps
+        print("  ✅ block_for pauses every caller")
+        
+        statuses = [429, 200]
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+            
+            def do_GET(self):
+                status = statuses.pop(0)
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", "2")
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+        
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            clock = FakeClock()
+            bucket = TokenBucket(rate=3.0, capacity=3, clock=clock, sleep=clock.sleep)
+            with httpx.Client(transport=RateLimitedTransport(bucket, max_retries=3)) as client:
+                response = client.get(f"http://127.0.0.1:{server.server_port}/v1/pages/p1")
+        finally:
+            server.shutdown()
+        assert response.status_code == 200 and not statuses
+        assert clock.sleeps == [2.0], clock.sleeps
+        print("  ✅ 429 retried after the Retry-After delay")
+        
+        from src.notion_registry import get_notion_client
+        assert get_notion_client("secret_test")._max_retries == 0
+        print("  ✅ Shared client leaves retries to the transport")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Notion Rate Limiting Error: {str(e)}")
+        return False
+
+def test_block_tree_fetcher():
+    """Test pagination, depth limit, concurrency and child order of the block tree fetch"""
+    print("\n🧪 Testing Block Tree Fetcher...")
+    
+    try:
+        import asyncio
+        import threading
+        import time
+        from types import SimpleNamespace
+        from src.notion_tools import BlockTreeFetcher
+        
+        def block(block_id, has_children=False):
+            return {"id": block_id, "type": "paragraph", "has_children": has_children}
+        
+        tree = {
+            "page": [block("a", True), block("b"), block("c", True)],
+            "a": [block("a1", True), block("a2")],
+            "a1": [block("a1x", True)],
+            "a1x": [block("too-deep")],
+            "c": [block("c1")]
+        }
+        calls = []
+        in_flight = {"now": 0, "max": 0}
+        in_flight_lock = threading.Lock()
+        
+        def list_children(block_id, start_cursor=None, page_size=100):
+            calls.append((block_id, start_cursor))
+            with in_flight_lock:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            # Two results per page, and the first branch answers last
+            time.sleep(0.1 if block_id == "a" else 0.02)
+            with in_flight_lock:
+                in_flight["now"] -= 1
+            start = int(start_cursor or 0)
+            results = tree.get(block_id, [])[start:start + 2]
+            has_more = start + 2 < len(tree.get(block_id, []))
+            return {"results": results, "has_more": has_more, "next_cursor": str(start + 2) if has_more else None}
+        
+        notion = SimpleNamespace(blocks=SimpleNamespace(children=SimpleNamespace(list=list_children)))
+        blocks, truncated = BlockTreeFetcher(notion, max_depth=2, max_blocks=100, max_workers=4).fetch("page")
+        assert [(depth, b["id"]) for depth, b in blocks] == [
+            (0, "a"), (1, "a1"), (2, "a1x"), (1, "a2"), (0, "b"), (0, "c"), (1, "c1")
+        ], blocks
+        assert ("page", None) in calls and ("page", "2") in calls
+        print("  ✅ Paginated children returned in document order")
+        
+        assert truncated and not any(block_id == "a1x" for block_id, _ in calls)
+        print("  ✅ Depth limit stops the walk and marks the tree truncated")
+        
+        assert 1 < in_flight["max"] <= 4, in_flight
+        in_flight["max"] = 0
+        blocks, truncated = BlockTreeFetcher(notion, max_depth=5, max_blocks=100, max_workers=2).fetch("page")
+        assert len(blocks) == 8 and in_flight["max"] == 2, in_flight
+        print("  ✅ Child lists fetched concurrently, at most max_workers at a time")
+        
+        blocks, truncated = BlockTreeFetcher(notion, max_depth=5, max_blocks=4, max_workers=1).fetch("page")
+        assert truncated and len(blocks) == 4
+        print("  ✅ Block limit caps the number of fetched blocks")
+        
+        async def alist_children(block_id, start_cursor=None, page_size=100):
+            await asyncio.sleep(0.05 if block_id == "a" else 0)
+            return list_children(block_id, start_cursor, page_size)
+        
+        async_notion = SimpleNamespace(blocks=SimpleNamespace(children=SimpleNamespace(list=alist_children)))
+        blocks, truncated = asyncio.run(BlockTreeFetcher(notion, max_depth=2, max_blocks=100).afetch(async_notion, "page"))
+        assert [b["id"] for _, b in blocks] == ["a", "a1", "a1x", "a2", "b", "c", "c1"] and truncated
+        print("  ✅ Async fetch walks the same tree")
+        
+        cancelled = []
+        
+        async def failing_list_children(block_id, start_cursor=None, page_size=100):
+            if block_id == "c":
+                raise RuntimeError("Notion timed out")
+            try:
+                await asyncio.sleep(0.5 if block_id == "a" else 0)
+            except asyncio.CancelledError:
+                cancelled.append(block_id)
+                raise
+            return list_children(block_id, start_cursor, page_size)
+        
+        async def fetch_failing():
+            failing_notion = SimpleNamespace(blocks=SimpleNamespace(children=SimpleNamespace(list=failing_list_children)))
+            try:
+                await BlockTreeFetcher(notion, max_depth=2, max_blocks=100).afetch(failing_notion, "page")
+            except RuntimeError:
+                # Checked before asyncio.run would cancel leftover tasks itself
+                return list(cancelled)
+        
+        assert asyncio.run(fetch_failing()) == ["a"], cancelled
+        print("  ✅ A failed child fetch cancels its sibling fetches")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Block Tree Fetcher Error: {str(e)}")
+        return False
+
+def test_page_cache():
+    """Test the version-aware page content cache"""
+    print("\n🧪 Testing Page Cache...")
+    
+    try:
+        from src.page_cache import PageCache
+        
+        cache = PageCache(path=":memory:", max_memory_bytes=200)
+        content = {"title": "Test Page", "blocks": [{"type": "paragraph", "text": "Hello"}]}
+        
+        cache.put("page-1", "2024-01-01T00:00:00.000Z", content)
+        assert cache.get("page-1", "2024-01-01T00:00:00.000Z") == content
+        print("  ✅ Cached page served for matching last_edited_time")
+        
+        assert cache.get("page-1", "2024-01-02T00:00:00.000Z") is None
+        print("  ✅ Edited page invalidates cached content")
+        
+        for i in range(10):
+            cache.put(f"page-{i}", "2024-01-01T00:00:00.000Z", content)
+        stats = cache.stats()
+        assert stats["memory_bytes"] <= 200
+        assert stats["disk_entries"] == 10
+        assert cache.get("page-0", "2024-01-01T00:00:00.000Z") == content
+        print(f"  ✅ Memory tier evicted to budget, disk tier still serves pages ({stats['evictions']} evictions)")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Page Cache Error: {str(e)}")
+        return False
+
+def test_search_index():
+    """Test the local full-text search index"""
+    print("\n🧪 Testing Search Index...")
+    
+    try:
+        from src.search_index import SearchIndex
+        
+        index = SearchIndex(path=":memory:")
+        index.upsert("page-1", "Onboarding Guide", body="Set up your laptop and request VPN access.")
+        index.upsert("page-2", "VPN Troubleshooting", body="Restart the client if the connection drops.")
+        index.upsert("page-3", "Holiday Calendar", body="Company holidays for the year.")
+        
+        assert index.is_stale()
+        print("  ✅ Unsynced index is reported as stale")
+        
+        results = index.search("How do I fix the VPN?")
+        assert [result["id"] for result in results] == ["page-2", "page-1"]
+        print("  ✅ Title and body matches ranked with BM25")
+        
+        index.mark_synced()
+        assert not index.is_stale()
+        print(f"  ✅ Synced index serves searches locally ({index.count()} pages)")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Search Index Error: {str(e)}")
+        return False
+
+def test_workspace_sync():
+    """Test that the sync checkpoint holds at failed pages, skips stuck ones and bounds the crawl"""
+    print("\n🧪 Testing Workspace Sync...")
+    
+    try:
+        from types import SimpleNamespace
+        from src.notion_sync import WorkspaceSync
+        from src.page_cache import PageCache
+        from src.search_index import SearchIndex
+        
+        def page(page_id, last_edited):
+            return {
+                "object": "page",
+                "id": page_id,
+                "last_edited_time": last_edited,
+                "url": f"https://notion.so/{page_id}",
+                "properties": {"Name": {"type": "title", "title": [{"plain_text": page_id.upper()}]}}
+            }
+        
+        pages = [page("p2", "2024-01-02T00:00:00.000Z"), page("p1", "2024-01-01T00:00:00.000Z")]
+        
+        def search(start_cursor=None, **kwargs):
+            return {"results": list(pages), "has_more": False, "next_cursor": None}
+        
+        class StubFetcher:
+            def __init__(self):
+                self.failing = set()
+                self.fetched = []
+            
+            def fetch(self, page_id):
+                self.fetched.append(page_id)
+                if page_id in self.failing:
+                    raise RuntimeError("Notion timed out")
+                text = [{"plain_text": f"Body of {page_id}"}]
+                return [(0, {"id": f"{page_id}-b1", "type": "paragraph", "paragraph": {"rich_text": text}})], False
+        
+        fetcher = StubFetcher()
+        fetcher.failing.add("p1")
+        search_index = SearchIndex(path=":memory:")
+        sync = WorkspaceSync(
+            notion=SimpleNamespace(search=search),
+            page_cache=PageCache(path=":memory:"),
+            search_index=search_index,
+            block_fetcher=fetcher,
+            max_attempts=2
+        )
+        
+        summary = sync.run_once()
+        assert summary["synced"] == 1 and len(summary["errors"]) == 1
+        assert sync.checkpoint == "2024-01-01T00:00:00.000Z"
+        print("  ✅ Checkpoint held at the failed page")
+        
+        fetcher.failing.clear()
+        summary = sync.run_once()
+        assert summary["synced"] == 2 and not summary["errors"]
+        assert sync.checkpoint == "2024-01-02T00:00:00.000Z"
+        assert search_index.search("Body", limit=5)
+        print("  ✅ Checkpoint advanced to the newest page after a clean run")
+        
+        fetcher.fetched.clear()
+        pages.insert(0, page("p3", "2024-01-03T00:00:00.000Z"))
+        summary = sync.run_once()
+        assert "p1" not in fetcher.fetched and "p3" in fetcher.fetched
+        assert sync.checkpoint == "2024-01-03T00:00:00.000Z"
+        print("  ✅ Pages edited before the checkpoint were not crawled again")
+        
+        fetcher.failing.add("p4")
+        pages[:0] = [page("p5", "2024-01-05T00:00:00.000Z"), page("p4", "2024-01-04T00:00:00.000Z")]
+        summary = sync.run_once()
+        assert "p5" in fetcher.fetched and len(summary["errors"]) == 1
+        assert sync.checkpoint == "2024-01-04T00:00:00.000Z"
+        summary = sync.run_once()
+        assert "skipped after 2 attempts" in summary["errors"][0]
+        assert sync.checkpoint == "2024-01-05T00:00:00.000Z"
+        assert not search_index.is_stale()
+        print("  ✅ A page that keeps failing is skipped once its attempts run out")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Workspace Sync Error: {str(e)}")
+        return False
+
+def test_vector_index():
+    """Test page upserts, replacement, removal and reload of the vector index"""
+    print("\n🧪 Testing Vector Index...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from src.vector_index import VectorIndex
+        
+        class AxisEmbeddings:
+            def embed_query(self, text):
+                return [1.0 if word in text else 0.0 for word in ("vpn", "roadmap", "onboarding")]
+        
+        with tempfile.TemporaryDirectory() as path:
+            index = VectorIndex(path, embedder=AxisEmbeddings())
+            index.upsert_page("p1", "VPN", "https://notion.so/p1", ["VPN setup"], np.array([[1.0, 0.0, 0.0]]))
+            index.upsert_page("p2", "Roadmap", "https://notion.so/p2", ["Q3 roadmap", "Q4 roadmap"], np.array([[0.0, 2.0, 0.0], [0.0, 1.0, 1.0]]))
+            assert len(index) == 3
+            assert index.search("roadmap", top_k=1)[0]["text"] == "Q3 roadmap"
+            print("  ✅ Upserted pages are searchable")
+            
+            index.upsert_page("p2", "Roadmap", "https://notion.so/p2", ["Onboarding roadmap"], np.array([[0.0, 1.0, 1.0]]))
+            assert len(index) == 2
+            assert [hit["text"] for hit in index.search("roadmap")] == ["Onboarding roadmap", "VPN setup"]
+            assert index.search("onboarding", top_k=5)[0]["page_id"] == "p2"
+            print("  ✅ Upserting a page replaces its passages")
+            
+            index.remove_page("p1")
+            assert [hit["page_id"] for hit in index.search("vpn", top_k=5)] == ["p2"]
+            print("  ✅ Removed pages drop out of search")
+            
+            assert index.search("vpn", top_k=0) == []
+            emptied = VectorIndex(Path(path) / "emptied", embedder=AxisEmbeddings())
+            emptied.upsert_page("p1", "VPN", "https://notion.so/p1", ["VPN setup"], np.array([[1.0, 0.0, 0.0]]))
+            emptied.remove_page("p1")
+            assert emptied.search("vpn") == []
+            print("  ✅ top_k=0 and an index with every row removed return no passages")
+            
+            index.save()
+            reloaded = VectorIndex(path, embedder=AxisEmbeddings())
+            assert isinstance(reloaded.embeddings, np.memmap) and reloaded.embeddings.shape == (1, 3)
+            assert [chunk["text"] for chunk in reloaded.chunks] == ["Onboarding roadmap"]
+            assert reloaded.search("onboarding")[0]["url"] == "https://notion.so/p2"
+            reloaded.upsert_page("p3", "VPN", "https://notion.so/p3", ["VPN policy"], np.array([[1.0, 0.0, 0.0]]))
+            assert reloaded.search("vpn", top_k=1)[0]["page_id"] == "p3"
+            print("  ✅ Saved index compacted and memory-mapped on reload")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Vector Index Error: {str(e)}")
+        return False
+
+def test_database_filters():
+    """Test translation of database filter queries into Notion payloads"""
+    print("\n🧪 Testing Database Filters...")
+    
+    try:
+        from src.notion_filters import build_query_payload, FilterQueryError
+        
+        schema = {
+            "Name": {"type": "title"},
+            "Status": {"type": "status"},
+            "Priority": {"type": "number"},
+            "Tag": {"type": "select"},
+            "Owner": {"type": "people"}
+        }
+        
+        payload = build_query_payload("status = Done and Priority >= 2; sort by Priority desc", schema)
+        assert payload == {
+            "filter": {"and": [
+                {"property": "Status", "status": {"equals": "Done"}},
+                {"property": "Priority", "number": {"greater_than_or_equal_to": 2}}
+            ]},
+            "sorts": [{"property": "Priority", "direction": "descending"}]
+        }
+        print("  ✅ Clause syntax translated into filter and sorts")
+        
+        payload = build_query_payload("Status = Done; Priority > 2 or Tag = Bob", schema)
+        assert payload == {
+            "filter": {"and": [
+                {"property": "Status", "status": {"equals": "Done"}},
+                {"or": [
+                    {"property": "Priority", "number": {"greater_than": 2}},
+                    {"property": "Tag", "select": {"equals": "Bob"}}
+                ]}
+            ]}
+        }
+        print("  ✅ ';' joins OR groups into an AND compound filter")
+        
+        try:
+            build_query_payload("Status = Done and Priority > 2 or Tag = Bob", schema)
+            print("  ❌ Mixed 'and'/'or' clause was accepted")
+            return False
+        except FilterQueryError:
+            print("  ✅ Mixed 'and'/'or' in one clause rejected")
+        
+        payload = build_query_payload("Tag = R and D; Name contains salt or pepper or Priority > 2", schema)
+        assert payload == {
+            "filter": {"and": [
+                {"property": "Tag", "select": {"equals": "R and D"}},
+                {"or": [
+                    {"property": "Name", "title": {"contains": "salt or pepper"}},
+                    {"property": "Priority", "number": {"greater_than": 2}}
+                ]}
+            ]}
+        }
+        print("  ✅ 'and'/'or' inside values kept with the value")
+        
+        payload = build_query_payload("Owner contains 6b1a0c2e; Owner is not empty", schema)
+        assert payload == {
+            "filter": {"and": [
+                {"property": "Owner", "people": {"contains": "6b1a0c2e"}},
+                {"property": "Owner", "people": {"is_not_empty": True}}
+            ]}
+        }
+        print("  ✅ People properties filtered with contains and is empty")
+        
+        payload = build_query_payload('{"property": "Status", "status": {"equals": "Done"}}')
+        assert payload == {"filter": {"property": "Status", "status": {"equals": "Done"}}}
+        print("  ✅ Raw Notion filter JSON passed through")
+        
+        try:
+            build_query_payload("Owner = Alice", schema)
+            print("  ❌ Unknown property was accepted")
+            return False
+        except FilterQueryError:
+            print("  ✅ Unknown properties rejected with the available property names")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Database Filters Error: {str(e)}")
+        return False
+
+def test_database_query_client():
+    """Test the database query tool and mirror against the installed notion-client's endpoints"""
+    print("\n🧪 Testing Database Query Client...")
+    
+    try:
+        from src.notion_tools import NotionDatabaseQueryTool
+        
+        rows = [database_row(1, "Open", 3), database_row(2, "Done", 5), database_row(3, "Open", 8)]
+        client, requests = mock_notion_client(rows)
+        with stubbed_environment():
+            tool = NotionDatabaseQueryTool()
+        tool.notion = client
+        
+        result = tool._run("db-1", filter_query="Status = Open; sort by Points desc", max_results=10)
+        assert "Task 1" in result and "Task 3" in result and not result.startswith("Error"), result
+        assert ("GET", "/v1/databases/db-1") in requests
+        assert ("GET", "/v1/data_sources/ds-1") in requests
+        assert requests.count(("POST", "/v1/data_sources/ds-1/query")) == 2
+        print("  ✅ Rows queried through the database's data source, across pages")
+        
+        from src.database_mirror import DatabaseMirror
+        mirror = DatabaseMirror("db-1")
+        assert mirror.refresh(client, force=True) == 3
+        assert mirror.aggregate("sum", column="Points", filter_query="Status = Open")["value"] == 11
+        print("  ✅ Database mirror refreshed from the data source")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Database Query Client Error: {str(e)}")
+        return False
+
+def test_database_mirror():
+    """Test aggregates over the columnar database mirror"""
+    print("\n🧪 Testing Database Mirror...")
+    
+    try:
+        from src.database_mirror import DatabaseMirror
+        from src.notion_filters import FilterQueryError
+        
+        def row(i, owner, status, points):
+            return {
+                "id": f"row-{i}",
+                "last_edited_time": "2024-01-01T00:00:00.000Z",
+                "properties": {
+                    "Name": {"type": "title", "title": [{"plain_text": f"Task {i}"}]},
+                    "Owner": {"type": "select", "select": {"name": owner}},
+                    "Status": {"type": "status", "status": {"name": status}},
+                    "Points": {"type": "number", "number": points}
+                }
+            }
+        
+        mirror = DatabaseMirror("database-1")
+        mirror.upsert_rows([
+            row(1, "Alice", "Open", 3),
+            row(2, "Alice", "Done", 5),
+            row(3, "Bob", "Open", 8),
+            row(4, "Alice", "Open", None)
+        ])
+        
+        result = mirror.aggregate("count", group_by="Owner", filter_query="Status = Open")
+        assert result["groups"] == {"Alice": 2, "Bob": 1}
+        print("  ✅ Filtered group-by count is exact")
+        
+        assert mirror.aggregate("sum", column="Points")["value"] == 16
+        assert mirror.aggregate("max", column="Points", filter_query="Owner = Alice")["value"] == 5
+        print("  ✅ Sum and max skip missing values")
+        
+        assert mirror.aggregate("count", filter_query="Status = Open; Owner = Bob or Points = 3")["value"] == 2
+        try:
+            mirror.aggregate("count", filter_query="Status = Open and Owner = Bob or Points = 3")
+            print("  ❌ Mixed 'and'/'or' clause was accepted")
+            return False
+        except FilterQueryError:
+            print("  ✅ Filters combine AND-ed groups of OR-ed clauses")
+        
+        mirror.upsert_rows([row(3, "Bob", "Done", 8)])
+        assert mirror.aggregate("count", filter_query="Status = Open")["value"] == 2
+        print("  ✅ Updated rows replace their previous values")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Database Mirror Error: {str(e)}")
+        return False
+
+def test_tool_output():
+    """Test the compact tool output format"""
+    print("\n🧪 Testing Tool Output...")
+    
+    try:
+        from src.tool_output import ReferenceRegistry, count_tokens, format_table
+        
+        references = ReferenceRegistry()
+        ref = references.register("0f7c1a52-9d2e-4d1b-8c1a-3e5b7d9f1a2b", "https://notion.so/Roadmap-0f7c", "page", "Roadmap")
+        assert ref == "p1"
+        assert references.resolve("[p1]") == "0f7c1a52-9d2e-4d1b-8c1a-3e5b7d9f1a2b"
+        assert references.expand("See [p1].") == "See [Roadmap](https://notion.so/Roadmap-0f7c)."
+        print("  ✅ Short references resolve to ids and expand to links")
+        
+        references = ReferenceRegistry(max_refs=2)
+        for i in range(1, 4):
+            references.register(f"page-{i}", f"https://notion.so/page-{i}", "page", f"Page {i}")
+            references.resolve("p1")
+        assert references.lookup("p1") and references.lookup("p3") and references.lookup("p2") is None
+        assert references.resolve("p2") == "p2"
+        assert references.register("page-2") == "p4"
+        print("  ✅ Least recently used references evicted beyond max_refs")
+        
+        rows = [
+            {"ref": "p1", "Status": "Done", "Owner": "Alice", "Notes": ""},
+            {"ref": "p2", "Status": "Done", "Owner": "Bob", "Notes": ""}
+        ]
+        table = format_table(["ref", "Status", "Owner", "Notes"], rows)
+        assert table == "All rows: Status=Done\nref | Owner\np1 | Alice\np2 | Bob"
+        assert count_tokens(table) < count_tokens(str(rows))
+        print(f"  ✅ Rows rendered as a table ({count_tokens(table)} vs {count_tokens(str(rows))} tokens)")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Tool Output Error: {str(e)}")
+        return False
+
+def test_context_packing():
+    """Test relevance-ranked packing of page blocks"""
+    print("\n🧪 Testing Context Packing...")
+    
+    try:
+        from src.context_packing import pack_blocks
+        
+        filler = "Quarterly planning notes about budgets, hiring and roadmap priorities for the team."
+        blocks = []
+        for heading in ["Overview", "VPN Setup", "Holidays"]:
+            blocks.append({"type": "heading_2", "text": heading, "depth": 0})
+            blocks.extend({"type": "paragraph", "text": filler, "depth": 0} for _ in range(5))
+        blocks[9]["text"] = "Install the VPN client and sign in with your company account."
+        
+        parts = pack_blocks(blocks, "How do I install the VPN?", budget=60)
+        assert 9 in parts[0] and 6 in parts[0], parts[0]
+        print("  ✅ Most relevant block packed first, under its heading")
+        
+        assert sorted({index for part in parts for index in part}) == list(range(len(blocks)))
+        print(f"  ✅ Remaining blocks served in {len(parts) - 1} further parts")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Context Packing Error: {str(e)}")
+        return False
+
+def test_query_router():
+    """Test question routing"""
+    print("\n🧪 Testing Query Router...")
+    
+    try:
+        from src.router import classify_question
+        
+        history = [
+            {"type": "user_question", "content": "Who owns the roadmap?"},
+            {"type": "assistant_response", "content": "Alice owns it [p1]"}
+        ]
+        cases = {
+            "Where is the onboarding guide?": "lookup",
+            "How many open tasks per owner?": "aggregate",
+            "Which owner has the most open tasks?": "aggregate",
+            "What is the most common status?": "aggregate",
+            "What is the most important design decision?": "lookup",
+            "Who owns at least one of the launch pages?": "lookup",
+            "And when is it due?": "follow_up",
+            "Compare the Q3 and Q4 roadmaps and summarize the risks": "research"
+        }
+        for question, route in cases.items():
+            assert classify_question(question, history) == route, question
+            print(f"  ✅ {route}: {question}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Query Router Error: {str(e)}")
+        return False
+
+def test_llm_cache():
+    """Test the persistent LLM response cache"""
+    print("\n🧪 Testing LLM Cache...")
+    
+    try:
+        from src.llm_cache import SQLiteLLMCache
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        
+        cache = SQLiteLLMCache(path=":memory:")
+        llm = FakeListChatModel(responses=["first", "second"], cache=cache)
+        
+        assert llm.invoke("What is   our VPN policy?").content == "first"
+        assert llm.invoke("What is our VPN policy?").content == "first"
+        print("  ✅ Repeated prompt served from the cache")
+        
+        assert llm.invoke("Who owns the roadmap?").content == "second"
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 2
+        print(f"  ✅ Hit rate tracked ({stats['hit_rate']:.0%})")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ LLM Cache Error: {str(e)}")
+        return False
+
+def test_agent_llm():
+    """Test that crew agents run on the cached crewai LLM"""
+    print("\n🧪 Testing Agent LLM...")
+    
+    try:
+        from crewai import Agent, Crew, Task
+        from src.llm_cache import CachedOpenAICompletion, SQLiteLLMCache
+        
+        base_url, requests, server = start_fake_openai(["Employees get 25 vacation days [p1]."])
+        llm = CachedOpenAICompletion(
+            model="gpt-4o-mini",
+            temperature=0.0,
+            api_key="sk-test",
+            base_url=base_url,
+            response_cache=SQLiteLLMCache(path=":memory:"),
+            stream=True
+        )
+        
+        def ask():
+            agent = Agent(role="QA", goal="Answer questions", backstory="You answer briefly.", llm=llm, verbose=False)
+            task = Task(description="How many vacation days do employees get?", expected_output="The answer", agent=agent)
+            assert agent.llm is llm
+            return str(Crew(agents=[agent], tasks=[task], verbose=False).kickoff())
+        
+        first, second = ask(), ask()
+        server.shutdown()
+        assert first == second == "Employees get 25 vacation days [p1]."
+        print("  ✅ Agent answered through the crewai LLM")
+        assert len(requests) == 1
+        print("  ✅ Repeated task answered from the response cache")
+        
+        sampled = CachedOpenAICompletion(model="gpt-4o-mini", temperature=0.7, api_key="sk-test", response_cache=SQLiteLLMCache(path=":memory:"))
+        assert sampled._cache_prompt([{"role": "user", "content": "Hi"}], None, None, None) is None
+        print("  ✅ Sampled responses are not cached")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Agent LLM Error: {str(e)}")
+        return False
+
+def test_answer_streaming():
+    """Test that only final-answer tokens are streamed"""
+    print("\n🧪 Testing Answer Streaming...")
+    
+    try:
+        from src.streaming import StreamSink, get_stream_handler, set_stream_sink
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        
+        llm = FakeListChatModel(
+            responses=["Thought: I found it.\nFinal Answer: The VPN guide is up to date."],
+            callbacks=[get_stream_handler()]
+        )
+        sink = StreamSink()
+        set_stream_sink(sink)
+        try:
+            for _ in llm.stream("Is the VPN guide current?"):
+                pass
+        finally:
+            set_stream_sink(None)
+        sink.close({"success": True, "answer": "The VPN guide is up to date."})
+        
+        events = list(sink.events())
+        tokens = "".join(event["content"] for event in events if event["type"] == "token")
+        assert tokens == "The VPN guide is up to date.", tokens
+        assert events[-1]["type"] == "done"
+        print(f"  ✅ Streamed {len(events) - 1} tokens after the final-answer marker, reasoning held back")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Answer Streaming Error: {str(e)}")
+        return False
+
+def test_crew_answer_streaming():
+    """Test that answer tokens stream from a crew agent's LLM"""
+    print("\n🧪 Testing Crew Answer Streaming...")
+    
+    try:
+        from crewai import Agent, Crew, Task
+        from src.llm_cache import CachedOpenAICompletion
+        from src.streaming import StreamSink, set_stream_sink
+        
+        answer = "Employees get 25 vacation days [p1]."
+        base_url, requests, server = start_fake_openai([answer])
+        llm = CachedOpenAICompletion(model="gpt-4o-mini", api_key="sk-test", base_url=base_url, stream=True)
+        agent = Agent(role="QA", goal="Answer questions", backstory="You answer briefly.", llm=llm, verbose=False)
+        task = Task(description="How many vacation days do employees get?", expected_output="The answer", agent=agent)
+        
+        sink = StreamSink()
+        set_stream_sink(sink)
+        try:
+            Crew(agents=[agent], tasks=[task], verbose=False).kickoff()
+        finally:
+            set_stream_sink(None)
+            server.shutdown()
+        sink.close({"success": True, "answer": answer})
+        
+        events = list(sink.events())
+        tokens = [event["content"] for event in events if event["type"] == "token"]
+        assert requests[0]["stream"] is True
+        assert len(tokens) > 1, tokens
+        assert "".join(tokens).startswith("Employees get 25 vacation days"), tokens
+        print(f"  ✅ Streamed the agent's answer in {len(tokens)} tokens")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Crew Answer Streaming Error: {str(e)}")
+        return False
+
+def test_parallel_research():
+    """Test that research branches run concurrently"""
+    print("\n🧪 Testing Parallel Research...")
+    
+    try:
+        import time
+        from src.research import ParallelResearcher, split_question
+        
+        question = "What is the VPN policy, and who owns the onboarding guide?"
+        subqueries = split_question(question)
+        assert subqueries == [question, "What is the VPN policy", "who owns the onboarding guide"], subqueries
+        print(f"  ✅ Question split into {len(subqueries)} queries")
+        assert split_question("What is the VPN policy?") == ["What is the VPN policy?"]
+        assert split_question("  What is the VPN policy ? ") == ["What is the VPN policy ?"]
+        print("  ✅ Single-part question kept as one query")
+        
+        class SlowTool:
+            def __init__(self, result):
+                self.result = result
+            
+            def _run(self, target, **kwargs):
+                time.sleep(0.2)
+                return self.result(target)
+        
+        tools = {
+            "notion_search": SlowTool(lambda query: f"ref | type | title\np{len(query)} | page | Result"),
+            "notion_page_retriever": SlowTool(lambda ref: f"[{ref}] Page body"),
+            "notion_database_query": SlowTool(lambda ref: "")
+        }
+        started = time.perf_counter()
+        findings = ParallelResearcher(tools).research(question)
+        elapsed = time.perf_counter() - started
+        assert findings.count("Page body") == 3
+        assert elapsed < 0.6, elapsed
+        print(f"  ✅ 3 searches and 3 page fetches in {elapsed:.2f}s (serially about 1.2s)")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Parallel Research Error: {str(e)}")
+        return False
+
+def test_batch_retrieval():
+    """Test that concurrent fetches of the same page are shared"""
+    print("\n🧪 Testing Batch Retrieval...")
+    
+    try:
+        import threading
+        import time
+        from src.page_cache import SingleFlight
+        
+        single_flight = SingleFlight()
+        fetches = []
+        
+        def fetch():
+            fetches.append(1)
+            time.sleep(0.1)
+            return {"title": "VPN Guide"}
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight.do("page-1", fetch)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(fetches) == 1 and len(results) == 5
+        assert all(result["title"] == "VPN Guide" for result in results)
+        print("  ✅ Five concurrent requests for one page fetched it once")
+        
+        single_flight.do("page-1", fetch)
+        assert len(fetches) == 2
+        print("  ✅ Later requests fetch again once the first completed")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Batch Retrieval Error: {str(e)}")
+        return False
+
+def test_async_answering():
+    """Test that concurrent async retrievals of one page are shared"""
+    print("\n🧪 Testing Async Answering...")
+    
+    try:
+        import asyncio
+        from src.page_cache import AsyncSingleFlight
+        
+        single_flight = AsyncSingleFlight()
+        fetches = []
+        
+        async def fetch():
+            fetches.append(1)
+            await asyncio.sleep(0.1)
+            return {"title": "VPN Guide"}
+        
+        async def retrieve_concurrently():
+            return await asyncio.gather(*(single_flight.do("page-1", fetch) for _ in range(10)))
+        
+        results = asyncio.run(retrieve_concurrently())
+        assert len(fetches) == 1 and len(results) == 10
+        print("  ✅ Ten concurrent coroutines fetched the page once")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Async Answering Error: {str(e)}")
+        return False
+
+def test_answer_many():
+    """Test batch answering through answer_many and main.py --batch"""
+    print("\n🧪 Testing Answer Many...")
+    
+    try:
+        import json
+        import tempfile
+        from unittest import mock
+        import main as cli
+        
+        questions = ["What is the VPN policy?", "Who owns the roadmap?", "what is the  VPN policy?", "Where is the onboarding guide?"]
+        with stubbed_environment():
+            chatbot = StubbedChatbot()
+            chatbot.conversation_history.add("user_question", "Earlier question")
+            history = chatbot.conversation_history
+            
+            # Workers share the chatbot's tools instead of building their own
+            with mock.patch("src.agents.create_notion_tools", side_effect=AssertionError("tools rebuilt")):
+                responses = chatbot.answer_many(questions, concurrency=3)
+            assert [response["answer"] for response in responses] == [
+                "Answer to What is the VPN policy?",
+                "Answer to Who owns the roadmap?",
+                "Answer to What is the VPN policy?",
+                "Answer to Where is the onboarding guide?"
+            ], responses
+            assert chatbot.conversation_history is history and len(history) == 1
+            print("  ✅ Answers returned in question order, history restored")
+            from src.agents import get_openai_rate_limiter
+            assert get_openai_rate_limiter() is not None
+            print("  ✅ Workers shared the tools behind a default OpenAI rate limiter")
+            
+            def fail(index, response):
+                raise RuntimeError("output closed")
+            try:
+                chatbot.answer_many(questions[:2], concurrency=2, on_result=fail)
+                print("  ❌ on_result error was swallowed")
+                return False
+            except RuntimeError:
+                pass
+            assert chatbot.conversation_history is history
+            print("  ✅ History restored when answering fails")
+            
+            with tempfile.TemporaryDirectory() as path:
+                input_path = Path(path) / "questions.jsonl"
+                input_path.write_text("\n".join(json.dumps({"id": f"q{i}", "question": q}) for i, q in enumerate(questions)), encoding="utf-8")
+                with mock.patch("src.crews.NotionChatbot", StubbedChatbot):
+                    cli.main(["--batch", str(input_path), "--concurrency", "2"])
+                lines = (Path(path) / "questions.answers.jsonl").read_text(encoding="utf-8").splitlines()
+                records = {record["id"]: record for record in map(json.loads, lines)}
+                assert len(lines) == 4 and all(record["success"] for record in records.values())
+                assert records["q1"]["answer"] == "Answer to Who owns the roadmap?"
+                assert records["q3"]["answer"] == "Answer to Where is the onboarding guide?"
+            print("  ✅ main.py --batch wrote one answer per question")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Answer Many Error: {str(e)}")
+        return False
+
+def test_async_question_answering():
+    """Test aanswer_question and the async fast path with stubbed async tools"""
+    print("\n🧪 Testing Async Question Answering...")
+    
+    try:
+        import asyncio
+        from src.router import FastPathAnswerer
+        
+        class StubSearch:
+            async def _arun(self, query):
+                await asyncio.sleep(0.05)
+                return "ref | type | title\np1 | page | VPN Guide\np2 | page | Remote Work"
+        
+        class StubPageRetriever:
+            def __init__(self):
+                self.running = 0
+                self.overlapped = False
+            
+            async def _arun(self, ref, query=""):
+                self.running += 1
+                await asyncio.sleep(0.05)
+                self.overlapped = self.overlapped or self.running > 1
+                self.running -= 1
+                return f"Page {ref}: VPN is required off-site"
+        
+        retriever = StubPageRetriever()
+        fast_path = FastPathAnswerer({"notion_search": StubSearch(), "notion_page_retriever": retriever}, StubFastPathLLM())
+        context = asyncio.run(fast_path.agather_context("VPN policy"))
+        assert context == "Page p1: VPN is required off-site\n\nPage p2: VPN is required off-site", context
+        assert retriever.overlapped
+        assert asyncio.run(fast_path.aanswer("What is the VPN policy?")) == "Answer to What is the VPN policy?"
+        print("  ✅ Async fast path retrieved the top pages concurrently")
+        
+        with stubbed_environment():
+            # Built outside any event loop; each loop gets its own answer lock
+            chatbot = StubbedChatbot()
+            
+            async def ask(*questions):
+                return await asyncio.gather(*(chatbot.aanswer_question(question) for question in questions))
+            
+            responses = asyncio.run(ask("What is the VPN policy?", "Who owns the roadmap?"))
+            assert [response["answer"] for response in responses] == ["Answer to What is the VPN policy?", "Answer to Who owns the roadmap?"]
+            assert all(response["source"] == "local_fast_path" for response in responses)
+            responses = asyncio.run(ask("Where is the onboarding guide?"))
+            assert responses[0]["answer"] == "Answer to Where is the onboarding guide?"
+            assert len(chatbot.conversation_history) == 6
+        print("  ✅ aanswer_question answered from async tools across event loops")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Async Question Answering Error: {str(e)}")
+        return False
+
+def test_conversation_history():
+    """Test the bounded, summarized conversation history"""
+    print("\n🧪 Testing Conversation History...")
+    
+    try:
+        import time
+        from src.conversation_history import ConversationHistory
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        
+        llm = FakeListChatModel(responses=["The user asked where the VPN guide is [p1]."])
+        history = ConversationHistory(llm=llm, max_entries=4, context_tokens=200)
+        for turn in range(6):
+            history.add("user_question", f"Question {turn}")
+            history.add("assistant_response", f"Answer {turn}")
+        
+        assert len(history) == 4 and history[-1]["content"] == "Answer 5"
+        assert history[0]["timestamp"] != "now"
+        print("  ✅ Only the latest entries are kept, with real timestamps")
+        
+        for _ in range(50):
+            if history.summary:
+                break
+            time.sleep(0.05)
+        assert "VPN guide" in history.summary
+        print("  ✅ Evicted turns folded into the summary")
+        
+        history.add("user_question", "And who owns it?")
+        context = history.context_window()
+        assert context.startswith("Summary of earlier conversation") and "Answer 5" in context
+        assert "And who owns it?" not in context
+        print("  ✅ Context window holds the summary and recent turns, not the current question")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Conversation History Error: {str(e)}")
+        return False
+
+def test_embedding_cache():
+    """Test that embeddings are cached by content and requested in batches"""
+    print("\n🧪 Testing Embedding Cache...")
+    
+    try:
+        from src.embedding_cache import CachedEmbeddings, EmbeddingCache
+        
+        class CountingEmbeddings:
+            def __init__(self):
+                self.batches = []
+            
+            def embed_documents(self, texts):
+                self.batches.append(list(texts))
+                return [[float(len(text)), 1.0] for text in texts]
+        
+        model = CountingEmbeddings()
+        embeddings = CachedEmbeddings(model, "test-model", cache=EmbeddingCache(path=":memory:"), batch_size=2)
+        
+        vectors = embeddings.embed_documents(["VPN guide", "Roadmap", "VPN guide", "Onboarding"])
+        assert len(vectors) == 4 and vectors[0] == vectors[2]
+        assert model.batches == [["VPN guide", "Roadmap"], ["Onboarding"]]
+        print("  ✅ Duplicate texts embedded once, misses sent in batches")
+        
+        embeddings.embed_documents(["Roadmap", "Onboarding"])
+        assert len(model.batches) == 2
+        print("  ✅ Cached texts not embedded again")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Embedding Cache Error: {str(e)}")
+        return False
+
+def test_mcp_session():
+    """Test that MCP clients share a pooled, retrying session"""
+    print("\n🧪 Testing MCP Session...")
+    
+    try:
+        from src.mcp_client import RETRY_STATUSES, get_mcp_session, get_mcp_timeout
+        
+        session = get_mcp_session()
+        assert session is get_mcp_session()
+        print("  ✅ One session shared by all MCP clients")
+        
+        retry = session.get_adapter("https://app.crewai.com").max_retries
+        assert 429 in retry.status_forcelist and 503 in RETRY_STATUSES
+        assert "GET" in retry.allowed_methods and "POST" not in retry.allowed_methods
+        print("  ✅ 429/5xx retried for GET only")
+        
+        connect_timeout, read_timeout = get_mcp_timeout()
+        assert connect_timeout < read_timeout
+        print(f"  ✅ Timeouts: {connect_timeout}s connect, {read_timeout}s read")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ MCP Session Error: {str(e)}")
+        return False
+
+def test_async_mcp():
+    """Test concurrent kickoffs and status polls of the async MCP client"""
+    print("\n🧪 Testing Async MCP...")
+    
+    try:
+        import asyncio
+        from src.mcp_client import AsyncLocalMCPSimulator
+        
+        async def dispatch():
+            client = AsyncLocalMCPSimulator()
+            kickoffs = await client.kickoff_many(("notion_qa_crew", {"user_question": f"Question {i}"}) for i in range(10))
+            statuses = await client.get_crew_statuses(kickoff["execution_id"] for kickoff in kickoffs)
+            await client.aclose()
+            return kickoffs, statuses
+        
+        kickoffs, statuses = asyncio.run(dispatch())
+        assert len(kickoffs) == 10 and len(statuses) == 10
+        assert all(status["status"] == "completed" for status in statuses.values())
+        print("  ✅ Ten crew runs kicked off and polled concurrently")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Async MCP Error: {str(e)}")
+        return False
+
+def test_crew_polling():
+    """Test waiting for crew runs with backoff and a deadline"""
+    print("\n🧪 Testing Crew Polling...")
+    
+    try:
+        import time
+        from src.mcp_client import PollSchedule, wait_for_crew_completion
+        
+        class SlowCrews:
+            def __init__(self, checks_to_finish):
+                self.checks_to_finish = checks_to_finish
+                self.checks = 0
+            
+            def get_crew_status(self, execution_id):
+                self.checks += 1
+                if self.checks >= self.checks_to_finish:
+                    return {"status": "completed", "result": "Done"}
+                return {"status": "running", "result": None}
+        
+        client = SlowCrews(4)
+        status = wait_for_crew_completion(client, "exec_1", PollSchedule(timeout=5, initial_delay=0.01, max_delay=0.05))
+        assert status["status"] == "completed" and client.checks == 4
+        print("  ✅ Polling stops as soon as the run completes")
+        
+        client = SlowCrews(1000)
+        started = time.monotonic()
+        status = wait_for_crew_completion(client, "exec_2", PollSchedule(timeout=0.3, initial_delay=0.01, max_delay=0.05))
+        assert status["timed_out"] and status["status"] == "running"
+        assert time.monotonic() - started < 1
+        print(f"  ✅ Deadline returns partial status after {client.checks} checks")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Crew Polling Error: {str(e)}")
+        return False
+
+def test_crew_catalog_cache():
+    """Test the shared cache of available MCP crews"""
+    print("\n🧪 Testing Crew Catalog Cache...")
+    
+    try:
+        import time
+        from src.mcp_client import CrewCatalogCache
+        
+        class CountingClient:
+            server_url = "https://mcp.example.com"
+            
+            def __init__(self):
+                self.calls = 0
+            
+            def list_available_crews(self):
+                self.calls += 1
+                return {"crews": [{"id": "notion_qa_crew", "version": self.calls}]}
+        
+        client = CountingClient()
+        cache = CrewCatalogCache(ttl=0.2, max_stale=10)
+        for _ in range(5):
+            cache.get(client)
+        assert client.calls == 1
+        print("  ✅ Repeated listings are served from the cache")
+        
+        time.sleep(0.3)
+        stale = cache.get(client)
+        assert stale["crews"][0]["version"] == 1
+        time.sleep(0.1)
+        assert client.calls == 2 and cache.get(client)["crews"][0]["version"] == 2
+        print("  ✅ Stale listing served while refreshing in the background")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Crew Catalog Cache Error: {str(e)}")
+        return False
+
+def test_circuit_breaker():
+    """Test the MCP circuit breaker"""
+    print("\n🧪 Testing Circuit Breaker...")
+    
+    try:
+        import time
+        from src.mcp_client import CircuitBreaker
+        
+        breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=1, cooldown=0.2)
+        breaker.record_failure()
+        breaker.record_success(duration=5)
+        assert breaker.state == CircuitBreaker.OPEN and not breaker.allow_request()
+        print("  ✅ Opens after failures and slow calls")
+        
+        time.sleep(0.25)
+        assert breaker.allow_request() and not breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        print("  ✅ A failed half-open probe reopens the circuit")
+        
+        time.sleep(0.25)
+        assert breaker.allow_request()
+        breaker.record_success(duration=0.1)
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+        print("  ✅ A successful probe closes the circuit")
+        
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=0)
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.cooldown == 0 and breaker.allow_request()
+        print("  ✅ An explicit cooldown of 0 is kept instead of the default")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Circuit Breaker Error: {str(e)}")
+        return False
+
+def test_crew_memory_retention():
+    """Test that retention prunes the memory a crew actually uses"""
+    print("\n🧪 Testing Crew Memory Retention...")
+    
+    try:
+        import tempfile
+        import time
+        from unittest import mock
+        from crewai import Agent, Crew, Task
+        from src.embedding_cache import CachedEmbeddings, EmbeddingCache
+        from src.llm_cache import CachedOpenAICompletion
+        from src.memory import CachedMemoryEmbedder, MemoryRetention, create_crew_memory, get_crew_memory
+        
+        class LengthEmbeddings:
+            def embed_documents(self, texts):
+                return [[float(len(text)), 1.0, 0.5] for text in texts]
+        
+        # The embedder builds an OpenAI client; its embeddings are replaced below
+        with tempfile.TemporaryDirectory() as path, mock.patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"}):
+            llm = CachedOpenAICompletion(model="gpt-4o-mini", api_key="sk-test")
+            memory = create_crew_memory(llm, storage=path)
+            assert isinstance(memory.embedder, CachedMemoryEmbedder)
+            memory.embedder.embeddings = CachedEmbeddings(LengthEmbeddings(), "test-model", cache=EmbeddingCache(path=":memory:"))
+            
+            agent = Agent(role="QA", goal="Answer questions", backstory="You answer briefly.", llm=llm, verbose=False)
+            task = Task(description="Summarize the notes", expected_output="A summary", agent=agent)
+            crew = Crew(agents=[agent], tasks=[task], memory=memory, verbose=False)
+            assert get_crew_memory(crew) is memory
+            print("  ✅ Crew uses the memory built on the cached embedder")
+            
+            for text in ["VPN guide", "Roadmap owner", "Onboarding steps"]:
+                memory.remember(text, scope="/notes", categories=["notes"], importance=0.5)
+            MemoryRetention(max_age_days=0, max_records=1, interval=0).maybe_prune(crew)
+            for _ in range(50):
+                if len(memory.list_records(limit=10)) == 1:
+                    break
+                time.sleep(0.1)
+            assert len(memory.list_records(limit=10)) == 1
+            print("  ✅ maybe_prune evicted the crew's oldest records")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Crew Memory Retention Error: {str(e)}")
+        return False
+
+def test_cli_startup():
+    """Test that the CLI reports readiness only once loading finished, and load failures cleanly"""
+    print("\n🧪 Testing CLI Startup...")
+    
+    try:
+        import io
+        from contextlib import redirect_stdout
+        from unittest import mock
+        import main as cli
+        
+        output = io.StringIO()
+        with stubbed_environment(), mock.patch("src.crews.NotionChatbot", StubbedChatbot), redirect_stdout(output):
+            cli.main(["--benchmark-startup"])
+        text = output.getvalue()
+        assert text.index("Ask a question while it finishes loading") < text.index("is ready!") < text.index("Time to chatbot ready"), text
+        print("  ✅ Ready message printed after the chatbot loaded")
+        
+        output = io.StringIO()
+        failure = ValueError("NOTION_TOKEN environment variable is required")
+        with stubbed_environment(), mock.patch.object(cli, "load_chatbot", side_effect=failure), redirect_stdout(output):
+            cli.main(["--benchmark-startup"])
+            with mock.patch("builtins.input", return_value="What is the VPN policy?"):
+                cli.main([])
+        text = output.getvalue()
+        assert text.count("❌ Could not start the chatbot: NOTION_TOKEN environment variable is required") == 2, text
+        assert "is ready!" not in text
+        print("  ✅ Load failures reported without a traceback")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ CLI Startup Error: {str(e)}")
+        return False
+
 def test_chatbot_initialization():
     """Test chatbot initialization"""
     print("\n🧪 Testing Chatbot Initialization...")
     
+    openai_key = os.getenv("OPENAI_API_KEY")
+    if not openai_key or openai_key.startswith("your_"):
+        print("  ⚠️ OpenAI API key not configured, skipping initialization test")
+        return True
+    
     try:
         chatbot = NotionChatbot()
         print("  ✅ Chatbot initialized successfully")
         
+        # Tasks must run on the agents the crew was built with
+        assert chatbot.crew.agents == chatbot.agent_pool.agents
+        from src.agents import get_llm
+        assert get_llm() is get_llm()
+        print("  ✅ Agents and LLM client built once and shared")
+        
         # Test MCP status
         print("  🔗 Testing MCP status...")
         mcp_status = chatbot.get_mcp_status()
@@ -197,6 +1666,36 @@ def main():
         ("Environment Setup", test_environment_setup),
         ("MCP Client", test_mcp_client),
         ("Notion Tools", test_notion_tools),
+        ("Notion Rate Limiting", test_notion_rate_limiting),
+        ("Block Tree Fetcher", test_block_tree_fetcher),
+        ("Page Cache", test_page_cache),
+        ("Search Index", test_search_index),
+        ("Workspace Sync", test_workspace_sync),
+        ("Vector Index", test_vector_index),
+        ("Database Filters", test_database_filters),
+        ("Database Query Client", test_database_query_client),
+        ("Database Mirror", test_database_mirror),
+        ("Tool Output", test_tool_output),
+        ("Context Packing", test_context_packing),
+        ("Query Router", test_query_router),
+        ("LLM Cache", test_llm_cache),
+        ("Agent LLM", test_agent_llm),
+        ("Answer Streaming", test_answer_streaming),
+        ("Crew Answer Streaming", test_crew_answer_streaming),
+        ("Parallel Research", test_parallel_research),
+        ("Batch Retrieval", test_batch_retrieval),
+        ("Async Answering", test_async_answering),
+        ("Answer Many", test_answer_many),
+        ("Async Question Answering", test_async_question_answering),
+        ("Conversation History", test_conversation_history),
+        ("Embedding Cache", test_embedding_cache),
+        ("MCP Session", test_mcp_session),
+        ("Async MCP", test_async_mcp),
+        ("Crew Polling", test_crew_polling),
+        ("Crew Catalog Cache", test_crew_catalog_cache),
+        ("Circuit Breaker", test_circuit_breaker),
+        ("Crew Memory Retention", test_crew_memory_retention),
+        ("CLI Startup", test_cli_startup),
         ("Chatbot Initialization", test_chatbot_initialization),
         ("Simple Query", test_simple_query),
     ]
@@ -235,6 +1734,7 @@ def main():
         print("- Ensure your .env file is properly configured")
         print("- Check your API keys are valid")
         print("- Verify your Notion integration is set up correctly")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()